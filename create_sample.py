@@ -1,19 +1,166 @@
-import pandas as pd
+"""
+Draws representative samples from the full interactions dump in one
+streaming pass (recommendations.csv, reviews.jl, ...) without loading it.
+
+Modes:
+    reservoir   uniform sample of exactly --rows rows (reservoir sampling)
+    users       every interaction of a random --user-fraction of users, so
+                collaborative filtering still sees complete user histories
+    all         every row (useful together with --test-fraction)
+
+With --test-fraction the kept rows are split into <output>_train / _test by
+hashing the user (or the whole row key with --split-by row). The hash is
+salted with --seed, so the same seed gives the same split at any scale.
+Rows are written in chunks of --chunk-size.
+
+Run example:
+    $ python create_sample.py --input dataset/recommendations.csv \
+        --output dataset/recommendations_small.csv --mode users \
+        --user-fraction 0.05 --test-fraction 0.2
+"""
+import argparse
+import csv
+import hashlib
 import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', default=os.path.join(BASE_DIR, 'dataset', 'recommendations.csv'),
+                        help='CSV file, or a JSON-lines dump such as reviews.jl.')
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, 'dataset', 'recommendations_small.csv'))
+    parser.add_argument('--mode', default='reservoir', choices=['reservoir', 'users', 'all'])
+    parser.add_argument('--rows', type=int, default=100000, help='Sample size for reservoir mode.')
+    parser.add_argument('--user-fraction', type=float, default=0.1, help='Share of users kept in users mode.')
+    parser.add_argument('--user-column', default='user_id')
+    parser.add_argument('--item-column', default='app_id',
+                        help='Item id column (app_id in recommendations.csv, product_id in reviews.jl).')
+    parser.add_argument('--test-fraction', type=float, default=0.0)
+    parser.add_argument('--split-by', default='user', choices=['user', 'row'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    return parser.parse_args()
+
+
+def unit_hash(key, seed):
+    """Deterministic value in [0, 1) for key (stable across runs and machines)."""
+    digest = hashlib.blake2b(f'{seed}:{key}'.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2.0 ** 64
+
+
+def read_rows(path):
+    """Yields (header, row) pairs; row is a list aligned with header."""
+    if path.endswith('.jl') or path.endswith('.jl.gz') or path.endswith('.json'):
+        sys.path.insert(0, BASE_DIR)
+        from dataio import iter_records
+
+        header = None
+        for record in iter_records(path):
+            if header is None:
+                header = list(record)
+            yield header, [record.get(c) for c in header]
+    else:
+        csv.field_size_limit(sys.maxsize)
+        with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            for row in reader:
+                yield header, row
+
+
+class ChunkedWriter:
+    """Buffers rows and appends them to a CSV every chunk_size rows."""
+
+    def __init__(self, path, header, chunk_size):
+        self.f = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(header)
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.rows = 0
+
+    def write(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        self.writer.writerows(self.buffer)
+        self.rows += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+
+def output_paths(output, test_fraction):
+    if not test_fraction:
+        return {'all': output}
+    root, ext = os.path.splitext(output)
+    return {'train': f'{root}_train{ext or ".csv"}', 'test': f'{root}_test{ext or ".csv"}'}
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    rng = random.Random(args.seed)
+
+    writers = {}
+    reservoir = []
+    seen = 0
+    user_idx = item_idx = None
+
+    def route(header, row):
+        """Writes a kept row to the right output, opening writers lazily."""
+        if not writers:
+            for name, path in output_paths(args.output, args.test_fraction).items():
+                writers[name] = ChunkedWriter(path, header, args.chunk_size)
+        if not args.test_fraction:
+            writers['all'].write(row)
+            return
+        if args.split_by == 'user':
+            key = row[user_idx]
+        else:
+            key = f'{row[user_idx]}:{row[item_idx]}' if item_idx is not None else '|'.join(map(str, row))
+        writers['test' if unit_hash(key, args.seed + 1) < args.test_fraction else 'train'].write(row)
+
+    for header, row in read_rows(args.input):
+        if user_idx is None:
+            if args.user_column not in header:
+                sys.exit(f"Column '{args.user_column}' not in {args.input}: {header}")
+            user_idx = header.index(args.user_column)
+            item_idx = header.index(args.item_column) if args.item_column in header else None
+            first_header = header
+        seen += 1
+
+        if args.mode == 'reservoir':
+            # Algorithm R: row i replaces a random slot with probability rows / i
+            if len(reservoir) < args.rows:
+                reservoir.append(row)
+            else:
+                j = rng.randrange(seen)
+                if j < args.rows:
+                    reservoir[j] = row
+        elif args.mode == 'users':
+            if unit_hash(row[user_idx], args.seed) < args.user_fraction:
+                route(header, row)
+        else:
+            route(header, row)
+
+    for row in reservoir:
+        route(first_header, row)
+
+    for name, writer in writers.items():
+        writer.close()
+        print(f"Wrote {writer.rows} rows to {writer.f.name}")
+    print(f"Scanned {seen} rows in {time.perf_counter() - started:.1f}s.")
+
 
-# Define paths relative to the project root
-input_file = r' C:\Users\Praneet\project\dataset\recommendations.csv.csv'
-output_file = r'C:\Users\Praneet\project\dataset\recommendations_small.csv'
-
-if os.path.exists(input_file):
-    print(f"Reading first 100,000 rows from {input_file}...")
-    try:
-        # Read only first 100k rows
-        df = pd.read_csv(input_file, nrows=100000)
-        # Save without index to keep format clean
-        df.to_csv(output_file, index=False)
-        print(f"Success! Created {output_file}")
-    except Exception as e:
-        print(f"Error reading CSV: {e}")
-else:
-    print(f"Error: {input_file} not found. Please ensure it is in the 'dataset' folder.")
+if __name__ == '__main__':
+    main()
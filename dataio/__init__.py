@@ -0,0 +1,5 @@
+"""Shared, bounded-memory readers for the offline jobs."""
+from .jsonlines import (DEFAULT_CHUNK_SIZE, INT_MISSING, iter_chunks,
+                        iter_frames, iter_records, read_frame, to_array)
+from .columnar import (ColumnarWriter, is_columnar, iter_columnar,
+                       read_columnar, read_schema)
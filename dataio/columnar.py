@@ -0,0 +1,251 @@
+"""
+Partitioned, typed columnar tables for the scraped products and reviews.
+
+A table is a directory holding a _schema.json file and one sub-directory
+per bucket of the partition column (bucket=000, bucket=001, ...), each with
+Parquet part files. String lists (tags, genres, specs) and repetitive
+strings are dictionary-encoded. When pyarrow is not installed the same
+layout is written as compressed .npz parts, with list columns stored as
+offsets + int32 codes + a per-part vocabulary.
+
+    from dataio import iter_columnar
+    for chunk in iter_columnar('dataset/columnar/reviews', ['user_id', 'product_id']):
+        ...  # chunk['user_id'] is an int64 array
+
+Column types used in schemas:
+    int32 / int64 / float32 / float64 / bool   plain NumPy columns
+    str                                        free text
+    dict                                       dictionary-encoded string
+    list                                       dictionary-encoded string list
+"""
+import glob
+import json
+import os
+
+import numpy as np
+
+from .jsonlines import INT_MISSING, to_array
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = pq = None
+
+SCHEMA_FILE = '_schema.json'
+DEFAULT_ROWS_PER_FILE = 500_000
+
+
+def default_format():
+    return 'parquet' if pa is not None else 'npz'
+
+
+def bucket_of(values, n_buckets):
+    """Bucket index of every partition value (missing ids land in bucket 0)."""
+    values = np.asarray(values, dtype=np.int64)
+    return np.where(values == INT_MISSING, 0, np.mod(values, n_buckets))
+
+
+def _typed(values, kind):
+    if kind in ('str', 'dict'):
+        return to_array(values, 'str')
+    if kind == 'list':
+        return to_array([v if isinstance(v, list) else [] for v in values])
+    return to_array(values, kind)
+
+
+def _encode_strings(values):
+    vocab, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return vocab, codes.astype(np.int32)
+
+
+def _encode_lists(values):
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(v) for v in values])
+    flat = [str(t) for v in values for t in v]
+    vocab, codes = _encode_strings(flat) if flat else (np.array([], dtype=str), np.array([], dtype=np.int32))
+    return offsets, vocab, codes
+
+
+class ColumnarWriter:
+    """
+    Buffers typed chunks per bucket and writes a part file once a bucket
+    holds rows_per_file rows (and on close()).
+    """
+
+    def __init__(self, path, schema, partition_by=None, n_buckets=1,
+                 rows_per_file=DEFAULT_ROWS_PER_FILE, file_format=None, compression='zstd'):
+        self.path = path
+        self.schema = dict(schema)
+        self.partition_by = partition_by
+        self.n_buckets = n_buckets if partition_by else 1
+        self.rows_per_file = rows_per_file
+        self.format = file_format or default_format()
+        self.compression = compression
+        if self.format == 'parquet' and pa is None:
+            raise RuntimeError('pyarrow is required for the parquet format')
+
+        self._buffers = {b: [] for b in range(self.n_buckets)}
+        self._buffered = {b: 0 for b in range(self.n_buckets)}
+        self._parts = {b: 0 for b in range(self.n_buckets)}
+        self.rows = 0
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, chunk):
+        """chunk maps column -> raw values (lists or arrays of equal length)."""
+        typed = {c: _typed(chunk[c], kind) for c, kind in self.schema.items()}
+        n = len(next(iter(typed.values()))) if typed else 0
+        self.rows += n
+
+        if self.n_buckets == 1:
+            self._append(0, typed, n)
+            return
+
+        buckets = bucket_of(typed[self.partition_by], self.n_buckets)
+        order = np.argsort(buckets, kind='stable')
+        bounds = np.searchsorted(buckets[order], np.arange(self.n_buckets + 1))
+        for b in range(self.n_buckets):
+            rows = order[bounds[b]:bounds[b + 1]]
+            if len(rows):
+                self._append(b, {c: v[rows] for c, v in typed.items()}, len(rows))
+
+    def _append(self, bucket, typed, n):
+        self._buffers[bucket].append(typed)
+        self._buffered[bucket] += n
+        if self._buffered[bucket] >= self.rows_per_file:
+            self._flush(bucket)
+
+    def _flush(self, bucket):
+        parts = self._buffers[bucket]
+        if not parts:
+            return
+        columns = {c: np.concatenate([p[c] for p in parts]) for c in self.schema}
+        bucket_dir = os.path.join(self.path, 'bucket={:03d}'.format(bucket))
+        os.makedirs(bucket_dir, exist_ok=True)
+        name = os.path.join(bucket_dir, 'part-{:05d}'.format(self._parts[bucket]))
+
+        if self.format == 'parquet':
+            self._write_parquet(name + '.parquet', columns)
+        else:
+            self._write_npz(name + '.npz', columns)
+
+        self._parts[bucket] += 1
+        self._buffers[bucket] = []
+        self._buffered[bucket] = 0
+
+    def _write_parquet(self, file_name, columns):
+        arrays = []
+        for c, kind in self.schema.items():
+            values = columns[c]
+            if kind == 'list':
+                offsets, vocab, codes = _encode_lists(values)
+                dictionary = pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(vocab, pa.string()))
+                arrays.append(pa.ListArray.from_arrays(pa.array(offsets.astype(np.int32)), dictionary))
+            elif kind == 'dict':
+                arrays.append(pa.array(values, pa.string()).dictionary_encode())
+            elif kind == 'str':
+                arrays.append(pa.array(values, pa.string()))
+            else:
+                arrays.append(pa.array(values))
+        table = pa.Table.from_arrays(arrays, names=list(self.schema))
+        pq.write_table(table, file_name, compression=self.compression)
+
+    def _write_npz(self, file_name, columns):
+        out = {}
+        for c, kind in self.schema.items():
+            values = columns[c]
+            if kind == 'list':
+                out[c + '__offsets'], out[c + '__vocab'], out[c + '__codes'] = _encode_lists(values)
+            elif kind in ('str', 'dict'):
+                out[c + '__vocab'], out[c + '__codes'] = _encode_strings(values)
+            else:
+                out[c] = values
+        np.savez_compressed(file_name, **out)
+
+    def close(self):
+        for bucket in range(self.n_buckets):
+            self._flush(bucket)
+        meta = {
+            'format': self.format,
+            'columns': self.schema,
+            'partition_by': self.partition_by,
+            'n_buckets': self.n_buckets,
+            'rows': self.rows,
+        }
+        with open(os.path.join(self.path, SCHEMA_FILE), 'w') as f:
+            json.dump(meta, f, indent=2)
+        return meta
+
+
+def is_columnar(path):
+    return os.path.isfile(os.path.join(str(path), SCHEMA_FILE))
+
+
+def read_schema(path):
+    with open(os.path.join(path, SCHEMA_FILE)) as f:
+        return json.load(f)
+
+
+def part_files(path, buckets=None):
+    meta = read_schema(path)
+    ext = '.parquet' if meta['format'] == 'parquet' else '.npz'
+    selected = range(meta['n_buckets']) if buckets is None else sorted(set(buckets))
+    files = []
+    for b in selected:
+        files.extend(sorted(glob.glob(os.path.join(path, 'bucket={:03d}'.format(b), '*' + ext))))
+    return files
+
+
+def _read_parquet(file_name, columns, schema):
+    table = pq.read_table(file_name, columns=columns)
+    out = {}
+    for c in columns:
+        col = table.column(c)
+        if schema[c] in ('list', 'dict', 'str'):
+            out[c] = to_array(col.to_pylist())
+        else:
+            out[c] = col.to_numpy()
+    return out
+
+
+def _read_npz(file_name, columns, schema):
+    out = {}
+    with np.load(file_name) as data:
+        for c in columns:
+            kind = schema[c]
+            if kind == 'list':
+                offsets, vocab, codes = data[c + '__offsets'], data[c + '__vocab'], data[c + '__codes']
+                values = vocab[codes].tolist()
+                out[c] = to_array([values[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)])
+            elif kind in ('str', 'dict'):
+                out[c] = to_array(data[c + '__vocab'][data[c + '__codes']].tolist())
+            else:
+                out[c] = data[c]
+    return out
+
+
+def iter_columnar(path, columns=None, buckets=None):
+    """
+    Yields {column: np.ndarray} for every part file, reading only `columns`
+    (all when None) and only the given partition buckets.
+    """
+    meta = read_schema(path)
+    schema = meta['columns']
+    columns = list(schema) if columns is None else list(columns)
+    missing = [c for c in columns if c not in schema]
+    if missing:
+        raise KeyError(f"Columns not in {path}: {missing}")
+
+    reader = _read_parquet if meta['format'] == 'parquet' else _read_npz
+    for file_name in part_files(path, buckets):
+        yield reader(file_name, columns, schema)
+
+
+def read_columnar(path, columns=None, buckets=None):
+    """Whole table (projected) as a pandas DataFrame."""
+    import pandas as pd
+
+    frames = [pd.DataFrame(chunk) for chunk in iter_columnar(path, columns, buckets)]
+    if not frames:
+        return pd.DataFrame(columns=columns or list(read_schema(path)['columns']))
+    return pd.concat(frames, ignore_index=True)
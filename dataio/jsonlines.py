@@ -0,0 +1,179 @@
+"""
+Streaming reader for the scraper's JSON-lines dumps (games.jl, reviews.jl).
+
+Lines are parsed one at a time (with orjson when it is installed), only
+the requested keys are kept, and rows are handed out in fixed-size column
+chunks, so peak memory follows chunk_size rather than the file size.
+
+    from dataio import iter_chunks
+    for chunk in iter_chunks('reviews.jl', ['user_id', 'product_id', 'recommended'],
+                             dtypes={'user_id': 'int64', 'recommended': 'bool'}):
+        ...  # chunk['user_id'] is an int64 array of up to chunk_size rows
+
+Every reader also accepts a columnar table directory written by
+steam_scraping/ingest.py or the scraper's SteamPipeline (see columnar.py),
+or a directory of .jl / .jl.gz shards, so consumers switch between raw
+JSON lines and Parquet/npz parts by changing the path only.
+"""
+import glob
+import gzip
+import json
+import os
+
+import numpy as np
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+    _loads = json.loads
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Value used for missing entries in integer and bool columns
+INT_MISSING = -1
+
+
+def _open(path):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def shard_files(path):
+    """JSON-lines shards of a directory, in name order."""
+    return sorted(glob.glob(os.path.join(path, '*.jl')) + glob.glob(os.path.join(path, '*.jl.gz')))
+
+
+def iter_records(path, columns=None):
+    """
+    Yields one dict per line, keeping only `columns` (all keys when None).
+    Blank and malformed lines are skipped.
+    """
+    if os.path.isdir(path):
+        from .columnar import is_columnar
+
+        if not is_columnar(path):
+            for shard in shard_files(path):
+                yield from iter_records(shard, columns)
+            return
+
+        for chunk in iter_chunks(path, columns):
+            keys = list(chunk)
+            for row in zip(*(chunk[c] for c in keys)):
+                yield dict(zip(keys, row))
+        return
+
+    with _open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = _loads(line)
+            except ValueError:
+                continue
+            if columns is None:
+                yield record
+            else:
+                yield {c: record.get(c) for c in columns}
+
+
+def _coerce_int(value):
+    if value is None or value == '':
+        return INT_MISSING
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(str(value).replace(',', '')))
+        except ValueError:
+            return INT_MISSING
+
+
+def _coerce_float(value):
+    if value is None or value == '':
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        try:
+            return float(str(value).replace(',', ''))
+        except ValueError:
+            return np.nan
+
+
+def to_array(values, dtype=None):
+    """Turns a list of raw JSON values into a typed NumPy column."""
+    kind = np.dtype(dtype).kind if dtype not in (None, object, 'object') else 'O'
+
+    if kind in 'iu':
+        return np.array([_coerce_int(v) for v in values], dtype=dtype)
+    if kind == 'f':
+        return np.array([_coerce_float(v) for v in values], dtype=dtype)
+    if kind == 'b':
+        return np.array([bool(v) and v not in ('False', 'false', '0') for v in values], dtype=bool)
+    if kind == 'U':
+        return np.array(['' if v is None else str(v) for v in values], dtype=object)
+
+    # Object columns (lists such as tags, free text) are stored as-is
+    out = np.empty(len(values), dtype=object)
+    out[:] = values
+    return out
+
+
+def iter_chunks(path, columns, chunk_size=DEFAULT_CHUNK_SIZE, dtypes=None):
+    """
+    Yields {column: np.ndarray} chunks of at most chunk_size rows.
+    dtypes maps column -> NumPy dtype ('int64', 'float32', 'bool', 'str');
+    other columns are object arrays.
+    """
+    from .columnar import is_columnar, iter_columnar
+
+    dtypes = dtypes or {}
+    if is_columnar(path):
+        for chunk in iter_columnar(path, columns):
+            for c, dtype in dtypes.items():
+                if c in chunk and chunk[c].dtype != np.dtype(dtype):
+                    chunk[c] = to_array(chunk[c].tolist(), dtype)
+            yield chunk
+        return
+
+    buffers = {c: [] for c in columns}
+    n = 0
+
+    for record in iter_records(path, columns):
+        for c in columns:
+            buffers[c].append(record[c])
+        n += 1
+        if n >= chunk_size:
+            yield {c: to_array(buffers[c], dtypes.get(c)) for c in columns}
+            buffers = {c: [] for c in columns}
+            n = 0
+
+    if n:
+        yield {c: to_array(buffers[c], dtypes.get(c)) for c in columns}
+
+
+def iter_frames(path, columns, chunk_size=DEFAULT_CHUNK_SIZE, dtypes=None):
+    """Same as iter_chunks but yields pandas DataFrames."""
+    import pandas as pd
+
+    for chunk in iter_chunks(path, columns, chunk_size, dtypes):
+        yield pd.DataFrame(chunk, columns=columns)
+
+
+def read_frame(path, columns, chunk_size=DEFAULT_CHUNK_SIZE, dtypes=None):
+    """
+    Like pd.read_json(path, lines=True)[columns], but only the projected
+    columns are ever held in memory. Values are not inferred: columns keep
+    their raw JSON values unless given a type in dtypes (e.g. ids stored as
+    strings need {'user_id': 'int64'} to compare with ints).
+    """
+    import pandas as pd
+
+    frames = list(iter_frames(path, columns, chunk_size, dtypes))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
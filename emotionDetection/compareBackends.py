@@ -0,0 +1,161 @@
+"""
+Accuracy parity and latency/memory check for the emotion backends.
+
+Every backend runs in its own process so import time and peak memory are
+measured in isolation. The DeepFace (TensorFlow) backend is the reference.
+Label agreement needs a real sample of faces, so --images is required and
+must hold at least --min-images pictures. --make-sample writes the fixed
+sample set: the 100 faces of the LFW subset bundled with scikit-image.
+
+Run example:
+    $ python compareBackends.py --make-sample samples/lfw
+    $ python compareBackends.py --images samples/lfw --model-dir models \
+        --backends deepface,onnx,numpy --output backend_report.json
+
+Without the trained weights, on a random-weight model (see emotionOnnx.py):
+    $ python emotionOnnx.py check --model-dir models_random
+    $ DEEPFACE_HOME=models_random/deepface_home python compareBackends.py \
+        --images samples/lfw --model-dir models_random
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', help='Directory of sample face images.')
+    parser.add_argument('--make-sample', metavar='DIR',
+                        help='Write the fixed LFW sample set (needs scikit-image) to DIR and exit.')
+    parser.add_argument('--min-images', type=int, default=20,
+                        help='Refuse to report agreement on fewer images.')
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--backends', default='deepface,onnx,numpy')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Timed passes over the image set per backend.')
+    parser.add_argument('--output', default='backend_report.json')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if not args.images and not args.make_sample:
+        parser.error('--images is required')
+    return args
+
+
+def sample_images(images_dir):
+    paths = []
+    for ext in ('jpg', 'jpeg', 'png'):
+        paths += glob.glob(os.path.join(images_dir, f'*.{ext}'))
+    return sorted(paths)
+
+
+def make_sample(output_dir, size=100):
+    """Writes the faces of scikit-image's LFW subset, upscaled to size x size."""
+    import cv2
+    from skimage import data
+
+    os.makedirs(output_dir, exist_ok=True)
+    faces = data.lfw_subset()[:100]  # The first 100 images are faces
+    for i, face in enumerate(faces):
+        img = cv2.resize((face * 255).astype(np.uint8), (size, size), interpolation=cv2.INTER_CUBIC)
+        cv2.imwrite(os.path.join(output_dir, f'lfw_{i:03d}.png'), cv2.cvtColor(img, cv2.COLOR_GRAY2BGR))
+    print(f"✅ Wrote {len(faces)} faces to {output_dir}")
+
+
+def run_worker(args, paths):
+    """Loads one backend, runs every image and prints a JSON result line."""
+    started = time.perf_counter()
+    os.environ['EMOTION_BACKEND'] = args.worker
+    os.environ['EMOTION_MODEL_DIR'] = args.model_dir
+    sys.path.insert(0, BASE_DIR)
+    from emotionDeepFace import analyze_image
+    load_s = time.perf_counter() - started
+
+    # First call pays for lazy initialisation (detectors, graph building)
+    first = time.perf_counter()
+    probs = [analyze_image(p)['emotion'] for p in paths]
+    warmup_s = time.perf_counter() - first
+
+    latencies = []
+    for _ in range(args.repeat):
+        for p in paths:
+            t = time.perf_counter()
+            analyze_image(p)
+            latencies.append(time.perf_counter() - t)
+
+    print(json.dumps({
+        'backend': args.worker,
+        'load_s': load_s,
+        'warmup_s': warmup_s,
+        'latency_ms': {
+            'p50': float(np.percentile(latencies, 50) * 1000),
+            'p95': float(np.percentile(latencies, 95) * 1000),
+            'mean': float(np.mean(latencies) * 1000),
+        },
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'probs': [[float(p[label]) / 100 for label in EMOTION_LABELS] for p in probs],
+    }))
+
+
+def main():
+    args = parse_args()
+    if args.make_sample:
+        make_sample(args.make_sample)
+        return
+
+    paths = sample_images(args.images)
+    if len(paths) < args.min_images:
+        sys.exit(f"❌ {len(paths)} images in {args.images}, need at least {args.min_images} "
+                 f"for a meaningful agreement rate.")
+
+    if args.worker:
+        run_worker(args, paths)
+        return
+
+    print(f"Comparing backends on {len(paths)} images...")
+    results = {}
+    for backend in args.backends.split(','):
+        cmd = [sys.executable, os.path.abspath(__file__), '--worker', backend,
+               '--model-dir', args.model_dir, '--repeat', str(args.repeat),
+               '--images', args.images, '--min-images', str(args.min_images)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith('{')]
+        if proc.returncode != 0 or not lines:
+            print(f"❌ {backend} failed:\n{proc.stderr[-2000:]}")
+            continue
+        results[backend] = json.loads(lines[-1])
+
+    reference = results.get('deepface')
+    report = {'images': len(paths), 'backends': {}}
+
+    for backend, res in results.items():
+        entry = {k: res[k] for k in ('load_s', 'warmup_s', 'latency_ms', 'peak_rss_mb')}
+        if reference is not None and backend != 'deepface':
+            ref = np.array(reference['probs'])
+            got = np.array(res['probs'])
+            entry['label_agreement'] = float((ref.argmax(1) == got.argmax(1)).mean())
+            entry['max_abs_prob_diff'] = float(np.abs(ref - got).max())
+        report['backends'][backend] = entry
+
+        print(f"{backend:>9}: load {entry['load_s']:.2f}s | "
+              f"p50 {entry['latency_ms']['p50']:.1f}ms | p95 {entry['latency_ms']['p95']:.1f}ms | "
+              f"peak RSS {entry['peak_rss_mb']:.0f}MB"
+              + (f" | agreement {entry['label_agreement']:.1%}" if 'label_agreement' in entry else ""))
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved report to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,65 @@
 from flask import Flask, request
 from flask_cors import CORS
+from flask_sock import Sock
 import os
 import base64
-from deepface import DeepFace
+import binascii
+import json
+import uuid
+
+import cv2
+import numpy as np
+
+from emotionStream import sessions
+
+# Inference backend: 'deepface' (TensorFlow), 'onnx' or 'numpy'.
+# The last two need the files written by `python emotionOnnx.py export`.
+EMOTION_BACKENDS = ('deepface', 'onnx', 'numpy')
+EMOTION_BACKEND = os.environ.get('EMOTION_BACKEND', 'deepface').lower()
+EMOTION_MODEL_DIR = os.environ.get('EMOTION_MODEL_DIR', 'models')
+
+if EMOTION_BACKEND not in EMOTION_BACKENDS:
+    raise ValueError(f"Unknown EMOTION_BACKEND {EMOTION_BACKEND!r}, "
+                     f"expected one of {', '.join(EMOTION_BACKENDS)}")
+
+if EMOTION_BACKEND == 'deepface':
+    from deepface import DeepFace
+else:
+    import emotionOnnx
+    emotion_model = emotionOnnx.load_model(EMOTION_BACKEND, EMOTION_MODEL_DIR)
 
 app = Flask(__name__)
 CORS(app)
+sock = Sock(app)
+
+def analyze_image(img_path):
+    """Returns DeepFace-style {'emotion': {label: %}, 'dominant_emotion': label}."""
+    if EMOTION_BACKEND != 'deepface':
+        return emotionOnnx.analyze(emotion_model, img_path)
+
+    # FIX APPLIED HERE: Added actions=['emotion']
+    # This tells DeepFace to skip downloading Age, Gender, and Race models.
+    # enforce_detection=False prevents crash if face isn't perfect.
+    face_analysis = DeepFace.analyze(
+        img_path = img_path,
+        actions = ['emotion'],
+        enforce_detection = False
+    )
+
+    # Handle case where list is returned
+    return face_analysis[0] if isinstance(face_analysis, list) else face_analysis
+
+def decode_frame(message):
+    """Decodes a binary JPEG/PNG frame or a base64 data URL into a BGR image."""
+    if isinstance(message, str):
+        message = base64.b64decode(message.split(',')[-1])
+    return cv2.imdecode(np.frombuffer(message, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def to_scores(result):
+    # DeepFace reports percentages; send probabilities that sum to 1 so the
+    # recommender can weight its ranking by the whole distribution.
+    total = sum(float(v) for v in result['emotion'].values()) or 1.0
+    return {label: float(v) / total for label, v in result['emotion'].items()}
 
 @app.route('/')
 def hello():
@@ -14,29 +68,68 @@ def hello():
 @app.route('/emotion', methods=['POST'])
 def get_polarity():
     requestJson = request.get_json(force=True)
+
+    # A streaming client can pass its session id instead of a still frame
+    # to get the smoothed label.
+    if 'image' not in requestJson:
+        if 'session' not in requestJson:
+            return {'error': 'Send an image or a session id.'}, 400
+        session = sessions.get(requestJson['session'])
+        if session is None:
+            return {'error': 'Unknown session.'}, 404
+        if session.label is None:
+            # No frame of the stream has been analysed yet.
+            return {'session': requestJson['session'], 'emotion': None, 'pending': True}, 202
+
+    session = sessions.get(requestJson.get('session')) if 'session' in requestJson else None
+    if session is not None and session.label is not None:
+        state = session.state()
+        return {'emotion': state['emotion'], 'scores': state['scores']}
+
     image_string = requestJson['image']
-    
+
     # Extract the base64 part
     image_bytes = bytes(image_string.split(',')[1], 'UTF-8')
-    
+
     # Save the image temporarily
     with open("imageToSave.png", "wb") as fh:
         fh.write(base64.decodebytes(image_bytes))
-    
-    # FIX APPLIED HERE: Added actions=['emotion']
-    # This tells DeepFace to skip downloading Age, Gender, and Race models.
-    # enforce_detection=False prevents crash if face isn't perfect.
-    face_analysis = DeepFace.analyze(
-        img_path = "imageToSave.png", 
-        actions = ['emotion'],
-        enforce_detection = False
-    )
 
-    # Handle case where list is returned
-    result = face_analysis[0] if isinstance(face_analysis, list) else face_analysis
+    result = analyze_image("imageToSave.png")
+
+    return {'emotion': result['dominant_emotion'], 'scores': to_scores(result)}
+
+@sock.route('/emotion/stream')
+def stream_emotion(ws):
+    """
+    Accepts a low-FPS stream of frames (binary or base64 text) and pushes
+    {'session', 'emotion', 'scores'} only when the smoothed label changes.
+    """
+    session_id = request.args.get('session') or uuid.uuid4().hex
+    session = sessions.get(session_id, create=True)
+    ws.send(json.dumps({'session': session_id}))
+
+    while True:
+        message = ws.receive()
+        if message is None:
+            break
+        if not session.should_sample():
+            continue
+
+        try:
+            frame = decode_frame(message)
+        except (binascii.Error, ValueError, cv2.error):
+            continue  # Malformed base64 or an empty/corrupt image buffer
+        if frame is None:
+            continue
 
-    return {'emotion': result['dominant_emotion']}
+        result = analyze_image(frame)
+        if session.update(result['emotion']):
+            state = session.state()
+            ws.send(json.dumps({'session': session_id,
+                                'emotion': state['emotion'],
+                                'scores': state['scores']}))
 
 if __name__ == '__main__':
     # Run on port 8080 (Docker default)
-    app.run(debug=True, host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
\ No newline at end of file
+    app.run(debug=True, host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
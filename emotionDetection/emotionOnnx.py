@@ -0,0 +1,412 @@
+"""
+Lightweight inference backends for the DeepFace emotion CNN.
+
+The model is exported once from DeepFace (needs TensorFlow) with
+    python emotionOnnx.py export --model-dir models [--quantize]
+and served afterwards with ONNX Runtime, or with plain NumPy when ONNX
+Runtime is not installed. Neither path imports TensorFlow or DeepFace.
+
+Without the trained weights, the exports can still be checked against
+Keras on a random-weight copy of the architecture:
+    python emotionOnnx.py check --model-dir models_random
+which also leaves the weights where DeepFace looks for them, so
+compareBackends.py can run end to end with
+DEEPFACE_HOME=models_random/deepface_home.
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+# Output order of the DeepFace emotion model
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+ONNX_FILE = 'emotion.onnx'
+ONNX_INT8_FILE = 'emotion.int8.onnx'
+NUMPY_FILE = 'emotion_weights.npz'
+
+# DeepFace pads detected faces to this size before the emotion model sees them
+FACE_SIZE = (224, 224)
+INPUT_SIZE = (48, 48)
+
+_cascades = {}
+
+
+# ==========================================
+# 1. PREPROCESSING (mirrors DeepFace's opencv detector path)
+# ==========================================
+def _get_cascade(name):
+    if name not in _cascades:
+        _cascades[name] = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, f'{name}.xml'))
+    return _cascades[name]
+
+
+def _find_eyes(face):
+    """(left, right) eye centres in face, or (None, None), like DeepFace's OpenCvClient."""
+    if face.shape[0] == 0 or face.shape[1] == 0:
+        return None, None
+    eyes = _get_cascade('haarcascade_eye').detectMultiScale(cv2.cvtColor(face, cv2.COLOR_BGR2GRAY), 1.1, 10)
+    eyes = sorted(eyes, key=lambda v: abs(v[2] * v[3]), reverse=True)
+    if len(eyes) < 2:
+        return None, None
+    right, left = sorted(eyes[:2], key=lambda v: v[0])
+    return ((int(left[0] + left[2] / 2), int(left[1] + left[3] / 2)),
+            (int(right[0] + right[2] / 2), int(right[1] + right[3] / 2)))
+
+
+def _fixed(v):
+    return int(np.floor(v * 65536.0 + 0.5))
+
+
+def _rotate(img, angle):
+    """
+    PIL's Image.rotate(angle) (nearest neighbour, black fill) in NumPy,
+    including its 16.16 fixed-point sampling, so DeepFace's alignment is
+    reproduced pixel for pixel without Pillow.
+    """
+    h, w = img.shape[:2]
+    a = -np.radians(angle)
+    cos, sin = round(float(np.cos(a)), 15), round(float(np.sin(a)), 15)
+    cx, cy = w / 2, h / 2
+    c = cos * -cx + sin * -cy + cx
+    f = -sin * -cx + cos * -cy + cy
+    ys, xs = np.mgrid[0:h, 0:w].astype(np.int64)
+    x_in = (_fixed(c + cos * 0.5 + sin * 0.5) + xs * _fixed(cos) + ys * _fixed(sin)) >> 16
+    y_in = (_fixed(f - sin * 0.5 + cos * 0.5) + xs * _fixed(-sin) + ys * _fixed(cos)) >> 16
+    inside = (x_in >= 0) & (y_in >= 0) & (x_in < w) & (y_in < h)
+    out = np.zeros_like(img)
+    out[inside] = img[y_in[inside], x_in[inside]]
+    return out
+
+
+def _rotate_area(x1, y1, x2, y2, angle, height, width):
+    """DeepFace's rotate_facial_area: the face box after rotating the image."""
+    direction = 1 if angle >= 0 else -1
+    angle = abs(angle) % 360
+    if angle == 0:
+        return x1, y1, x2, y2
+    angle = angle * np.pi / 180
+    x = (x1 + x2) / 2 - width / 2
+    y = (y1 + y2) / 2 - height / 2
+    x_new = x * np.cos(angle) + y * direction * np.sin(angle) + width / 2
+    y_new = -x * direction * np.sin(angle) + y * np.cos(angle) + height / 2
+    return (max(int(x_new - (x2 - x1) / 2), 0), max(int(y_new - (y2 - y1) / 2), 0),
+            min(int(x_new + (x2 - x1) / 2), width), min(int(y_new + (y2 - y1) / 2), height))
+
+
+def _detect_face(img):
+    """
+    The face DeepFace.analyze reports first: the first opencv detection,
+    aligned on the eyes, or the whole frame when none is found (the same
+    behaviour as enforce_detection=False).
+    """
+    faces, _, _ = _get_cascade('haarcascade_frontalface_default').detectMultiScale3(
+        img, 1.1, 10, outputRejectLevels=True)
+    if not len(faces):
+        return img
+
+    x, y, w, h = (int(v) for v in faces[0])
+    left, right = _find_eyes(img[y:y + h, x:x + w])
+    if left is None or right is None:
+        return img[y:y + h, x:x + w]
+
+    left, right = (x + left[0], y + left[1]), (x + right[0], y + right[1])
+    angle = float(np.degrees(np.arctan2(left[1] - right[1], left[0] - right[0])))
+    x1, y1, x2, y2 = _rotate_area(x, y, x + w, y + h, angle, img.shape[0], img.shape[1])
+    return (_rotate(img, angle) if angle else img)[y1:y2, x1:x2]
+
+
+def _pad_to_face_size(face):
+    """Resize keeping the aspect ratio, then pad with black like DeepFace."""
+    factor = min(FACE_SIZE[0] / face.shape[0], FACE_SIZE[1] / face.shape[1])
+    size = (int(face.shape[1] * factor), int(face.shape[0] * factor))
+    face = cv2.resize(face, size)
+
+    diff_0 = FACE_SIZE[0] - face.shape[0]
+    diff_1 = FACE_SIZE[1] - face.shape[1]
+    face = np.pad(face, ((diff_0 // 2, diff_0 - diff_0 // 2),
+                         (diff_1 // 2, diff_1 - diff_1 // 2),
+                         (0, 0)), 'constant')
+    if face.shape[:2] != FACE_SIZE:
+        face = cv2.resize(face, FACE_SIZE)
+    return face
+
+
+def preprocess(img):
+    """Takes a BGR image and returns a (1, 48, 48, 1) float32 batch."""
+    # DeepFace scales to [0, 1] before padding, so the resize runs on floats
+    face = _pad_to_face_size(_detect_face(img) / 255.0).astype(np.float32)
+    face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    face = cv2.resize(face, INPUT_SIZE)
+    return face.reshape(1, INPUT_SIZE[0], INPUT_SIZE[1], 1).astype(np.float32)
+
+
+def to_result(probs):
+    """Formats raw model output like DeepFace.analyze (percentages)."""
+    probs = np.asarray(probs, dtype=np.float64).ravel()
+    probs = probs / (probs.sum() or 1.0)
+    emotion = {label: 100 * float(p) for label, p in zip(EMOTION_LABELS, probs)}
+    return {'emotion': emotion, 'dominant_emotion': EMOTION_LABELS[int(probs.argmax())]}
+
+
+# ==========================================
+# 2. ONNX RUNTIME BACKEND
+# ==========================================
+class OnnxEmotionModel:
+    def __init__(self, path):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        threads = int(os.environ.get('EMOTION_THREADS', 0))
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+# ==========================================
+# 3. NUMPY BACKEND
+# ==========================================
+def _windows(x, kernel, strides):
+    """(N, H, W, C) -> strided (N, H', W', C, kh, kw) view, 'valid' padding."""
+    view = np.lib.stride_tricks.sliding_window_view(x, kernel, axis=(1, 2))
+    return view[:, ::strides[0], ::strides[1]]
+
+
+def _same_padding(x, kernel, strides):
+    pads = []
+    for size, k, s in zip(x.shape[1:3], kernel, strides):
+        out = -(-size // s)
+        total = max((out - 1) * s + k - size, 0)
+        pads.append((total // 2, total - total // 2))
+    return np.pad(x, ((0, 0), pads[0], pads[1], (0, 0)))
+
+
+class NumpyEmotionModel:
+    """Runs the exported Keras layer list with NumPy only."""
+
+    def __init__(self, path):
+        data = np.load(path, allow_pickle=False)
+        self.layers = json.loads(str(data['layers']))
+        self.weights = {k: data[k] for k in data.files if k != 'layers'}
+
+    def _activation(self, x, name):
+        if name == 'relu':
+            return np.maximum(x, 0)
+        if name == 'softmax':
+            e = np.exp(x - x.max(axis=-1, keepdims=True))
+            return e / e.sum(axis=-1, keepdims=True)
+        return x
+
+    def predict(self, batch):
+        x = np.asarray(batch, dtype=np.float32)
+
+        for i, layer in enumerate(self.layers):
+            kind = layer['class_name']
+            cfg = layer['config']
+
+            if kind == 'Conv2D':
+                kernel = self.weights[f'{i}_kernel']
+                size, strides = kernel.shape[:2], tuple(cfg.get('strides', (1, 1)))
+                if cfg.get('padding') == 'same':
+                    x = _same_padding(x, size, strides)
+                x = np.einsum('nhwcij,ijcf->nhwf', _windows(x, size, strides), kernel, optimize=True)
+                if f'{i}_bias' in self.weights:
+                    x = x + self.weights[f'{i}_bias']
+                x = self._activation(x, cfg.get('activation'))
+
+            elif kind in ('MaxPooling2D', 'AveragePooling2D'):
+                size = tuple(cfg['pool_size'])
+                strides = tuple(cfg.get('strides') or size)
+                if cfg.get('padding') == 'same':
+                    x = _same_padding(x, size, strides)
+                view = _windows(x, size, strides)
+                x = view.max(axis=(4, 5)) if kind == 'MaxPooling2D' else view.mean(axis=(4, 5))
+
+            elif kind == 'Flatten':
+                x = x.reshape(x.shape[0], -1)
+
+            elif kind == 'Dense':
+                x = x @ self.weights[f'{i}_kernel']
+                if f'{i}_bias' in self.weights:
+                    x = x + self.weights[f'{i}_bias']
+                x = self._activation(x, cfg.get('activation'))
+
+            elif kind == 'Activation':
+                x = self._activation(x, cfg.get('activation'))
+
+            # Dropout and InputLayer are no-ops at inference time
+
+        return x
+
+
+# ==========================================
+# 4. LOADING & EXPORT
+# ==========================================
+def load_model(backend, model_dir):
+    """
+    Returns a model with .predict(batch) for 'onnx' or 'numpy'.
+    'onnx' prefers the int8 file when present and falls back to NumPy
+    when ONNX Runtime is not installed.
+    """
+    if backend not in ('onnx', 'numpy'):
+        raise ValueError(f"Unknown emotion backend {backend!r}, expected 'onnx' or 'numpy'")
+    if backend == 'onnx':
+        try:
+            import onnxruntime  # noqa: F401
+            for name in (ONNX_INT8_FILE, ONNX_FILE):
+                path = os.path.join(model_dir, name)
+                if os.path.exists(path):
+                    print(f"Emotion backend: ONNX Runtime ({path})")
+                    return OnnxEmotionModel(path)
+            print(f"⚠️ No ONNX model in {model_dir}, trying NumPy weights.")
+        except ImportError:
+            print("⚠️ onnxruntime not installed, using the NumPy backend.")
+
+    path = os.path.join(model_dir, NUMPY_FILE)
+    print(f"Emotion backend: NumPy ({path})")
+    return NumpyEmotionModel(path)
+
+
+def analyze(model, img_path):
+    """img_path may also be a BGR image array, like DeepFace.analyze."""
+    img = cv2.imread(img_path) if isinstance(img_path, str) else img_path
+    if img is None:
+        raise ValueError(f"Could not read image {img_path}")
+    return to_result(model.predict(preprocess(img)))
+
+
+def build_random_model(seed=0):
+    """
+    The DeepFace emotion CNN (the layers of deepface's
+    extendedmodels/Emotion.load_model) with seeded random weights.
+    """
+    import tensorflow as tf
+    from tensorflow.keras.layers import AveragePooling2D, Conv2D, Dense, Dropout, Flatten, MaxPooling2D
+
+    tf.keras.utils.set_random_seed(seed)
+    model = tf.keras.Sequential([
+        Conv2D(64, (5, 5), activation='relu', input_shape=(INPUT_SIZE[0], INPUT_SIZE[1], 1)),
+        MaxPooling2D(pool_size=(5, 5), strides=(2, 2)),
+        Conv2D(64, (3, 3), activation='relu'),
+        Conv2D(64, (3, 3), activation='relu'),
+        AveragePooling2D(pool_size=(3, 3), strides=(2, 2)),
+        Conv2D(128, (3, 3), activation='relu'),
+        Conv2D(128, (3, 3), activation='relu'),
+        AveragePooling2D(pool_size=(3, 3), strides=(2, 2)),
+        Flatten(),
+        Dense(1024, activation='relu'),
+        Dropout(0.2),
+        Dense(1024, activation='relu'),
+        Dropout(0.2),
+        Dense(len(EMOTION_LABELS), activation='softmax'),
+    ])
+
+    # Keras' default init gives zero biases and near-uniform softmax outputs,
+    # which would hide bias and layout errors; use He-scaled kernels instead.
+    rng = np.random.RandomState(seed)
+    for layer in model.layers:
+        if layer.get_weights():
+            kernel, bias = layer.get_weights()
+            fan_in = int(np.prod(kernel.shape[:-1]))
+            layer.set_weights([rng.normal(0, np.sqrt(2 / fan_in), kernel.shape).astype(np.float32),
+                               rng.normal(0, 0.1, bias.shape).astype(np.float32)])
+    return model
+
+
+def export(model_dir, quantize=False, keras_model=None):
+    """Exports the DeepFace emotion CNN (or keras_model) to ONNX and to NumPy weights."""
+    import tensorflow as tf
+
+    os.makedirs(model_dir, exist_ok=True)
+    if keras_model is None:
+        from deepface import DeepFace
+        client = DeepFace.build_model('Emotion')
+        keras_model = getattr(client, 'model', client)
+
+    # NumPy weights: layer configs plus kernels/biases keyed by layer position
+    layers, arrays = [], {}
+    for i, layer in enumerate(keras_model.layers):
+        cfg = layer.get_config()
+        layers.append({'class_name': layer.__class__.__name__, 'config': {
+            k: cfg[k] for k in ('activation', 'padding', 'strides', 'pool_size') if k in cfg
+        }})
+        for w, name in zip(layer.get_weights(), ('kernel', 'bias')):
+            arrays[f'{i}_{name}'] = w.astype(np.float32)
+    np.savez(os.path.join(model_dir, NUMPY_FILE), layers=json.dumps(layers), **arrays)
+    print(f"✅ Saved NumPy weights to {model_dir}")
+
+    try:
+        import tf2onnx
+    except ImportError:
+        print("⚠️ tf2onnx not installed, skipping the ONNX export.")
+        return
+
+    onnx_path = os.path.join(model_dir, ONNX_FILE)
+    spec = (tf.TensorSpec((None, INPUT_SIZE[0], INPUT_SIZE[1], 1), tf.float32, name='input'),)
+    tf2onnx.convert.from_keras(keras_model, input_signature=spec, opset=13, output_path=onnx_path)
+    print(f"✅ Saved {onnx_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(model_dir, ONNX_INT8_FILE)
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ Saved {int8_path}")
+
+
+def check(model_dir, n_inputs=64, seed=0, repeat=20):
+    """
+    Weight-free parity check: exports a random-weight model and compares
+    Keras, ONNX Runtime and NumPy outputs on random input batches.
+    Returns True when every backend matches Keras.
+    """
+    keras_model = build_random_model(seed)
+    export(model_dir, keras_model=keras_model)
+
+    # Let DeepFace.analyze load the same weights (DEEPFACE_HOME=<this dir>)
+    weights_dir = os.path.join(model_dir, 'deepface_home', '.deepface', 'weights')
+    os.makedirs(weights_dir, exist_ok=True)
+    keras_model.save_weights(os.path.join(weights_dir, 'facial_expression_model_weights.h5'))
+
+    batches = np.random.RandomState(seed).rand(n_inputs, 1, INPUT_SIZE[0], INPUT_SIZE[1], 1)
+    batches = batches.astype(np.float32)
+    reference = np.concatenate([keras_model(b, training=False).numpy() for b in batches])
+
+    backends = {'numpy': NumpyEmotionModel(os.path.join(model_dir, NUMPY_FILE))}
+    if os.path.exists(os.path.join(model_dir, ONNX_FILE)):
+        backends['onnx'] = OnnxEmotionModel(os.path.join(model_dir, ONNX_FILE))
+
+    ok = True
+    for name, model in backends.items():
+        out = np.concatenate([model.predict(b) for b in batches])
+        diff = float(np.abs(out - reference).max())
+        agreement = float((out.argmax(1) == reference.argmax(1)).mean())
+        latencies = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            model.predict(batches[0])
+            latencies.append(time.perf_counter() - t)
+        ok &= diff < 1e-4 and agreement == 1.0
+        print(f"{name:>6} vs Keras: max abs diff {diff:.2e} | label agreement {agreement:.1%} | "
+              f"p50 {np.percentile(latencies, 50) * 1000:.2f}ms per frame")
+    print("✅ Backends match Keras." if ok else "❌ Backends differ from Keras.")
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the DeepFace emotion model.')
+    parser.add_argument('command', choices=['export', 'check'])
+    parser.add_argument('--model-dir', default=os.environ.get('EMOTION_MODEL_DIR', 'models'))
+    parser.add_argument('--quantize', action='store_true', help='Also write an int8 ONNX model.')
+    parser.add_argument('--seed', type=int, default=0, help='Random weights and inputs (check).')
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        raise SystemExit(0 if check(args.model_dir, seed=args.seed) else 1)
+    export(args.model_dir, quantize=args.quantize)
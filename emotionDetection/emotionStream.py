@@ -0,0 +1,88 @@
+"""
+Per-session temporal smoothing for streamed webcam frames.
+
+Only every SAMPLE_EVERY-th frame (and at most one per MIN_INTERVAL seconds)
+goes through the model. The probabilities are kept as an exponential moving
+average and an update is pushed only when the smoothed label changes.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+SAMPLE_EVERY = int(os.environ.get('STREAM_SAMPLE_EVERY', 3))
+MIN_INTERVAL = float(os.environ.get('STREAM_MIN_INTERVAL', 0.5))
+EMA_ALPHA = float(os.environ.get('STREAM_EMA_ALPHA', 0.3))
+SESSION_TTL = float(os.environ.get('STREAM_SESSION_TTL', 300))
+
+
+class EmotionSession:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.frames = 0
+        self.inferences = 0
+        self.last_inference = 0.0
+        self.last_seen = time.monotonic()
+        self.probs = None
+        self.label = None
+
+    def should_sample(self):
+        """Counts the frame and says whether it should be run through the model."""
+        self.frames += 1
+        self.last_seen = time.monotonic()
+        if (self.frames - 1) % SAMPLE_EVERY:
+            return False
+        return self.last_seen - self.last_inference >= MIN_INTERVAL
+
+    def update(self, emotion_scores):
+        """
+        Folds one DeepFace-style {label: %} result into the moving average.
+        Returns True when the smoothed dominant emotion changed.
+        """
+        probs = np.array([float(emotion_scores.get(l, 0.0)) for l in EMOTION_LABELS])
+        probs = probs / (probs.sum() or 1.0)
+
+        self.inferences += 1
+        self.last_inference = time.monotonic()
+        self.probs = probs if self.probs is None else EMA_ALPHA * probs + (1 - EMA_ALPHA) * self.probs
+
+        label = EMOTION_LABELS[int(self.probs.argmax())]
+        changed = label != self.label
+        self.label = label
+        return changed
+
+    def state(self):
+        scores = {} if self.probs is None else dict(zip(EMOTION_LABELS, self.probs.tolist()))
+        return {
+            'emotion': self.label or 'neutral',
+            'scores': scores,
+            'frames': self.frames,
+            'inferences': self.inferences,
+        }
+
+
+class SessionRegistry:
+    """Thread-safe store of live sessions, so POST /emotion can read them."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id, create=False):
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is None and create:
+                session = self._sessions[session_id] = EmotionSession(session_id)
+            return session
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, s in self._sessions.items() if now - s.last_seen > SESSION_TTL]:
+            del self._sessions[key]
+
+
+sessions = SessionRegistry()
@@ -0,0 +1,186 @@
+"""
+Build stage for the serving-time emotion mapping.
+
+Runs the tag clustering, names the clusters after emotions and compiles a
+single artifact (filtering/emotion_mapping.npz) holding:
+    emotions / topics / genres      emotion order, LDA topic and genre label
+    tag_vocab                       every tag seen in the game index
+    emotion_tag_indptr / _indices   tag-id set of each emotion (CSR layout)
+    game_ids                        sorted int64 game index
+    game_tag_masks / game_genre_masks
+                                    uint8 bitmasks, bit i = EMOTIONS[i]
+Serving code then matches games by array lookups instead of substrings.
+
+Run example:
+    $ python buildEmotionMapping.py --games ../dataset/games.jl \
+        --game-index ../dataset/steam_games.csv
+"""
+import argparse
+import ast
+import csv
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+import clusterTags
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FILTERING_DIR = os.path.join(BASE_DIR, '..', 'filtering')
+
+sys.path.insert(0, os.path.join(BASE_DIR, '..'))
+from dataio import iter_records
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', required=True,
+                        help='games.jl (or steam_games.csv) used for clustering.')
+    parser.add_argument('--game-index', help='Games served by filtering/ '
+                        '(steam_games.csv). Defaults to --games.')
+    parser.add_argument('--algorithm', default='kmeans', choices=['kmeans', 'agglomerative'])
+    parser.add_argument('--n-clusters', type=int, default=7)
+    parser.add_argument('--dims', type=int, default=64)
+    parser.add_argument('--min-count', type=int, default=5)
+    parser.add_argument('--neighbors', type=int, default=15)
+    parser.add_argument('--max-tags', type=int, default=40)
+    parser.add_argument('--seeds', default=os.path.join(BASE_DIR, 'emotion_seed_tags.json'))
+    parser.add_argument('--topics', default=os.path.join(FILTERING_DIR, 'emotion_to_topic.json'))
+    parser.add_argument('--genres', default=os.path.join(FILTERING_DIR, 'emotion_to_genre.json'))
+    parser.add_argument('--output', default=os.path.join(FILTERING_DIR, 'emotion_mapping.npz'))
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def clean_id(value):
+    try:
+        val_float = float(value)
+        if math.isinf(val_float) or math.isnan(val_float):
+            return None
+        return int(val_float)
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_tags(value):
+    if isinstance(value, list):
+        return [str(t) for t in value]
+    if isinstance(value, str) and value:
+        if value.startswith('['):
+            try:
+                return [str(t) for t in ast.literal_eval(value)]
+            except (ValueError, SyntaxError):
+                return []
+        return [t.strip() for t in value.split(',') if t.strip()]
+    return []
+
+
+def read_games(path):
+    """Yields (id, tags) from games.jl or steam_games.csv, one row at a time."""
+    if path.endswith('.csv'):
+        csv.field_size_limit(sys.maxsize)
+        with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            reader = csv.DictReader(f)
+            cols = {c.lower().strip().replace(' ', '_'): c for c in reader.fieldnames}
+            id_col = cols.get('appid') or cols.get('app_id') or cols.get('id')
+            tag_col = cols.get('tags') or cols.get('genres')
+            for row in reader:
+                yield clean_id(row.get(id_col)), parse_tags(row.get(tag_col))
+    else:
+        for game in iter_records(path, ['id', 'tags']):
+            yield clean_id(game['id']), parse_tags(game['tags'])
+
+
+def expand(words, vocab_lower):
+    """Tag ids whose name contains any of words (the serving substring rule)."""
+    ids = set()
+    for word in words:
+        word = word.strip().lower()
+        if word:
+            ids.update(i for i, t in enumerate(vocab_lower) if word in t)
+    return ids
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+
+    # 1. Cluster and name the clusters
+    args.column, args.algorithms = 'tags', args.algorithm
+    mapping, report = clusterTags.run(args, (tags for _, tags in read_games(args.games)))
+
+    with open(args.topics) as f:
+        emotion_to_topic = json.load(f)
+    with open(args.genres) as f:
+        emotion_to_genre = json.load(f)
+    emotions = sorted(emotion_to_topic, key=emotion_to_topic.get)
+
+    # 2. Read the served game index
+    games = {}
+    for game_id, tags in read_games(args.game_index or args.games):
+        if game_id is not None and game_id not in games:
+            games[game_id] = tags
+    game_ids = np.array(sorted(games), dtype=np.int64)
+
+    vocab = {}
+    for tags in games.values():
+        for t in tags:
+            vocab.setdefault(t, len(vocab))
+    tag_vocab = sorted(vocab, key=vocab.get)
+    vocab_lower = [t.lower() for t in tag_vocab]
+
+    # 3. Compile tag-id sets per emotion
+    emotion_tags = [expand(mapping.get(e, []), vocab_lower) for e in emotions]
+    genre_tags = [expand(str(emotion_to_genre.get(e, '')).split('/'), vocab_lower) for e in emotions]
+
+    indptr, indices = [0], []
+    for ids in emotion_tags:
+        indices.extend(sorted(ids))
+        indptr.append(len(indices))
+
+    # 4. Per-game emotion bitmasks (untagged games match every emotion)
+    tag_bits = np.zeros(len(tag_vocab), dtype=np.uint8)
+    genre_bits = np.zeros(len(tag_vocab), dtype=np.uint8)
+    for bit, (ids, g_ids) in enumerate(zip(emotion_tags, genre_tags)):
+        tag_bits[list(ids)] |= np.uint8(1 << bit)
+        genre_bits[list(g_ids)] |= np.uint8(1 << bit)
+
+    all_bits = np.uint8((1 << len(emotions)) - 1)
+    game_tag_masks = np.zeros(len(game_ids), dtype=np.uint8)
+    game_genre_masks = np.zeros(len(game_ids), dtype=np.uint8)
+    for row, game_id in enumerate(game_ids):
+        ids = [vocab[t] for t in games[game_id]]
+        if not ids:
+            game_tag_masks[row] = game_genre_masks[row] = all_bits
+            continue
+        game_tag_masks[row] = np.bitwise_or.reduce(tag_bits[ids])
+        game_genre_masks[row] = np.bitwise_or.reduce(genre_bits[ids])
+
+    np.savez_compressed(
+        args.output,
+        emotions=np.array(emotions),
+        topics=np.array([emotion_to_topic[e] for e in emotions], dtype=np.int16),
+        genres=np.array([str(emotion_to_genre.get(e, '')) for e in emotions]),
+        tag_vocab=np.array(tag_vocab),
+        emotion_tag_indptr=np.array(indptr, dtype=np.int64),
+        emotion_tag_indices=np.array(indices, dtype=np.int32),
+        game_ids=game_ids,
+        game_tag_masks=game_tag_masks,
+        game_genre_masks=game_genre_masks,
+    )
+
+    report['artifact'] = {
+        'games': int(len(game_ids)),
+        'tags': len(tag_vocab),
+        'tags_per_emotion': {e: len(ids) for e, ids in zip(emotions, emotion_tags)},
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    print(json.dumps(report['artifact'], indent=2))
+    print(f"Saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+Clusters Steam tags (or genres) and maps the clusters to emotions.
+
+Replaces KMeansClusteringTags.py, AgglomerativeClusteringTags.py and
+AgglomerativeClusteringGenre.py. Tags are embedded by how they co-occur
+across games (PPMI of the sparse games x tags matrix, reduced with
+TruncatedSVD) instead of by the characters in their names, and nothing
+is densified beyond the (tags x dims) embedding.
+
+Run example:
+    $ python clusterTags.py --games ../dataset/games.jl --column tags \
+        --algorithms kmeans,agglomerative \
+        --output ../filtering/emotion_to_tags.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import AgglomerativeClustering, MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.neighbors import kneighbors_graph
+from sklearn.preprocessing import normalize
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(BASE_DIR, '..'))
+from dataio import iter_records
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', default='games.jl', help='Scraped games.jl file.')
+    parser.add_argument('--column', default='tags', choices=['tags', 'genres'])
+    parser.add_argument('--algorithms', default='kmeans',
+                        help='Comma separated: kmeans, agglomerative. '
+                             'The first one produces the emotion map.')
+    parser.add_argument('--n-clusters', type=int, default=7)
+    parser.add_argument('--dims', type=int, default=64,
+                        help='SVD dimensions; 0 clusters the sparse PPMI rows (kmeans only).')
+    parser.add_argument('--min-count', type=int, default=5,
+                        help='Ignore tags used by fewer games.')
+    parser.add_argument('--neighbors', type=int, default=15,
+                        help='kNN graph size for agglomerative connectivity.')
+    parser.add_argument('--max-tags', type=int, default=40,
+                        help='Most tags kept per emotion.')
+    parser.add_argument('--seeds', default=os.path.join(BASE_DIR, 'emotion_seed_tags.json'),
+                        help='Hand-picked emotion -> tags map used to name the clusters.')
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, '..', 'filtering', 'emotion_to_tags.json'))
+    parser.add_argument('--report', default='clustering_report.json')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+# ==========================================
+# 1. SPARSE GAMES x TAGS MATRIX
+# ==========================================
+def read_tag_lists(path, column):
+    for record in iter_records(path, [column]):
+        values = record[column]
+        if isinstance(values, list):
+            yield [v for v in values if isinstance(v, str)]
+
+
+def load_tag_matrix(tag_lists, min_count=1):
+    """
+    Returns (X, vocab): a binary CSR games x tags matrix and the tag names
+    of its columns, dropping tags used by fewer than min_count games.
+    """
+    vocab, indptr, indices = {}, [0], []
+    for tags in tag_lists:
+        for tag in set(tags):
+            indices.append(vocab.setdefault(tag, len(vocab)))
+        indptr.append(len(indices))
+
+    X = sparse.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr),
+                          shape=(len(indptr) - 1, len(vocab)))
+    names = np.array(sorted(vocab, key=vocab.get), dtype=object)
+
+    keep = np.flatnonzero(np.asarray(X.sum(axis=0)).ravel() >= min_count)
+    return X[:, keep].tocsr(), names[keep].tolist()
+
+
+# ==========================================
+# 2. CO-OCCURRENCE EMBEDDINGS
+# ==========================================
+def cooccurrence_embeddings(X, dims=64, seed=0):
+    """PPMI of tag co-occurrence, optionally reduced with TruncatedSVD."""
+    C = (X.T @ X).tocoo()
+    counts = np.asarray(X.sum(axis=0)).ravel()
+    total = counts.sum()
+
+    off_diag = C.row != C.col
+    rows, cols, vals = C.row[off_diag], C.col[off_diag], C.data[off_diag]
+    pmi = np.log(vals * total / (counts[rows] * counts[cols]))
+    positive = pmi > 0
+
+    P = sparse.csr_matrix((pmi[positive].astype(np.float32), (rows[positive], cols[positive])),
+                          shape=C.shape)
+    if dims <= 0:
+        return normalize(P)
+
+    dims = min(dims, P.shape[1] - 1)
+    emb = TruncatedSVD(n_components=dims, random_state=seed).fit_transform(P)
+    return normalize(emb)
+
+
+# ==========================================
+# 3. CLUSTERING
+# ==========================================
+def cluster(emb, algorithm, n_clusters, neighbors=15, seed=0):
+    if algorithm == 'kmeans':
+        model = MiniBatchKMeans(n_clusters=n_clusters, random_state=seed,
+                                batch_size=1024, n_init=10)
+        return model.fit_predict(emb)
+
+    if algorithm == 'agglomerative':
+        if sparse.issparse(emb):
+            raise ValueError("Agglomerative clustering needs --dims > 0.")
+        # A sparse kNN graph keeps the merge search local instead of O(n^2)
+        graph = kneighbors_graph(emb, n_neighbors=min(neighbors, emb.shape[0] - 1),
+                                 include_self=False)
+        model = AgglomerativeClustering(n_clusters=n_clusters, connectivity=graph, linkage='ward')
+        return model.fit_predict(emb)
+
+    raise ValueError(f"Unknown algorithm {algorithm}")
+
+
+# ==========================================
+# 4. CLUSTER -> EMOTION ASSIGNMENT
+# ==========================================
+def assign_emotions(labels, vocab, emb, seeds, max_tags=40):
+    """
+    Names every cluster after the emotion whose seed tags it holds most of
+    (one cluster per emotion first, via the Hungarian method; remaining
+    clusters go to their best emotion). Each emotion keeps its seed tags
+    plus up to max_tags of its clusters' tags closest to the seed centroid.
+    """
+    index = {t.lower(): i for i, t in enumerate(vocab)}
+    emotions = list(seeds)
+    clusters = np.unique(labels)
+
+    score = np.zeros((len(clusters), len(emotions)))
+    for j, emotion in enumerate(emotions):
+        seed_ids = [index[t.lower()] for t in seeds[emotion] if t.lower() in index]
+        for c_pos, c in enumerate(clusters):
+            score[c_pos, j] = np.mean(labels[seed_ids] == c) if seed_ids else 0.0
+
+    owner = {}
+    rows, cols = linear_sum_assignment(-score)
+    for r, c in zip(rows, cols):
+        if score[r, c] > 0:
+            owner[clusters[r]] = emotions[c]
+    for c_pos, c in enumerate(clusters):
+        if c not in owner and score[c_pos].max() > 0:
+            owner[c] = emotions[int(score[c_pos].argmax())]
+
+    dense = emb.toarray() if sparse.issparse(emb) else emb
+    mapping = {}
+    for emotion in emotions:
+        seed_ids = [index[t.lower()] for t in seeds[emotion] if t.lower() in index]
+        members = np.flatnonzero(np.isin(labels, [c for c, e in owner.items() if e == emotion]))
+        if seed_ids and len(members):
+            centroid = dense[seed_ids].mean(axis=0)
+            members = members[np.argsort(-(dense[members] @ centroid))]
+
+        tags = list(seeds[emotion])
+        for i in members:
+            if len(tags) >= len(seeds[emotion]) + max_tags:
+                break
+            if vocab[i] not in tags:
+                tags.append(vocab[i])
+        mapping[emotion] = tags
+
+    return mapping, {int(c): e for c, e in owner.items()}
+
+
+def run(args, tag_lists=None):
+    """Clusters with the CLI options in args; returns (emotion map, report)."""
+    if tag_lists is None:
+        tag_lists = read_tag_lists(args.games, args.column)
+    with open(args.seeds) as f:
+        seeds = json.load(f)
+
+    report = {'column': args.column, 'algorithms': {}}
+
+    started = time.perf_counter()
+    tracemalloc.start()
+    X, vocab = load_tag_matrix(tag_lists, args.min_count)
+    emb = cooccurrence_embeddings(X, args.dims, args.seed)
+    report['embedding'] = {
+        'games': X.shape[0], 'tags': len(vocab), 'dims': int(emb.shape[1]),
+        'seconds': round(time.perf_counter() - started, 3),
+        'peak_mb': round(tracemalloc.get_traced_memory()[1] / 2**20, 2),
+    }
+    tracemalloc.stop()
+    print(f"Embedded {len(vocab)} {args.column} from {X.shape[0]} games.")
+
+    mapping = None
+    for algorithm in args.algorithms.split(','):
+        started = time.perf_counter()
+        tracemalloc.start()
+        labels = cluster(emb, algorithm, args.n_clusters, args.neighbors, args.seed)
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        tag_clusters = {int(c): [vocab[i] for i in np.flatnonzero(labels == c)]
+                        for c in np.unique(labels)}
+        algo_mapping, owners = assign_emotions(labels, vocab, emb, seeds, args.max_tags)
+        report['algorithms'][algorithm] = {
+            'seconds': round(seconds, 3),
+            'peak_mb': round(peak / 2**20, 2),
+            'cluster_sizes': {c: len(t) for c, t in tag_clusters.items()},
+            'cluster_emotions': owners,
+        }
+        print(f"{algorithm}: {seconds:.2f}s, peak {peak / 2**20:.1f} MB")
+        print(tag_clusters)
+
+        if mapping is None:
+            mapping = algo_mapping
+
+    return mapping, report
+
+
+def main():
+    args = parse_args()
+    mapping, report = run(args)
+
+    with open(args.output, 'w') as f:
+        json.dump(mapping, f, indent=4)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved emotion map to {args.output} and report to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
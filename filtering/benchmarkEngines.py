@@ -0,0 +1,231 @@
+"""
+Performance benchmark for every recommendation engine in filtering/.
+
+Each engine runs in a fresh subprocess with FILTERING_DATA_DIR pointing at a
+fixture directory (see generateSyntheticData.py, or a sampled dataset), so
+import/startup time and memory are measured cold. The emotion service is
+stubbed, so only the filtering code is timed. Per engine we record:
+    import_seconds / startup_peak_mb   module import incl. artifact loading
+    p50/p90/p99/mean latency (ms)      per call, after --warmup calls
+    call_peak_mb                       tracemalloc peak across the calls
+    hit_rate                           share of calls returning results
+
+Results are written as JSON; --compare flags regressions against an earlier
+run (e.g. from the previous commit).
+
+Run example:
+    $ python generateSyntheticData.py --users 10000 --output-dir synthetic/10k
+    $ python benchmarkEngines.py --data-dir synthetic/10k --output bench_10k.json
+    $ python benchmarkEngines.py --data-dir synthetic/10k --compare bench_10k.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ENGINES = ['recommendations', 'collaborative', 'hybrid', 'new_user', 'flask_user', 'flask_game']
+
+# Compared metrics and whether lower is better
+METRICS = ['import_seconds', 'startup_peak_mb', 'p50_ms', 'p90_ms', 'p99_ms', 'call_peak_mb']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default=BASE_DIR, help='Fixture artifacts for FILTERING_DATA_DIR.')
+    parser.add_argument('--engines', nargs='*', default=ENGINES, choices=ENGINES)
+    parser.add_argument('--calls', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--emotion', default='happy', help='Emotion returned by the stubbed service.')
+    parser.add_argument('--ranking', help='Sets EMOTION_RANKING (filter/soft) for the run.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON results file.')
+    parser.add_argument('--compare', help='Earlier results file to compare against.')
+    parser.add_argument('--tolerance', type=float, default=1.2,
+                        help='Flag metrics that grew by more than this factor.')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def sample_ids(data_dir, kind, n, seed):
+    """Picks user ids (matrix rows) or game ids from the fixture artifacts."""
+    rng = np.random.default_rng(seed)
+    npz = os.path.join(data_dir, 'user_game_matrix.npz')
+    if os.path.exists(npz):
+        ids = np.load(npz)['user_ids' if kind == 'user' else 'game_ids']
+    elif kind == 'user':
+        import pandas as pd
+        ids = pd.read_pickle(os.path.join(data_dir, 'user_game_matrix.pkl')).index.values
+    else:
+        import pandas as pd
+        ids = pd.read_csv(os.path.join(data_dir, 'steam_games.csv'), usecols=[0]).iloc[:, 0].values
+    return [str(x) for x in rng.choice(ids, size=n, replace=len(ids) < n)]
+
+
+def load_engine(name, emotion):
+    """Imports the engine and returns (callable(id), id kind)."""
+    sys.path.insert(0, BASE_DIR)
+
+    if name == 'collaborative':
+        import collaborativeFiltering
+        return collaborativeFiltering.recommendation, 'user'
+    if name == 'hybrid':
+        import hybridReco
+        return hybridReco.recommendation, 'user'
+    if name == 'new_user':
+        import newUserReco
+        return newUserReco.recommendation, 'game'
+
+    import recommendations
+    from emotionRanking import scores_to_vector
+    recommendations.get_emotion_scores = lambda request_json: (emotion, scores_to_vector(None, emotion))
+
+    if name == 'recommendations':
+        return (lambda uid: recommendations.get_recommendations({}, uid)['games']), 'user'
+
+    import app
+    client = app.app.test_client()
+    route = 'user' if name == 'flask_user' else 'game'
+
+    def call(identifier):
+        response = client.post(f'/recommend/{route}/{identifier}', json={})
+        return response.get_json().get('games') if response.status_code == 200 else None
+    return call, 'user' if route == 'user' else 'game'
+
+
+def has_results(result):
+    if result is None:
+        return False
+    if hasattr(result, 'empty'):
+        return not result.empty
+    return len(result) > 0
+
+
+def run_child(args):
+    """Benchmarks one engine in this process and prints a JSON line."""
+    import contextlib
+    import io
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn, kind = load_engine(args.run, args.emotion)
+    import_seconds = time.perf_counter() - started
+    startup_peak = tracemalloc.get_traced_memory()[1]
+
+    ids = sample_ids(args.data_dir, kind, args.calls + args.warmup, args.seed)
+    latencies, hits = [], 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for identifier in ids[:args.warmup]:
+            fn(identifier)
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        for identifier in ids[args.warmup:]:
+            t0 = time.perf_counter()
+            result = fn(identifier)
+            latencies.append(time.perf_counter() - t0)
+            hits += has_results(result)
+    call_peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    ms = np.array(latencies) * 1000
+    print(json.dumps({
+        'import_seconds': round(import_seconds, 3),
+        'startup_peak_mb': round(startup_peak / 2**20, 1),
+        'calls': len(latencies),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p90_ms': round(float(np.percentile(ms, 90)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2),
+        'mean_ms': round(float(ms.mean()), 2),
+        'call_peak_mb': round(call_peak / 2**20, 1),
+        'hit_rate': round(hits / max(len(latencies), 1), 3),
+    }))
+
+
+def run_engine(name, args, env=None):
+    """Runs one engine in a subprocess; env adds variables such as the engines' cost knobs."""
+    env = dict(os.environ, FILTERING_DATA_DIR=os.path.abspath(args.data_dir), **(env or {}))
+    if args.ranking:
+        env['EMOTION_RANKING'] = args.ranking
+    cmd = [sys.executable, os.path.abspath(__file__), '--run', name, '--data-dir', args.data_dir,
+           '--calls', str(args.calls), '--warmup', str(args.warmup),
+           '--emotion', args.emotion, '--seed', str(args.seed)]
+    proc = subprocess.run(cmd, env=env, cwd=BASE_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline, tolerance):
+    """Prints metric ratios against baseline; returns the list of regressions."""
+    regressions = []
+    for name, result in current['engines'].items():
+        old = baseline.get('engines', {}).get(name)
+        if not old or 'error' in result or 'error' in old:
+            continue
+        for metric in METRICS:
+            if not old.get(metric):
+                continue
+            ratio = result[metric] / old[metric]
+            flag = ' <-- regression' if ratio > tolerance else ''
+            print(f"{name:<16} {metric:<16} {old[metric]:>10} -> {result[metric]:>10} ({ratio:.2f}x){flag}")
+            if flag:
+                regressions.append((name, metric, ratio))
+    return regressions
+
+
+def main():
+    args = parse_args()
+    if args.run:
+        run_child(args)
+        return
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'data_dir': os.path.abspath(args.data_dir),
+            'ranking': args.ranking or os.environ.get('EMOTION_RANKING', 'filter'),
+            'calls': args.calls,
+            'python': platform.python_version(),
+        },
+        'engines': {},
+    }
+    for name in args.engines:
+        results['engines'][name] = result = run_engine(name, args)
+        if 'error' in result:
+            print(f"{name:<16} ❌ {result['error']}")
+        else:
+            print(f"{name:<16} import {result['import_seconds']:>7.2f}s  "
+                  f"p50 {result['p50_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  "
+                  f"peak {result['call_peak_mb']:>7.1f}MB  hits {result['hit_rate']:.0%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Builds the user x game rating matrix offline, without pd.pivot_table.
+
+Reviews are streamed in chunks (JSON lines, .jl.gz or a columnar table from
+steam_scraping/ingest.py), user and game ids are mapped to dense int codes
+and the ratings are accumulated as COO triplets, then converted to CSR.
+Duplicate (user, game) reviews are averaged, like pivot_table's default
+aggfunc, and unreviewed cells stay implicit zeros.
+
+The artifact (user_game_matrix.npz) holds the CSR arrays, the sorted
+user/game ids and a per-cell review count, so a delta of new reviews can be
+merged in with --update instead of rebuilding from the full dump.
+
+Run example:
+    $ python buildUserGameMatrix.py --reviews ../dataset/reviews.jl
+    $ python buildUserGameMatrix.py --reviews new_reviews.jl \
+        --update user_game_matrix.npz
+    $ python buildUserGameMatrix.py --reviews ../dataset/reviews.jl --pickle
+"""
+import argparse
+import json
+import os
+import pickle
+import resource
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(BASE_DIR, '..'))
+from dataio import INT_MISSING, iter_chunks
+
+COLUMNS = ['user_id', 'product_id', 'recommended', 'hours']
+DTYPES = {'user_id': 'int64', 'product_id': 'int64', 'recommended': 'bool', 'hours': 'float32'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', required=True,
+                        help='reviews.jl (or a delta of new reviews) or its columnar table.')
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, 'user_game_matrix.npz'))
+    parser.add_argument('--update', help='Existing artifact to merge --reviews into.')
+    parser.add_argument('--value', default='recommended', choices=['recommended', 'signed', 'hours'],
+                        help='recommended: 1/0 like the notebook pivot; signed: +1/-1; '
+                             'hours: log1p(hours played).')
+    parser.add_argument('--chunk-size', type=int, default=500_000)
+    parser.add_argument('--pickle', nargs='?', const=os.path.join(BASE_DIR, 'user_game_matrix.pkl'),
+                        help='Also write the dense DataFrame pickle read by the serving code.')
+    parser.add_argument('--max-dense-cells', type=float, default=2e8,
+                        help='Refuse --pickle above this many users x games cells.')
+    return parser.parse_args()
+
+
+def rating(chunk, mode):
+    if mode == 'signed':
+        return np.where(chunk['recommended'], 1.0, -1.0).astype(np.float32)
+    if mode == 'hours':
+        hours = np.nan_to_num(chunk['hours'], nan=0.0)
+        return np.log1p(np.clip(hours, 0, None)).astype(np.float32)
+    return chunk['recommended'].astype(np.float32)
+
+
+def read_triplets(path, mode, chunk_size):
+    """Streams the reviews and returns (user_ids, game_ids, values) as flat arrays."""
+    users, games, values = [], [], []
+    for chunk in iter_chunks(path, COLUMNS, chunk_size=chunk_size, dtypes=DTYPES):
+        keep = (chunk['user_id'] != INT_MISSING) & (chunk['product_id'] != INT_MISSING)
+        users.append(chunk['user_id'][keep])
+        games.append(chunk['product_id'][keep])
+        values.append(rating(chunk, mode)[keep])
+
+    if not users:
+        return (np.array([], dtype=np.int64),) * 2 + (np.array([], dtype=np.float32),)
+    return np.concatenate(users), np.concatenate(games), np.concatenate(values)
+
+
+def accumulate(rows, cols, sums, counts, shape):
+    """COO -> CSR, summing duplicates; returns the per-cell mean and count."""
+    total = sparse.coo_matrix((sums, (rows, cols)), shape=shape, dtype=np.float64).tocsr()
+    n = sparse.coo_matrix((counts, (rows, cols)), shape=shape, dtype=np.int64).tocsr()
+    total.sum_duplicates()
+    n.sum_duplicates()
+    total.sort_indices()
+    n.sort_indices()
+    # Both matrices share the same sparsity pattern after summing
+    mean = sparse.csr_matrix((total.data / n.data, total.indices, total.indptr), shape=shape)
+    return mean.astype(np.float32), n.data.astype(np.int32)
+
+
+def build(user_raw, game_raw, values, base=None):
+    """
+    Maps raw ids to dense codes and accumulates the ratings. With base
+    (csr, user_ids, game_ids, counts) the old cells are re-weighted by their
+    review counts so the merged means equal a full rebuild.
+    """
+    sums = values.astype(np.float64)
+    counts = np.ones(len(values), dtype=np.int64)
+
+    if base is not None:
+        old, old_users, old_games, old_counts = base
+        coo = old.tocoo()
+        user_raw = np.concatenate([old_users[coo.row], user_raw])
+        game_raw = np.concatenate([old_games[coo.col], game_raw])
+        sums = np.concatenate([coo.data.astype(np.float64) * old_counts, sums])
+        counts = np.concatenate([old_counts.astype(np.int64), counts])
+
+    user_ids, rows = np.unique(user_raw, return_inverse=True)
+    game_ids, cols = np.unique(game_raw, return_inverse=True)
+    matrix, cell_counts = accumulate(rows, cols, sums, counts, (len(user_ids), len(game_ids)))
+    return matrix, user_ids, game_ids, cell_counts
+
+
+def save(path, matrix, user_ids, game_ids, counts):
+    np.savez(path, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+             shape=np.array(matrix.shape, dtype=np.int64),
+             user_ids=user_ids.astype(np.int64), game_ids=game_ids.astype(np.int64),
+             counts=counts)
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+
+    base = None
+    if args.update:
+        from userGameMatrix import load
+        base = load(args.update)
+        print(f"Merging into {args.update} ({base[0].shape}, {base[0].nnz} ratings)")
+
+    users, games, values = read_triplets(args.reviews, args.value, args.chunk_size)
+    read_seconds = time.perf_counter() - started
+    print(f"Read {len(values)} reviews in {read_seconds:.1f}s.")
+
+    matrix, user_ids, game_ids, counts = build(users, games, values, base)
+    save(args.output, matrix, user_ids, game_ids, counts)
+
+    if args.pickle:
+        cells = float(matrix.shape[0]) * matrix.shape[1]
+        if cells > args.max_dense_cells:
+            print(f"⚠️ Skipping {args.pickle}: {cells:.0f} dense cells > --max-dense-cells")
+        else:
+            import pandas as pd
+            df = pd.DataFrame(matrix.toarray(), index=user_ids, columns=game_ids)
+            with open(args.pickle, 'wb') as f:
+                pickle.dump(df, f)
+            print(f"Saved {args.pickle}")
+
+    report = {
+        'reviews': int(len(values)),
+        'users': int(matrix.shape[0]),
+        'games': int(matrix.shape[1]),
+        'ratings': int(matrix.nnz),
+        'density': round(matrix.nnz / max(float(matrix.shape[0]) * matrix.shape[1], 1.0), 6),
+        'mode': 'update' if base is not None else 'full',
+        'read_seconds': round(read_seconds, 2),
+        'total_seconds': round(time.perf_counter() - started, 2),
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    print(json.dumps(report, indent=2))
+    print(f"Saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import os
+import numpy as np
+
+# ==========================================
+# USER-BASED CF ON A SPARSE MATRIX
+# Same steps as recommendations.get_recommendations (overlap -> Pearson
+# -> weighted average), on a scipy CSR users x games matrix so offline
+# evaluation and benchmarks score users without a dense DataFrame.
+# ==========================================
+# Cost/quality knobs, see testing/sweepParameters.py
+N_OVERLAP_PEERS = int(os.environ.get('CF_OVERLAP_PEERS', 200))       # Candidates kept by co-rated overlap
+MIN_CORRELATION = float(os.environ.get('CF_MIN_CORRELATION', 0.01))  # Peers must correlate above this
+N_TOP_PEERS = int(os.environ.get('CF_TOP_PEERS', 50))                # Peers used for the weighted average
+
+def pearson_rows(rows, target):
+    """Pearson correlation of every row of a dense (n x games) array with target."""
+    rows_c = rows - rows.mean(axis=1, keepdims=True)
+    target_c = target - target.mean()
+    denom = np.sqrt((rows_c ** 2).sum(axis=1) * (target_c ** 2).sum())
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = rows_c @ target_c / denom
+    return np.where(denom > 0, corr, np.nan)
+
+def score_user(matrix, row, n_overlap=N_OVERLAP_PEERS, min_corr=MIN_CORRELATION,
+               n_peers=N_TOP_PEERS, exclude_self=True):
+    """
+    Predicted score of every game (dense float64 array) for matrix row `row`.
+    Returns None when the user has no usable peers.
+    """
+    target = matrix[row].toarray().ravel()
+    overlap = matrix @ target
+    if exclude_self:
+        overlap[row] = 0
+
+    candidates = np.flatnonzero(overlap > 0)
+    if len(candidates) == 0:
+        return None
+    if len(candidates) > n_overlap:
+        # Same ordering as sort_values(ascending=False).head(n)
+        keep = np.argsort(-overlap[candidates], kind='stable')[:n_overlap]
+        candidates = candidates[keep]
+
+    peers = matrix[candidates].toarray()
+    corr = pearson_rows(peers, target)
+    order = np.argsort(-np.nan_to_num(corr, nan=-np.inf), kind='stable')
+    order = order[corr[order] > min_corr][:n_peers]
+    if len(order) == 0:
+        return None
+
+    weights = corr[order]
+    return weights @ peers[order] / (weights.sum() + 1e-9)
@@ -3,26 +3,42 @@ import os
 import pickle
 import sys
 
+import userGameMatrix
+
 # ==========================================
 # 1. LOAD PRE-CALCULATED MATRIX
 # ==========================================
 print("Collaborative Filtering: Initializing...")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get('FILTERING_DATA_DIR', BASE_DIR)
 
 # Dynamic paths to find your pickle file
-MATRIX_PATH = os.path.join(BASE_DIR, 'user_game_matrix.pkl')
-NAMES_PATH  = os.path.join(BASE_DIR, 'game_names.pkl')
+MATRIX_PATH = os.path.join(DATA_DIR, 'user_game_matrix.pkl')
+NAMES_PATH  = os.path.join(DATA_DIR, 'game_names.pkl')
 
 user_game_df = None
 game_names = {}
 
+# Cost/quality knobs, see testing/sweepParameters.py
+N_OVERLAP_PEERS = int(os.environ.get('COLLAB_OVERLAP_PEERS', 1000))
+MIN_CORRELATION = float(os.environ.get('COLLAB_MIN_CORRELATION', 0.1))
+N_TOP_PEERS = int(os.environ.get('COLLAB_TOP_PEERS', 50))
+
 try:
     if os.path.exists(MATRIX_PATH):
         print(f"Loading Matrix from {MATRIX_PATH}...", end=" ")
         with open(MATRIX_PATH, 'rb') as f:
             user_game_df = pickle.load(f)
+        user_game_df.index = user_game_df.index.astype(str)
         print("✅ Done.")
+    elif userGameMatrix.fits_dense():
+        user_game_df = userGameMatrix.to_frame()
+        user_game_df.index = user_game_df.index.astype(str)
+        print(f"Matrix built from {userGameMatrix.SPARSE_PATH}.")
+    elif userGameMatrix.available():
+        print(f"❌ CRITICAL: {userGameMatrix.SPARSE_PATH} is too large to densify "
+              f"(USER_GAME_MAX_DENSE_CELLS={userGameMatrix.MAX_DENSE_CELLS:.0f})")
     else:
         print(f"❌ CRITICAL: user_game_matrix.pkl not found at {MATRIX_PATH}")
         
@@ -56,9 +72,9 @@ def recommendation(user_id):
         played_games = target_user_vec[target_user_vec > 0].index.tolist()
 
         # 2. Find Similar Users (Pearson Correlation)
-        # We limit to top 1000 users with overlap to save time
+        # We limit to top N_OVERLAP_PEERS users with overlap to save time
         overlap = user_game_df.dot(target_user_vec)
-        potential_peers = overlap[overlap > 0].sort_values(ascending=False).head(1000).index
+        potential_peers = overlap[overlap > 0].sort_values(ascending=False).head(N_OVERLAP_PEERS).index
         
         if potential_peers.empty:
             return []
@@ -69,7 +85,7 @@ def recommendation(user_id):
         corr_scores = peers_matrix.T.corrwith(target_user_vec).sort_values(ascending=False)
         
         # Keep positive correlations only
-        top_peers = corr_scores[corr_scores > 0.1].head(50)
+        top_peers = corr_scores[corr_scores > MIN_CORRELATION].head(N_TOP_PEERS)
         
         if top_peers.empty:
             return []
@@ -12,9 +12,11 @@ import gc
 print("Content Filtering: Initializing...")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get('FILTERING_DATA_DIR', BASE_DIR)
 
 # Try to find steam_games.csv
 possible_paths = [
+    os.path.join(DATA_DIR, 'steam_games.csv'),
     os.path.join(BASE_DIR, 'dataset', 'steam_games.csv'),
     os.path.join(BASE_DIR, '..', 'dataset', 'steam_games.csv'),
     r'C:\Users\Praneet\project\dataset\steam_games.csv'
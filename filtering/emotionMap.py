@@ -0,0 +1,66 @@
+import os
+import numpy as np
+
+# ==========================================
+# COMPILED EMOTION MAPPING
+# Built by emotionMapping/buildEmotionMapping.py
+# ==========================================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get('FILTERING_DATA_DIR', BASE_DIR)
+MAPPING_PATH = os.path.join(DATA_DIR, 'emotion_mapping.npz')
+
+EMOTIONS = []
+emotion_to_topic = {}
+topic_to_genre = {}
+emotion_tags = {}
+
+_game_ids = None
+_tag_masks = None
+_genre_masks = None
+
+try:
+    if os.path.exists(MAPPING_PATH):
+        data = np.load(MAPPING_PATH)
+        EMOTIONS = [str(e) for e in data['emotions']]
+        emotion_to_topic = {e: int(t) for e, t in zip(EMOTIONS, data['topics'])}
+        topic_to_genre = {int(t): str(g) for t, g in zip(data['topics'], data['genres'])}
+
+        vocab, indptr, indices = data['tag_vocab'], data['emotion_tag_indptr'], data['emotion_tag_indices']
+        for i, e in enumerate(EMOTIONS):
+            emotion_tags[e] = [str(t) for t in vocab[indices[indptr[i]:indptr[i + 1]]]]
+
+        _game_ids = data['game_ids']
+        _tag_masks = data['game_tag_masks']
+        _genre_masks = data['game_genre_masks']
+        print(f"✅ Emotion Mapping Loaded: {len(_game_ids)} games, {len(EMOTIONS)} emotions")
+except Exception as e:
+    print(f"⚠️ Emotion Mapping Load Error: {e}")
+
+def available():
+    return _game_ids is not None
+
+def _to_int(x):
+    try: return int(float(str(x)))
+    except: return -1
+
+def game_masks(game_ids):
+    """
+    Returns (tag_masks, genre_masks) uint8 arrays aligned with game_ids.
+    Bit i is set when the game matches EMOTIONS[i]. Games missing from the
+    artifact match everything, like untagged games in the old filter.
+    """
+    all_bits = np.uint8((1 << len(EMOTIONS)) - 1)
+    ids = np.array([_to_int(g) for g in game_ids], dtype=np.int64)
+    tag_out = np.full(len(ids), all_bits, dtype=np.uint8)
+    genre_out = np.full(len(ids), all_bits, dtype=np.uint8)
+    if len(_game_ids) == 0:
+        return tag_out, genre_out
+
+    pos = np.clip(np.searchsorted(_game_ids, ids), 0, len(_game_ids) - 1)
+    found = _game_ids[pos] == ids
+    tag_out[found] = _tag_masks[pos[found]]
+    genre_out[found] = _genre_masks[pos[found]]
+    return tag_out, genre_out
+
+def emotion_bit(emotion):
+    return np.uint8(1 << EMOTIONS.index(emotion)) if emotion in EMOTIONS else None
@@ -0,0 +1,161 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+import emotionMap
+
+# ==========================================
+# 1. EMOTION ORDER & MAPPINGS
+# ==========================================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get('FILTERING_DATA_DIR', BASE_DIR)
+
+def _data_path(name):
+    # Prefer the data dir; the checked-in mappings are the fallback
+    path = os.path.join(DATA_DIR, name)
+    return path if os.path.exists(path) else os.path.join(BASE_DIR, name)
+
+TOPIC_PATH = _data_path('emotion_to_topic.json')
+GENRE_PATH = _data_path('emotion_to_genre.json')
+
+# Ranking mode: 'filter' keeps the hard tag filter, 'soft' blends scores
+RANKING_MODE = os.environ.get('EMOTION_RANKING', 'filter').lower()
+
+# Share of the final score that comes from the emotion affinity
+EMOTION_WEIGHT = float(os.environ.get('EMOTION_WEIGHT', 0.5))
+
+# Same weighting between the mapping sources for every emotion
+TAG_WEIGHT = 0.7
+GENRE_WEIGHT = 0.3
+
+# Used instead when the offline LDA topic matrix is available
+TOPIC_WEIGHTS = {'tag': 0.5, 'genre': 0.2, 'topic': 0.3}
+
+def _load_json(path, default):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not read {path}: {e}")
+        return default
+
+emotion_to_topic = _load_json(TOPIC_PATH, {
+    'neutral': 0, 'surprise': 1, 'fear': 2, 'sad': 3,
+    'disgust': 4, 'happy': 5, 'angry': 6
+})
+emotion_to_genre = _load_json(GENRE_PATH, {})
+
+# Column i of every affinity matrix is the emotion mapped to topic i
+EMOTIONS = sorted(emotion_to_topic, key=emotion_to_topic.get)
+EMOTION_INDEX = {e: i for i, e in enumerate(EMOTIONS)}
+
+# ==========================================
+# 2. HELPER FUNCTIONS
+# ==========================================
+def scores_to_vector(scores, dominant="neutral"):
+    """
+    Turns the emotion service's {label: probability} dict into a vector
+    ordered like EMOTIONS. Falls back to a one-hot of the dominant label.
+    """
+    vec = np.zeros(len(EMOTIONS), dtype=np.float32)
+
+    if isinstance(scores, dict):
+        for label, prob in scores.items():
+            idx = EMOTION_INDEX.get(str(label).lower())
+            if idx is not None:
+                try: vec[idx] = float(prob)
+                except (TypeError, ValueError): pass
+
+    total = vec.sum()
+    if total <= 0:
+        vec[EMOTION_INDEX.get(dominant, EMOTION_INDEX['neutral'])] = 1.0
+        return vec
+    return vec / total
+
+def build_affinity_matrix(game_ids, id_to_tags, tag_map, topic_rows=None):
+    """
+    Returns a float32 (games x emotions) matrix aligned with game_ids.
+
+    A game scores TAG_WEIGHT for an emotion when one of its EMOTION_TAG_MAP
+    tags appears in the game's tags (same substring test as the hard filter)
+    and GENRE_WEIGHT when one of the emotion_to_genre.json genres does.
+    topic_rows, the (games x topics) LDA probabilities from gameTopics, adds
+    the probability of the emotion's topic. Neutral and untagged games get
+    full affinity, mirroring the filter.
+
+    When emotionMap's compiled artifact is present, tag and genre hits are
+    read from its per-game bitmasks instead of matching strings.
+    """
+    weights = TOPIC_WEIGHTS if topic_rows is not None else {'tag': TAG_WEIGHT, 'genre': GENRE_WEIGHT}
+
+    if emotionMap.available():
+        tag_masks, genre_masks = emotionMap.game_masks(game_ids)
+        affinity = np.zeros((len(tag_masks), len(EMOTIONS)), dtype=np.float32)
+        for emotion, col in EMOTION_INDEX.items():
+            bit = emotionMap.emotion_bit(emotion)
+            if bit is None:
+                continue
+            affinity[:, col] = (weights['tag'] * ((tag_masks & bit) != 0)
+                                + weights['genre'] * ((genre_masks & bit) != 0))
+            if topic_rows is not None:
+                affinity[:, col] += weights['topic'] * topic_rows[:, emotion_to_topic[emotion]]
+        affinity[:, EMOTION_INDEX['neutral']] = 1.0
+        return affinity
+
+    def safe_id(x):
+        try: return int(float(str(x)))
+        except: return 0
+
+    tags = pd.Series([id_to_tags.get(safe_id(g), "") for g in game_ids], dtype=object)
+    tags = tags.fillna("").astype(str).str.lower()
+
+    affinity = np.zeros((len(tags), len(EMOTIONS)), dtype=np.float32)
+
+    def any_match(words):
+        hit = np.zeros(len(tags), dtype=bool)
+        for word in words:
+            word = word.strip().lower()
+            if word:
+                hit |= tags.str.contains(word, regex=False).values
+        return hit
+
+    for emotion, col in EMOTION_INDEX.items():
+        genres = str(emotion_to_genre.get(emotion, "")).split('/')
+        affinity[:, col] = (weights['tag'] * any_match(tag_map.get(emotion, []))
+                            + weights['genre'] * any_match(genres))
+        if topic_rows is not None:
+            # Columns follow emotion_to_topic.json, so column i is topic i
+            affinity[:, col] += weights['topic'] * topic_rows[:, emotion_to_topic[emotion]]
+
+    affinity[:, EMOTION_INDEX['neutral']] = 1.0
+    affinity[(tags == "").values, :] = 1.0
+    return affinity
+
+def rank_candidates(scores, affinity, emotion_vec, exclude=None, top_n=8):
+    """
+    Blends collaborative scores with the emotion affinity in one mat-vec
+    and returns the positions of the top_n games, best first.
+
+    scores, affinity rows and exclude must share the same game order.
+    """
+    scores = np.nan_to_num(np.asarray(scores, dtype=np.float32))
+    peak = scores.max() if scores.size else 0.0
+    if peak > 0:
+        scores = scores / peak
+
+    emotion_score = affinity @ emotion_vec
+    final = (1.0 - EMOTION_WEIGHT) * scores + EMOTION_WEIGHT * emotion_score
+
+    # Only games the peers actually rated can be recommended
+    final[scores <= 0] = -np.inf
+    if exclude is not None:
+        final[np.asarray(exclude, dtype=bool)] = -np.inf
+
+    valid = int(np.isfinite(final).sum())
+    top_n = min(top_n, valid)
+    if top_n <= 0:
+        return np.array([], dtype=np.int64)
+
+    top = np.argpartition(-final, top_n - 1)[:top_n]
+    return top[np.argsort(-final[top])]
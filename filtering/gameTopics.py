@@ -0,0 +1,52 @@
+import os
+import numpy as np
+
+# ==========================================
+# PRECOMPUTED GAME -> TOPIC MATRIX
+# Built offline by topic_modeling/buildGameTopics.py
+# ==========================================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get('FILTERING_DATA_DIR', BASE_DIR)
+TOPICS_PATH = os.path.join(DATA_DIR, 'game_topics.npz')
+
+# Same cut-off gensim applies in lda_model[bow]
+MIN_TOPIC_PROB = 0.01
+
+topic_ids = None     # Sorted int64 game ids
+topic_matrix = None  # float32 (games x topics), rows aligned with topic_ids
+
+try:
+    if os.path.exists(TOPICS_PATH):
+        data = np.load(TOPICS_PATH)
+        topic_ids, topic_matrix = data['ids'], data['topics']
+        print(f"✅ Game Topics Loaded: {topic_matrix.shape}")
+except Exception as e:
+    print(f"⚠️ Game Topics Load Error: {e}")
+
+def available():
+    return topic_matrix is not None
+
+def _to_int(x):
+    try: return int(float(str(x)))
+    except: return -1
+
+def topic_rows(game_ids):
+    """
+    Returns the topic probability rows for game_ids, in the same order.
+    Unknown games get an all-zero row.
+    """
+    ids = np.array([_to_int(g) for g in game_ids], dtype=np.int64)
+    out = np.zeros((len(ids), topic_matrix.shape[1]), dtype=np.float32)
+    if len(topic_ids) == 0:
+        return out
+
+    pos = np.clip(np.searchsorted(topic_ids, ids), 0, len(topic_ids) - 1)
+    found = topic_ids[pos] == ids
+    out[found] = topic_matrix[pos[found]]
+    return out
+
+def topic_list(game_id):
+    """Topic indices above MIN_TOPIC_PROB, most likely first (like map_tags_to_topics)."""
+    row = topic_rows([game_id])[0]
+    order = np.argsort(-row)
+    return [int(t) for t in order if row[t] >= MIN_TOPIC_PROB]
@@ -0,0 +1,196 @@
+"""
+Generates synthetic filtering/ artifacts at production-like scale, so the
+recommenders can be benchmarked offline (10k - 1M users, ~50k games).
+
+Writes to --output-dir:
+    steam_games.csv         AppID, Name, Release date, Tags, Genres
+    user_list.csv           internal id -> 17 digit Steam id
+    user_game_matrix.npz    sparse ratings (same layout as buildUserGameMatrix.py)
+    user_game_matrix.pkl    dense DataFrame, only while it fits --max-dense-cells
+    game_names.pkl          {app id: name}
+
+Game popularity and tag frequencies follow Zipf (power-law) distributions,
+review counts per user are heavy-tailed, and every user leans towards one
+taste segment, so collaborative filtering finds real peer structure.
+
+Run example:
+    $ python generateSyntheticData.py --users 100000 --games 50000 \
+        --output-dir synthetic/100k
+"""
+import argparse
+import csv
+import json
+import os
+import pickle
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from scipy import sparse
+
+from buildUserGameMatrix import save
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Real Steam tags first, so the emotion tag maps have something to match
+BASE_TAGS = [
+    "Indie", "Action", "Adventure", "Casual", "Simulation", "Strategy", "RPG",
+    "Singleplayer", "Early Access", "Free to Play", "2D", "Atmospheric", "Puzzle",
+    "Story Rich", "Multiplayer", "Sports", "Racing", "Open World", "Horror",
+    "Survival", "Shooter", "FPS", "Fighting", "Sci-fi", "Space", "Mystery",
+    "Visual Novel", "Drama", "Zombies", "Survival Horror", "Psychological Horror",
+    "City Builder", "Card Game", "Cyberpunk", "Futuristic", "War", "Gore", "Dark",
+    "Pixel Graphics", "Platformer", "Anime", "Fantasy", "Co-op", "Retro",
+]
+GENRES = ["Action", "Adventure", "Casual", "Indie", "RPG", "Simulation",
+          "Strategy", "Sports", "Racing", "Free to Play", "Massively Multiplayer"]
+STEAM_ID_BASE = 76561197960265728
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--games', type=int, default=50000)
+    parser.add_argument('--tags', type=int, default=400, help='Tag vocabulary size.')
+    parser.add_argument('--tags-per-game', type=int, default=8, help='Mean tags per game.')
+    parser.add_argument('--reviews-per-user', type=float, default=12, help='Mean reviews per user.')
+    parser.add_argument('--max-reviews-per-user', type=int, default=2000)
+    parser.add_argument('--popularity-exponent', type=float, default=1.1,
+                        help='Zipf exponent of game popularity.')
+    parser.add_argument('--tag-exponent', type=float, default=1.0,
+                        help='Zipf exponent of tag frequency.')
+    parser.add_argument('--segments', type=int, default=20, help='Number of taste segments.')
+    parser.add_argument('--segment-affinity', type=float, default=0.6,
+                        help='Share of a user\'s reviews drawn from their own segment.')
+    parser.add_argument('--batch-users', type=int, default=50000)
+    parser.add_argument('--max-dense-cells', type=float, default=2e8,
+                        help='Skip user_game_matrix.pkl above this many cells.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', default=os.path.join(BASE_DIR, 'synthetic'))
+    return parser.parse_args()
+
+
+def zipf_weights(n, exponent):
+    w = 1.0 / np.arange(1, n + 1) ** exponent
+    return w / w.sum()
+
+
+def make_games(args, rng):
+    """Returns (app_ids, names, tags per game, segment per game, popularity)."""
+    app_ids = np.sort(rng.choice(np.arange(10, 10 * args.games * 4, 10), args.games, replace=False))
+    names = [f"Synthetic Game {i}" for i in range(args.games)]
+
+    vocab = (BASE_TAGS + [f"Tag {i}" for i in range(len(BASE_TAGS), args.tags)])[:args.tags]
+    tag_p = zipf_weights(len(vocab), args.tag_exponent)
+    n_tags = np.clip(rng.poisson(args.tags_per_game, args.games), 1, len(vocab))
+    tags = [[vocab[t] for t in rng.choice(len(vocab), k, replace=False, p=tag_p)] for k in n_tags]
+
+    popularity = zipf_weights(args.games, args.popularity_exponent)
+    popularity = popularity[rng.permutation(args.games)]  # Popularity independent of id
+    segments = rng.integers(args.segments, size=args.games)
+    return app_ids, names, tags, segments, popularity
+
+
+def write_games(path, app_ids, names, tags, rng):
+    start = date(2005, 1, 1)
+    days = rng.integers(0, 365 * 19, size=len(app_ids))
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['AppID', 'Name', 'Release date', 'Tags', 'Genres'])
+        for app_id, name, game_tags, d in zip(app_ids, names, tags, days):
+            genres = [g for g in game_tags if g in GENRES] or ['Indie']
+            released = (start + timedelta(days=int(d))).strftime('%b %d, %Y')
+            writer.writerow([int(app_id), name, released, ','.join(game_tags), ','.join(genres)])
+
+
+def sample_interactions(args, rng, segments, popularity):
+    """Yields (rows, cols, values) per batch of users."""
+    cdf = np.cumsum(popularity)
+    order = np.argsort(segments, kind='stable')
+    bounds = np.searchsorted(segments[order], np.arange(args.segments + 1))
+    seg_games = [order[bounds[s]:bounds[s + 1]] for s in range(args.segments)]
+    seg_cdf = [np.cumsum(popularity[g]) / popularity[g].sum() if len(g) else None for g in seg_games]
+    # Games with a higher like-rate stay popular among the users who play them
+    like_rate = rng.beta(4, 1.5, size=len(popularity))
+
+    for first in range(0, args.users, args.batch_users):
+        n_users = min(args.batch_users, args.users - first)
+        # Heavy-tailed review counts (lognormal) with the requested mean
+        counts = rng.lognormal(np.log(args.reviews_per_user) - 0.5, 1.0, size=n_users)
+        counts = np.clip(counts.round().astype(np.int64), 1, args.max_reviews_per_user)
+        rows = np.repeat(np.arange(first, first + n_users), counts)
+        user_seg = np.repeat(rng.integers(args.segments, size=n_users), counts)
+
+        cols = np.searchsorted(cdf, rng.random(len(rows)) * cdf[-1])
+        own = rng.random(len(rows)) < args.segment_affinity
+        for s in range(args.segments):
+            pick = own & (user_seg == s)
+            if seg_cdf[s] is not None and pick.any():
+                cols[pick] = seg_games[s][np.searchsorted(seg_cdf[s], rng.random(int(pick.sum())))]
+        cols = np.minimum(cols, len(popularity) - 1)
+
+        # One review per (user, game)
+        keys = np.unique(rows * len(popularity) + cols)
+        rows, cols = keys // len(popularity), keys % len(popularity)
+        values = (rng.random(len(rows)) < like_rate[cols]).astype(np.float32)
+        yield rows, cols, values
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    rng = np.random.default_rng(args.seed)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    app_ids, names, tags, segments, popularity = make_games(args, rng)
+    write_games(os.path.join(args.output_dir, 'steam_games.csv'), app_ids, names, tags, rng)
+    with open(os.path.join(args.output_dir, 'game_names.pkl'), 'wb') as f:
+        pickle.dump({int(a): n for a, n in zip(app_ids, names)}, f)
+
+    steam_ids = STEAM_ID_BASE + np.sort(rng.choice(10 ** 9, args.users, replace=False))
+    with open(os.path.join(args.output_dir, 'user_list.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['', 'user list'])
+        writer.writerows(zip(range(args.users), steam_ids.tolist()))
+
+    parts = list(sample_interactions(args, rng, segments, popularity))
+    rows = np.concatenate([p[0] for p in parts])
+    cols = np.concatenate([p[1] for p in parts])
+    values = np.concatenate([p[2] for p in parts])
+    shape = (args.users, args.games)
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=shape, dtype=np.float32)
+    matrix.sort_indices()
+
+    # Matrix rows are the internal ids of user_list.csv, columns the AppIDs
+    user_ids = np.arange(args.users, dtype=np.int64)
+    save(os.path.join(args.output_dir, 'user_game_matrix.npz'), matrix, user_ids,
+         app_ids, np.ones(matrix.nnz, dtype=np.int32))
+
+    cells = float(shape[0]) * shape[1]
+    if cells <= args.max_dense_cells:
+        import pandas as pd
+        # String index like the old pivot_table pickle; collaborativeFiltering
+        # looks users up by str(user_id)
+        df = pd.DataFrame(matrix.toarray(), index=user_ids.astype(str), columns=app_ids)
+        with open(os.path.join(args.output_dir, 'user_game_matrix.pkl'), 'wb') as f:
+            pickle.dump(df, f)
+    else:
+        print(f"⚠️ Skipping user_game_matrix.pkl: {cells:.0f} dense cells > --max-dense-cells")
+
+    report = {
+        'users': args.users,
+        'games': args.games,
+        'ratings': int(matrix.nnz),
+        'positive_share': round(float(matrix.data.mean()), 3) if matrix.nnz else 0.0,
+        'top_1pct_games_share': round(float(np.sort(np.bincount(cols, minlength=args.games))[::-1]
+                                            [:max(args.games // 100, 1)].sum() / max(len(cols), 1)), 3),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    with open(os.path.join(args.output_dir, 'synthetic_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Saved synthetic data to {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
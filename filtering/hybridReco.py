@@ -13,12 +13,14 @@ except ImportError:
     def collaborative(id): return []
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get('FILTERING_DATA_DIR', BASE_DIR)
 
 # 1. LOAD GAME METADATA (For Titles)
 games_df = pd.DataFrame()
 try:
     # Use the same path logic as other files
     possible_paths = [
+        os.path.join(DATA_DIR, 'steam_games.csv'),
         os.path.join(BASE_DIR, 'dataset', 'steam_games.csv'),
         os.path.join(BASE_DIR, '..', 'dataset', 'steam_games.csv'),
         r'C:\Users\Praneet\project\dataset\steam_games.csv'
@@ -41,7 +43,7 @@ def get_steam_id(user_input):
     """Maps Internal ID -> Steam ID using user_list.csv"""
     user_input = str(user_input).split('.')[0]
     
-    map_path = os.path.join(BASE_DIR, 'user_list.csv')
+    map_path = os.path.join(DATA_DIR, 'user_list.csv')
     if os.path.exists(map_path):
         try:
             # Load user map: internal_id, steam_id
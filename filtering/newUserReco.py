@@ -2,12 +2,13 @@ import pandas as pd
 import sys
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-from gensim.corpora import Dictionary
 import pickle
 import ast
 import os
 import math
 
+import gameTopics
+
 # ==========================================
 # 1. ROBUST DATA LOADING
 # ==========================================
@@ -24,10 +25,15 @@ def clean_id_to_string(value):
 
 # Get current directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get('FILTERING_DATA_DIR', BASE_DIR)
+
+# Tag vocabulary kept for similarity, see testing/sweepParameters.py
+TOP_TAGS = int(os.environ.get('NEWUSER_TOP_TAGS', 100))
 
 def load_games_dataset():
     """Finds the steam_games file dynamically"""
     paths_to_try = [
+        os.path.join(DATA_DIR, 'steam_games.csv'),
         os.path.join(BASE_DIR, 'dataset', 'steam_games.csv'),
         os.path.join(BASE_DIR, '..', 'dataset', 'steam_games.csv'),
         r'C:\Users\Praneet\project\dataset\steam_games.csv'
@@ -67,17 +73,23 @@ else:
 # ==========================================
 
 # LDA Loading (Optional - handled safely)
-dictionary = Dictionary()
+# Only needed when game_topics.npz has not been built; gensim is imported
+# lazily so the web process does not pay for it otherwise.
+dictionary = None
 lda_model = None
-try:
-    dict_path = os.path.join(BASE_DIR, 'lda_dict.dict')
-    model_path = os.path.join(BASE_DIR, 'lda_model.pkl')
-    if os.path.exists(dict_path) and os.path.exists(model_path):
-        dictionary = Dictionary.load(dict_path)
-        with open(model_path, "rb") as f:
-            lda_model = pickle.load(f)
-except:
-    pass
+if not gameTopics.available():
+    try:
+        # Checked-in model unless the data dir has its own
+        lda_dir = DATA_DIR if os.path.exists(os.path.join(DATA_DIR, 'lda_model.pkl')) else BASE_DIR
+        dict_path = os.path.join(lda_dir, 'lda_dict.dict')
+        model_path = os.path.join(lda_dir, 'lda_model.pkl')
+        if os.path.exists(dict_path) and os.path.exists(model_path):
+            from gensim.corpora import Dictionary
+            dictionary = Dictionary.load(dict_path)
+            with open(model_path, "rb") as f:
+                lda_model = pickle.load(f)
+    except:
+        pass
 
 def map_tags_to_topics(unseen_game_tag):
     if lda_model is None: return []
@@ -128,13 +140,13 @@ def recommendation(steam_id):
     # 3. MEMORY FIX: Limit to Top N Tags
     # We explode to count all tags
     all_tags = game_df.explode('tags_list')
-    top_tags = all_tags['tags_list'].value_counts().head(100).index.tolist() # Keep only top 100
+    top_tags = all_tags['tags_list'].value_counts().head(TOP_TAGS).index.tolist() # Keep only top N
     
     # Filter dataset to only these tags
     game_df_exploded = all_tags[all_tags['tags_list'].isin(top_tags)]
     
     # 4. Create Matrix (One-Hot)
-    # This matrix will now be (Games x 100) instead of (Games x 67000)
+    # This matrix will now be (Games x TOP_TAGS) instead of (Games x 67000)
     one_hot = pd.get_dummies(game_df_exploded['tags_list'])
     
     # Group back by ID
@@ -163,8 +175,11 @@ def recommendation(steam_id):
     final_results = sim_df.merge(game_df_original, left_index=True, right_on='id')
     final_results = final_results.rename(columns={'id': 'product_id', 'similarity': 'weighted_avg'})
     
-    # Add Topics
-    final_results['topics'] = final_results['tags'].apply(map_tags_to_topics)
+    # Add Topics (array lookup when the offline topic matrix exists)
+    if gameTopics.available():
+        final_results['topics'] = final_results['product_id'].apply(gameTopics.topic_list)
+    else:
+        final_results['topics'] = final_results['tags'].apply(map_tags_to_topics)
     
     cols = ['product_id', 'weighted_avg', 'title', 'tags', 'topics']
     return final_results[cols]
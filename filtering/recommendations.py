@@ -6,18 +6,28 @@ import pickle
 import traceback
 import numpy as np
 
+import emotionMap
+import gameTopics
+import userGameMatrix
+from cfScorer import MIN_CORRELATION, N_OVERLAP_PEERS, N_TOP_PEERS
+from emotionRanking import (RANKING_MODE, build_affinity_matrix,
+                            rank_candidates, scores_to_vector)
+
 # =========================================
 # 1. CONFIGURATION & PATHS
 # =========================================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Artifacts can be pointed elsewhere (e.g. synthetic benchmark fixtures)
+DATA_DIR = os.environ.get('FILTERING_DATA_DIR', BASE_DIR)
 
 # DYNAMIC PATHS
-MATRIX_PATH = os.path.join(BASE_DIR, 'user_game_matrix.pkl')
-NAMES_PATH  = os.path.join(BASE_DIR, 'game_names.pkl')
-USER_MAP_PATH = os.path.join(BASE_DIR, 'user_list.csv')
+MATRIX_PATH = os.path.join(DATA_DIR, 'user_game_matrix.pkl')
+NAMES_PATH  = os.path.join(DATA_DIR, 'game_names.pkl')
+USER_MAP_PATH = os.path.join(DATA_DIR, 'user_list.csv')
 
 # Find the Dataset
 possible_csv_paths = [
+    os.path.join(DATA_DIR, 'steam_games.csv'),
     os.path.join(BASE_DIR, 'dataset', 'steam_games.csv'),       
     os.path.join(BASE_DIR, '..', 'dataset', 'steam_games.csv'), 
     os.path.join(BASE_DIR, 'steam_games.csv'),
@@ -38,6 +48,15 @@ EMOTION_TAG_MAP = {
     "disgust": ["Gore", "Horror", "Dark"]
 }
 
+# Data-driven map written by emotionMapping/clusterTags.py (if built)
+EMOTION_TAGS_PATH = os.path.join(DATA_DIR, 'emotion_to_tags.json')
+try:
+    if os.path.exists(EMOTION_TAGS_PATH):
+        with open(EMOTION_TAGS_PATH, 'r') as f:
+            EMOTION_TAG_MAP.update(json.load(f))
+except Exception as e:
+    print(f"⚠️ Emotion Tag Map Error: {e}")
+
 # =========================================
 # 2. LOAD DATA
 # =========================================
@@ -61,6 +80,12 @@ try:
         if not user_game_df.empty:
             valid_ids = user_game_df.index.tolist()
             print(f"   💡 VALID USER IDs IN MATRIX (Try these): {valid_ids[:10]} ...")
+    elif userGameMatrix.fits_dense():
+        user_game_df = userGameMatrix.to_frame()
+        print(f"✅ Matrix built from {userGameMatrix.SPARSE_PATH}. Shape: {user_game_df.shape}")
+    elif userGameMatrix.available():
+        print(f"❌ CRITICAL: {userGameMatrix.SPARSE_PATH} is too large to densify "
+              f"(USER_GAME_MAX_DENSE_CELLS={userGameMatrix.MAX_DENSE_CELLS:.0f})")
     else:
         print(f"❌ CRITICAL: Matrix not found at {MATRIX_PATH}")
 except Exception as e:
@@ -137,16 +162,46 @@ try:
 except Exception as e:
     print(f"❌ CSV Load Error: {e}")
 
+# E. Precompute Game x Emotion Affinity & Masks (aligned with matrix columns)
+game_affinity = None
+game_tag_masks = None
+try:
+    if user_game_df is not None and emotionMap.available():
+        game_tag_masks, _ = emotionMap.game_masks(user_game_df.columns)
+        print(f"✅ Compiled Emotion Masks Ready ({len(game_tag_masks)} games).")
+
+    if user_game_df is not None:
+        print("Building Emotion Affinity...", end=" ")
+        topic_rows = gameTopics.topic_rows(user_game_df.columns) if gameTopics.available() else None
+        game_affinity = build_affinity_matrix(user_game_df.columns, id_to_tags, EMOTION_TAG_MAP, topic_rows)
+        print(f"✅ Done. Shape: {game_affinity.shape} | Ranking Mode: {RANKING_MODE}")
+except Exception as e:
+    print(f"⚠️ Affinity Build Error: {e}")
+
 # =========================================
 # 3. HELPER FUNCTIONS
 # =========================================
-def get_emotion(request_json):
+def get_emotion_scores(request_json):
+    """Returns (dominant emotion, probability vector ordered like EMOTIONS)."""
     try:
         response = rq.post(EMOTION_URL, json=request_json, timeout=1)
         if response.status_code == 200:
-            return response.json().get('emotion', 'neutral').lower()
+            payload = response.json()
+            emotion = payload.get('emotion', 'neutral').lower()
+            return emotion, scores_to_vector(payload.get('scores'), emotion)
     except: pass
-    return "neutral"
+    return "neutral", scores_to_vector(None)
+
+def get_emotion(request_json):
+    return get_emotion_scores(request_json)[0]
+
+def to_game(pid):
+    pid_int = int(pid)
+    return {
+        "title": id_to_name.get(pid_int, f"Unknown Game ({pid})"),
+        "release_date": id_to_date.get(pid_int, "Unknown Date"),
+        "product_id": pid
+    }
 
 def check_tags_match(game_tags_str, target_tags):
     if not isinstance(game_tags_str, str) or not game_tags_str: return False
@@ -159,7 +214,7 @@ def check_tags_match(game_tags_str, target_tags):
 # 4. CORE COLLABORATIVE LOGIC
 # =========================================
 def get_recommendations(request_json, identifier, is_user=True):
-    emotion = get_emotion(request_json)
+    emotion, emotion_vec = get_emotion_scores(request_json)
     print(f"\n--- REQUEST: User={identifier} | Emotion={emotion} ---")
     
     target_tags = EMOTION_TAG_MAP.get(emotion, EMOTION_TAG_MAP["neutral"])
@@ -193,17 +248,39 @@ def get_recommendations(request_json, identifier, is_user=True):
         played_games = target_vec[target_vec > 0].index.tolist()
         
         overlap = user_game_df.dot(target_vec)
-        potential_peers = overlap[overlap > 0].sort_values(ascending=False).head(200).index
+        potential_peers = overlap[overlap > 0].sort_values(ascending=False).head(N_OVERLAP_PEERS).index
         
         if not potential_peers.empty:
             peers_matrix = user_game_df.loc[potential_peers]
             corr = peers_matrix.T.corrwith(target_vec).sort_values(ascending=False)
-            top_peers = corr[corr > 0.01].head(50) 
+            top_peers = corr[corr > MIN_CORRELATION].head(N_TOP_PEERS)
             
             if not top_peers.empty:
                 weighted_ratings = peers_matrix.loc[top_peers.index].mul(top_peers, axis=0).sum(axis=0)
                 final_scores = weighted_ratings / (top_peers.sum() + 1e-9)
                 
+            if not top_peers.empty and RANKING_MODE == 'soft' and game_affinity is not None:
+                # SOFT RANKING: one mat-vec over all games, then take the top 8
+                top = rank_candidates(final_scores.values, game_affinity, emotion_vec,
+                                      exclude=(target_vec.values > 0), top_n=8)
+                print(f"DEBUG: Soft ranking picked {len(top)} games.")
+
+                recommendations = [to_game(final_scores.index[pos]) for pos in top]
+
+            elif not top_peers.empty and game_tag_masks is not None:
+                # COMPILED FILTER: precomputed per-game emotion bits, no string matching
+                allowed = ~(target_vec.values > 0)
+                bit = emotionMap.emotion_bit(emotion)
+                if emotion != "neutral" and bit is not None:
+                    allowed &= (game_tag_masks & bit) != 0
+
+                order = np.argsort(-final_scores.values, kind='stable')
+                picks = order[allowed[order]][:8]
+                print(f"DEBUG: Compiled filter kept {int(allowed.sum())} of {len(order)} games.")
+
+                recommendations = [to_game(final_scores.index[pos]) for pos in picks]
+
+            elif not top_peers.empty:
                 # --- FIX: LIST CAST TO PREVENT ZIP ERROR ---
                 candidates = list(final_scores.sort_values(ascending=False).items())
                 # -------------------------------------------
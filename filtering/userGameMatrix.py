@@ -0,0 +1,57 @@
+import os
+import numpy as np
+
+# ==========================================
+# SPARSE USER x GAME MATRIX
+# Built offline by filtering/buildUserGameMatrix.py
+# ==========================================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get('FILTERING_DATA_DIR', BASE_DIR)
+SPARSE_PATH = os.path.join(DATA_DIR, 'user_game_matrix.npz')
+# to_frame() refuses to densify more cells than this (same default as the
+# --max-dense-cells of buildUserGameMatrix.py)
+MAX_DENSE_CELLS = float(os.environ.get('USER_GAME_MAX_DENSE_CELLS', 2e8))
+
+user_ids = None  # Sorted int64 user ids (matrix rows)
+game_ids = None  # Sorted int64 game ids (matrix columns)
+matrix = None    # scipy CSR float32 (users x games)
+
+def load(path):
+    """Returns (csr, user_ids, game_ids, counts) from a built artifact."""
+    from scipy import sparse
+
+    data = np.load(path)
+    shape = tuple(int(x) for x in data['shape'])
+    csr = sparse.csr_matrix((data['data'], data['indices'], data['indptr']), shape=shape)
+    return csr, data['user_ids'], data['game_ids'], data['counts']
+
+try:
+    if os.path.exists(SPARSE_PATH):
+        matrix, user_ids, game_ids, _ = load(SPARSE_PATH)
+        print(f"✅ Sparse User-Game Matrix Loaded: {matrix.shape}, {matrix.nnz} ratings")
+except Exception as e:
+    print(f"⚠️ Sparse Matrix Load Error: {e}")
+
+def available():
+    return matrix is not None
+
+def user_row(user_id):
+    """Row index of user_id, or None when the user is not in the matrix."""
+    try: uid = int(float(str(user_id)))
+    except: return None
+    pos = int(np.searchsorted(user_ids, uid))
+    if pos < len(user_ids) and user_ids[pos] == uid:
+        return pos
+    return None
+
+def fits_dense(max_cells=MAX_DENSE_CELLS):
+    return matrix is not None and float(matrix.shape[0]) * matrix.shape[1] <= max_cells
+
+def to_frame(max_cells=MAX_DENSE_CELLS):
+    """Dense DataFrame with the layout of the old pivot_table pickle (0 = not reviewed)."""
+    import pandas as pd
+
+    if not fits_dense(max_cells):
+        raise ValueError(f"{matrix.shape[0]} x {matrix.shape[1]} matrix is too large to densify "
+                         f"(USER_GAME_MAX_DENSE_CELLS={max_cells:.0f})")
+    return pd.DataFrame(matrix.toarray(), index=user_ids, columns=game_ids)
@@ -1,6 +1,13 @@
 import ast
+import os
+import sys
 import pandas as pd
 
+# Precomputed game -> topic matrix lives with the serving code
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filtering'))
+import emotionMap
+import gameTopics
+
 # Reading all the recommended games result
 finalResults = pd.read_csv('finalResults.csv')
 
@@ -31,6 +38,11 @@ topicToGenre = {
     6: 'Action/Shooter'
 }
 
+# Prefer the compiled mapping artifact when it has been built
+if emotionMap.available():
+    emotionToTopic = emotionMap.emotion_to_topic
+    topicToGenre = emotionMap.topic_to_genre
+
 # Function to check if the list contains a value
 def contains_value(lst, value):
     return value in lst
@@ -38,9 +50,14 @@ def contains_value(lst, value):
 # Getting the topic linked to the emotion
 desiredTopic = emotionToTopic[emotion]
 
-# Check if the list contains the value and return the row
-finalResults['topics'] = finalResults['topics'].apply(ast.literal_eval)
-filteredResult = finalResults['topics'].apply(lambda x: contains_value(x, desiredTopic))
+# Check if the game carries the topic: an array lookup when the offline
+# topic matrix exists, otherwise parse the topic lists stored in the CSV
+if gameTopics.available() and 'product_id' in finalResults.columns:
+    topicProbs = gameTopics.topic_rows(finalResults['product_id'])[:, desiredTopic]
+    filteredResult = topicProbs >= gameTopics.MIN_TOPIC_PROB
+else:
+    finalResults['topics'] = finalResults['topics'].apply(ast.literal_eval)
+    filteredResult = finalResults['topics'].apply(lambda x: contains_value(x, desiredTopic))
 
 # Filtering the emotion based games
 recommendation = finalResults[filteredResult]
@@ -0,0 +1,124 @@
+"""
+Compare load time and peak memory of the raw-text readers used today
+(pd.read_json / pd.read_csv) against the columnar tables from ingest.py.
+
+Every reader runs in its own subprocess so peak RSS is not shared.
+
+Run example:
+    $ python bench_ingest.py \
+        --reviews ../dataset/reviews.jl --products ../dataset/games.jl \
+        --games-csv ../dataset/steam_games.csv \
+        --columnar ../dataset/columnar --repeat 3
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Columns the downstream builders actually need
+REVIEW_COLUMNS = ['user_id', 'product_id', 'recommended']
+PRODUCT_COLUMNS = ['id', 'title', 'tags']
+GAMES_CSV_COLUMNS = ['AppID', 'Name', 'Release date', 'Genres', 'Tags']  # ingest.GAMES_CSV_SCHEMA
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', help='reviews.jl')
+    parser.add_argument('--products', help='games.jl / products.jl')
+    parser.add_argument('--games-csv', help='steam_games.csv')
+    parser.add_argument('--columnar', required=True, help='Output directory of ingest.py.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Optional JSON report path.')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def load(method, path):
+    """Loads one dataset with one method; returns the number of rows."""
+    import pandas as pd
+
+    sys.path.insert(0, os.path.join(BASE_DIR, '..'))
+    from dataio import read_columnar, read_frame
+
+    if method == 'read_json_reviews':
+        df = pd.read_json(path, lines=True, encoding='utf-8')[REVIEW_COLUMNS]
+    elif method == 'read_json_products':
+        df = pd.read_json(path, lines=True, encoding='utf-8')[PRODUCT_COLUMNS]
+    elif method == 'read_csv_games':
+        df = pd.read_csv(path, dtype=str)
+    elif method == 'stream_reviews':
+        df = read_frame(path, REVIEW_COLUMNS)
+    elif method == 'stream_products':
+        df = read_frame(path, PRODUCT_COLUMNS)
+    elif method == 'columnar_reviews':
+        df = read_columnar(path, REVIEW_COLUMNS)
+    elif method == 'columnar_products':
+        df = read_columnar(path, PRODUCT_COLUMNS)
+    elif method == 'columnar_games':
+        df = read_columnar(path, GAMES_CSV_COLUMNS)
+    else:
+        raise ValueError(method)
+    return len(df)
+
+
+def run_child(method, path):
+    started = time.perf_counter()
+    rows = load(method, path)
+    print(json.dumps({
+        'rows': rows,
+        'seconds': time.perf_counter() - started,
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def measure(method, path, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, __file__, '--columnar', '-', '--run', method, '--path', path],
+                             check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return {
+        'rows': runs[0]['rows'],
+        'best_seconds': round(min(r['seconds'] for r in runs), 3),
+        'peak_rss_mb': round(max(r['peak_rss_mb'] for r in runs), 1),
+    }
+
+
+def main():
+    args = parse_args()
+    if args.run:
+        run_child(args.run, args.path)
+        return
+
+    cases = []
+    if args.reviews:
+        cases += [('read_json_reviews', args.reviews), ('stream_reviews', args.reviews)]
+    if args.products:
+        cases += [('read_json_products', args.products), ('stream_products', args.products)]
+    if args.games_csv:
+        cases.append(('read_csv_games', args.games_csv))
+    for table in ('reviews', 'products', 'games'):
+        path = os.path.join(args.columnar, table)
+        if os.path.isdir(path):
+            cases.append((f'columnar_{table}', path))
+
+    report = {}
+    for method, path in cases:
+        report[method] = measure(method, path, args.repeat)
+        print(f"{method:<20} {report[method]['rows']:>10} rows "
+              f"{report[method]['best_seconds']:>8.3f}s {report[method]['peak_rss_mb']:>8.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
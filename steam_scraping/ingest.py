@@ -0,0 +1,162 @@
+"""
+Convert the scraper's JSON-lines output into partitioned columnar tables.
+
+products.jl      -> <output-dir>/products   (single bucket)
+reviews.jl       -> <output-dir>/reviews    (bucketed by product_id)
+steam_games.csv  -> <output-dir>/games      (single bucket, GAMES_CSV_SCHEMA)
+
+Tags, genres and specs are stored as dictionary-encoded string lists, ids
+as int64 and `recommended` as bool. Parquet is written when pyarrow is
+installed, compressed .npz parts otherwise. Every dataio reader accepts the
+resulting directories in place of the .jl files.
+
+Run example:
+    $ python ingest.py \
+        --products ../dataset/games.jl \
+        --reviews ../dataset/reviews.jl \
+        --games-csv ../dataset/steam_games.csv \
+        --output-dir ../dataset/columnar --buckets 16
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..'))
+from dataio import ColumnarWriter, iter_chunks  # noqa: E402
+
+PRODUCT_SCHEMA = {
+    'id': 'int64',
+    'app_name': 'str',
+    'title': 'str',
+    'url': 'str',
+    'reviews_url': 'str',
+    'genres': 'list',
+    'tags': 'list',
+    'specs': 'list',
+    'developer': 'dict',
+    'publisher': 'dict',
+    'release_date': 'dict',
+    'price': 'dict',  # Mixes numbers and labels such as 'Free to Play'
+    'discount_price': 'dict',
+    'sentiment': 'dict',
+    'n_reviews': 'int64',
+    'metascore': 'int64',
+    'early_access': 'bool',
+    'description': 'list',
+}
+
+REVIEW_SCHEMA = {
+    'product_id': 'int64',
+    'user_id': 'int64',
+    'recommended': 'bool',
+    'date': 'dict',
+    'hours': 'float32',
+    'found_helpful': 'int64',
+    'found_unhelpful': 'int64',
+    'found_funny': 'int64',
+    'products': 'int64',
+    'early_access': 'bool',
+    'compensation': 'dict',
+    'username': 'dict',
+    'page': 'int32',
+    'page_order': 'int32',
+    'text': 'str',
+}
+
+
+# Columns of steam_games.csv read by filtering/ (ids, names, dates, and the
+# comma-separated Tags/Genres behind the emotion and content matching)
+GAMES_CSV_SCHEMA = {
+    'AppID': 'int64',
+    'Name': 'str',
+    'Release date': 'dict',
+    'Genres': 'list',
+    'Tags': 'list',
+}
+
+
+def iter_csv_chunks(path, schema, chunk_size):
+    """Streams a CSV as {column: values} chunks; 'list' columns are split on commas."""
+    csv.field_size_limit(2**31 - 1)  # 'About the game' holds long descriptions
+    buffers = {c: [] for c in schema}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            for c, kind in schema.items():
+                value = row.get(c) or ''
+                if kind == 'list':
+                    value = [t.strip() for t in value.split(',') if t.strip()]
+                buffers[c].append(value)
+            if len(buffers[next(iter(schema))]) >= chunk_size:
+                yield buffers
+                buffers = {c: [] for c in schema}
+    if buffers[next(iter(schema))]:
+        yield buffers
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', help='Scraped products/games .jl file.')
+    parser.add_argument('--reviews', help='Scraped reviews .jl file.')
+    parser.add_argument('--games-csv', help='steam_games.csv used by filtering/.')
+    parser.add_argument('--output-dir', required=True)
+    parser.add_argument('--buckets', type=int, default=16,
+                        help='Number of product_id buckets for reviews.')
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--rows-per-file', type=int, default=500_000)
+    parser.add_argument('--format', choices=['parquet', 'npz'],
+                        help='Defaults to parquet when pyarrow is installed.')
+    parser.add_argument('--drop', nargs='*', default=[],
+                        help='Columns to leave out, e.g. --drop text.')
+    return parser.parse_args()
+
+
+def convert(src, dst, schema, args, partition_by=None, n_buckets=1):
+    schema = {c: kind for c, kind in schema.items() if c not in args.drop}
+    started = time.perf_counter()
+    writer = ColumnarWriter(dst, schema, partition_by=partition_by, n_buckets=n_buckets,
+                            rows_per_file=args.rows_per_file, file_format=args.format)
+    if src.endswith('.csv'):
+        chunks = iter_csv_chunks(src, schema, args.chunk_size)
+    else:
+        chunks = iter_chunks(src, list(schema), chunk_size=args.chunk_size)
+    for chunk in chunks:
+        writer.write(chunk)
+    meta = writer.close()
+
+    size = sum(os.path.getsize(os.path.join(root, f))
+               for root, _, files in os.walk(dst) for f in files)
+    meta.update({
+        'source_mb': round(os.path.getsize(src) / 2**20, 1),
+        'output_mb': round(size / 2**20, 1),
+        'seconds': round(time.perf_counter() - started, 2),
+    })
+    return meta
+
+
+def main():
+    args = parse_args()
+    report = {}
+
+    if args.products:
+        report['products'] = convert(args.products, os.path.join(args.output_dir, 'products'),
+                                     PRODUCT_SCHEMA, args)
+    if args.reviews:
+        report['reviews'] = convert(args.reviews, os.path.join(args.output_dir, 'reviews'),
+                                    REVIEW_SCHEMA, args, partition_by='product_id',
+                                    n_buckets=args.buckets)
+    if args.games_csv:
+        report['games'] = convert(args.games_csv, os.path.join(args.output_dir, 'games'),
+                                  GAMES_CSV_SCHEMA, args)
+
+    # ru_maxrss is reported in kilobytes on Linux
+    report['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
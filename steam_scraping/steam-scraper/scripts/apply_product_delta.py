@@ -0,0 +1,65 @@
+"""
+Apply the delta file of incremental product crawls (ProductSpider with
+-a index=... -a delta=...) to a products .jl file: added apps are appended,
+updated ones replaced in place. Records carry whole items, so applying a
+delta twice gives the same result.
+
+Run example:
+    $ python apply_product_delta.py --products ../output/products_all.jl \
+        --delta ../output/products_delta.jl
+"""
+import argparse
+import json
+import os
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', required=True, help='Products .jl to update.')
+    parser.add_argument('--delta', required=True, nargs='+', help='Delta .jl file(s), oldest first.')
+    parser.add_argument('--output', help='Defaults to replacing --products.')
+    return parser.parse_args()
+
+
+def read_products(path):
+    products = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    products[str(item.get('id'))] = item
+    return products
+
+
+def apply_delta(products, delta_path):
+    """Apply delta records to an id -> item dict; returns op counts."""
+    counts = {'add': 0, 'update': 0}
+    with open(delta_path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            products[str(record['id'])] = record['item']
+            counts[record['op']] = counts.get(record['op'], 0) + 1
+    return counts
+
+
+def main():
+    args = parse_args()
+    products = read_products(args.products)
+    before = len(products)
+    for path in args.delta:
+        print(f'{path}: {apply_delta(products, path)}')
+
+    output = args.output or args.products
+    tmp = output + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for item in products.values():
+            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+    os.replace(tmp, output)
+    print(f'{before} -> {len(products)} products in {output}')
+
+
+if __name__ == '__main__':
+    main()
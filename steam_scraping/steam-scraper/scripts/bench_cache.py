@@ -0,0 +1,144 @@
+"""
+Compare the filesystem HTTP cache (SteamCacheStorage) with the pack cache
+(SteamPackCacheStorage) on synthetic review pages: store time, hit-path
+latency (retrieve_response, p50/p99), miss latency, disk footprint in
+allocated blocks and number of files (inodes).
+
+Run example:
+    $ python bench_cache.py --responses 20000
+    $ python bench_cache.py --responses 20000 --codecs zstd gzip none
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+
+from scrapy.http import HtmlResponse, Request  # noqa: E402
+from scrapy.settings import Settings  # noqa: E402
+
+from fixture_server import fake_reviews, render_card  # noqa: E402
+from steam.cache import SteamPackCacheStorage, zstandard  # noqa: E402
+from steam.middlewares import SteamCacheStorage  # noqa: E402
+
+
+class BenchSpider:
+    name = 'reviews'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--responses', type=int, default=20000)
+    parser.add_argument('--lookups', type=int, default=5000)
+    parser.add_argument('--codecs', nargs='*', default=['zstd' if zstandard else 'gzip'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON results file.')
+    return parser.parse_args()
+
+
+def make_responses(n):
+    for i in range(n):
+        product_id, page = 100000 + i // 50, i % 50 + 1
+        url = f'https://steamcommunity.com/app/{product_id}/homecontent/?p={page}&snr=1_5_9__'
+        cards = ''.join(render_card(r) for r in fake_reviews(product_id, page * 10, 10, page * 10 + 10))
+        body = f'<html><body><div id="AppHubCards">{cards}</div></body></html>'.encode('utf-8')
+        request = Request(url)
+        yield request, HtmlResponse(url, body=body, headers={'Content-Type': 'text/html'},
+                                    request=request)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q / 100), len(values) - 1)] * 1000
+
+
+def disk_usage(path):
+    blocks, files = 0, 0
+    for root, dirs, names in os.walk(path):
+        for name in dirs + names:
+            st = os.lstat(os.path.join(root, name))
+            blocks += st.st_blocks * 512
+            files += 1
+    return blocks, files
+
+
+def run(name, storage_cls, settings, responses, lookups):
+    spider = BenchSpider()
+    storage = storage_cls(settings)
+    storage.open_spider(spider)
+
+    started = time.perf_counter()
+    for request, response in responses:
+        storage.store_response(spider, request, response)
+    store_seconds = time.perf_counter() - started
+    storage.close_spider(spider)
+
+    # Reopen cold so lookups go through the on-disk structures.
+    storage = storage_cls(settings)
+    storage.open_spider(spider)
+    hits = []
+    for request in lookups:
+        t0 = time.perf_counter()
+        response = storage.retrieve_response(spider, request)
+        hits.append(time.perf_counter() - t0)
+        assert response is not None and response.body
+    misses = []
+    for i in range(min(len(lookups), 1000)):
+        t0 = time.perf_counter()
+        storage.retrieve_response(spider, Request(f'https://steamcommunity.com/app/{i}/missing/'))
+        misses.append(time.perf_counter() - t0)
+    storage.close_spider(spider)
+
+    disk, files = disk_usage(settings['HTTPCACHE_DIR'])
+    return {
+        'backend': name,
+        'store_ms_per_response': round(store_seconds * 1000 / len(responses), 3),
+        'hit_p50_ms': round(percentile(hits, 50), 3),
+        'hit_p99_ms': round(percentile(hits, 99), 3),
+        'miss_p50_ms': round(percentile(misses, 50), 3),
+        'disk_mb': round(disk / 2**20, 1),
+        'files': files,
+    }
+
+
+def main():
+    args = parse_args()
+    responses = list(make_responses(args.responses))
+    rng = random.Random(args.seed)
+    # Lookups of the snr-less urls must hit, as in SteamCacheStorage.
+    lookups = [Request(r.url.split('&snr=')[0]) for r, _ in rng.choices(responses, k=args.lookups)]
+    raw_mb = sum(len(r.body) for _, r in responses) / 2**20
+    print(f'{len(responses)} responses, {raw_mb:.1f} MB of bodies.')
+
+    backends = [('filesystem', SteamCacheStorage, {}),
+                ('filesystem+gzip', SteamCacheStorage, {'HTTPCACHE_GZIP': True})]
+    backends += [(f'pack+{codec}', SteamPackCacheStorage, {'HTTPCACHE_PACK_CODEC': codec})
+                 for codec in args.codecs]
+
+    results = []
+    for name, storage_cls, extra in backends:
+        cachedir = tempfile.mkdtemp(prefix='bench_cache_')
+        try:
+            settings = Settings({'HTTPCACHE_DIR': cachedir, 'HTTPCACHE_EXPIRATION_SECS': 0, **extra})
+            result = run(name, storage_cls, settings, responses, lookups)
+        finally:
+            shutil.rmtree(cachedir)
+        results.append(result)
+        print(f"{name:<16} store {result['store_ms_per_response']:>7.3f}ms  "
+              f"hit p50 {result['hit_p50_ms']:>7.3f}ms  p99 {result['hit_p99_ms']:>7.3f}ms  "
+              f"disk {result['disk_mb']:>8.1f}MB  files {result['files']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Saved {args.output}')
+
+
+if __name__ == '__main__':
+    main()
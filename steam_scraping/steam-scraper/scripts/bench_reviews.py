@@ -0,0 +1,129 @@
+"""
+Offline throughput comparison of the review spider's HTML and JSON API modes.
+
+Starts fixture_server.py, crawls the same products in each mode against it
+(HTTP cache and AutoThrottle off, so only fetching + parsing is measured) and
+reports wall time, items, items per second and CPU milliseconds per item of
+the crawler process.
+
+Run example:
+    $ python bench_reviews.py --products 20 --reviews-per-app 1000
+    $ python bench_reviews.py --record-dir ../output/fixtures \
+        --url-file ../output/review_urls_01.txt --modes api
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPTS_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', nargs='*', default=['html', 'api'], choices=['html', 'api'])
+    parser.add_argument('--products', type=int, default=20,
+                        help='Synthetic product ids to crawl when no --url-file is given.')
+    parser.add_argument('--url-file', help='Review urls to crawl (ids are replayed from --record-dir).')
+    parser.add_argument('--reviews-per-app', type=int, default=1000)
+    parser.add_argument('--num-per-page', type=int, default=100)
+    parser.add_argument('--record-dir', help='Recorded responses for the fixture server.')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--port', type=int, default=0, help='0 picks a free port.')
+    parser.add_argument('--output', help='JSON results file.')
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, port):
+    cmd = [sys.executable, os.path.join(SCRIPTS_DIR, 'fixture_server.py'), '--port', str(port),
+           '--reviews-per-app', str(args.reviews_per_app), '--latency-ms', str(args.latency_ms)]
+    if args.record_dir:
+        cmd += ['--record-dir', args.record_dir]
+    server = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()  # Wait for the "Serving" line.
+    return server
+
+
+def write_url_file(args, base, path):
+    if args.url_file:
+        with open(args.url_file) as f:
+            urls = [u.strip() for u in f if u.strip()]
+        # Point recorded Steam urls at the fixture server.
+        urls = [base + u[u.index('/app/'):] for u in urls if '/app/' in u]
+    else:
+        urls = [f'{base}/app/{100000 + i}/reviews/?browsefilter=mostrecent&p=1'
+                for i in range(args.products)]
+    with open(path, 'w') as f:
+        f.write('\n'.join(urls) + '\n')
+
+
+def run_crawl(mode, url_file, base, args, workdir):
+    output = os.path.join(workdir, f'reviews_{mode}.jl')
+    cmd = [
+        sys.executable, '-m', 'scrapy', 'crawl', 'reviews',
+        '-a', f'mode={mode}', '-a', f'url_file={url_file}',
+        '-a', f'api_base={base}', '-a', f'num_per_page={args.num_per_page}',
+        '-o', output,
+        '-s', 'HTTPCACHE_ENABLED=False', '-s', 'AUTOTHROTTLE_ENABLED=False',
+        '-s', 'ROBOTSTXT_OBEY=False', '-s', f'CONCURRENT_REQUESTS={args.concurrency}',
+        '-s', 'LOG_LEVEL=WARNING',
+    ]
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    subprocess.run(cmd, cwd=PROJECT_DIR, check=True)
+    wall = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    with open(output) as f:
+        items = sum(1 for _ in f)
+    return {
+        'wall_seconds': round(wall, 2),
+        'items': items,
+        'items_per_second': round(items / wall, 1) if wall else None,
+        'cpu_seconds': round(cpu, 2),
+        'cpu_ms_per_item': round(cpu * 1000 / items, 3) if items else None,
+    }
+
+
+def main():
+    args = parse_args()
+    port = args.port or free_port()
+    base = f'http://127.0.0.1:{port}'
+    server = start_server(args, port)
+
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            url_file = os.path.join(workdir, 'urls.txt')
+            write_url_file(args, base, url_file)
+            for mode in args.modes:
+                results[mode] = run_crawl(mode, url_file, base, args, workdir)
+                r = results[mode]
+                print(f"{mode:<5} {r['items']:>8} items  {r['wall_seconds']:>7.2f}s  "
+                      f"{r['items_per_second']:>9} items/s  {r['cpu_ms_per_item']} CPU ms/item")
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Saved {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+End-to-end check of the incremental product crawl against fixture_server.py.
+
+    1. incremental crawl of a fresh store (--apps) with an empty index,
+    2. --new-apps releases later and some apps changed (generation 1), an
+       incremental crawl of the listing only: must add exactly the new apps
+       and stop paginating at the known releases,
+    3. the same store with -a refresh_days: conditional requests for the
+       other known apps must update exactly the changed ones (304 for the
+       rest),
+    4. the delta file applied with apply_product_delta.py must equal a full
+       crawl of the generation 1 store.
+Exits non-zero on failure.
+
+Run example:
+    $ python check_incremental.py --apps 500 --new-apps 40 --change-rate 0.1
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+
+from apply_product_delta import apply_delta
+from bench_reviews import PROJECT_DIR, SCRIPTS_DIR, free_port
+from fixture_server import FIRST_APP_ID, SEARCH_PER_PAGE, fake_app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', type=int, default=500)
+    parser.add_argument('--new-apps', type=int, default=40)
+    parser.add_argument('--change-rate', type=float, default=0.1)
+    parser.add_argument('--keep', help='Keep outputs in this directory instead of a temp dir.')
+    return parser.parse_args()
+
+
+def crawl(args, port, workdir, run, apps, generation, spider_args=()):
+    """One products crawl against a fresh fixture server; returns its request counts."""
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS_DIR, 'fixture_server.py'), '--port', str(port),
+         '--apps', str(apps), '--generation', str(generation),
+         '--change-rate', str(args.change_rate)],
+        stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()
+    cmd = [
+        sys.executable, '-m', 'scrapy', 'crawl', 'products',
+        '-a', f'store_base=http://127.0.0.1:{port}', *spider_args,
+        '-o', os.path.join(workdir, f'products_{run}.jl'),
+        '-s', 'HTTPCACHE_ENABLED=False', '-s', 'AUTOTHROTTLE_ENABLED=False',
+        '-s', 'ROBOTSTXT_OBEY=False', '-s', 'LOG_LEVEL=INFO', '--logfile', os.path.join(workdir, f'crawl_{run}.log'),
+    ]
+    try:
+        subprocess.run(cmd, cwd=PROJECT_DIR, check=True)
+    finally:
+        server.send_signal(signal.SIGINT)  # Prints its request counts
+        counts = json.loads(server.communicate()[0].strip().splitlines()[-1])
+    return counts
+
+
+def read_delta(path, start=0):
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    return records[start:]
+
+
+def main():
+    args = parse_args()
+    workdir = args.keep or tempfile.mkdtemp(prefix='check_incremental_')
+    os.makedirs(workdir, exist_ok=True)
+    port = free_port()
+    index = os.path.join(workdir, 'products.index')
+    delta = os.path.join(workdir, 'products_delta.jl')
+    for path in (index, delta):
+        if os.path.exists(path):
+            os.remove(path)
+    incremental = ['-a', f'index={index}', '-a', f'delta={delta}']
+    apps = args.apps + args.new_apps
+    new_ids = {str(i) for i in range(FIRST_APP_ID + args.apps, FIRST_APP_ID + apps)}
+    changed_ids = {str(i) for i in range(FIRST_APP_ID, FIRST_APP_ID + args.apps)
+                   if fake_app(i, 0, args.change_rate) != fake_app(i, 1, args.change_rate)}
+    failures = []
+
+    counts = crawl(args, port, workdir, 1, args.apps, 0, incremental)
+    first = read_delta(delta)
+    if len(first) != args.apps or {r['op'] for r in first} != {'add'}:
+        failures.append(f'run 1: {len(first)} delta records, expected {args.apps} adds')
+    print(f'1. fresh store:   {counts}  delta {len(first)}')
+
+    counts = crawl(args, port, workdir, 2, apps, 1, incremental)
+    second = read_delta(delta, len(first))
+    added = {r['id'] for r in second if r['op'] == 'add'}
+    updated = {r['id'] for r in second if r['op'] == 'update'}
+    max_pages = -(-args.new_apps // SEARCH_PER_PAGE) + 2
+    if added != new_ids:
+        failures.append(f'run 2: added {len(added)} apps, expected {len(new_ids)}')
+    if not updated <= changed_ids:
+        failures.append(f'run 2: updated unchanged apps {sorted(updated - changed_ids)[:5]}')
+    if counts.get('search', 0) > max_pages:
+        failures.append(f'run 2: {counts["search"]} search pages, expected at most {max_pages}')
+    print(f'2. listing only:  {counts}  delta {len(second)} ({len(added)} added, {len(updated)} updated)')
+
+    counts = crawl(args, port, workdir, 3, apps, 1, incremental + ['-a', 'refresh_days=1e-9'])
+    third = read_delta(delta, len(first) + len(second))
+    refreshed = {r['id'] for r in third if r['op'] == 'update'}
+    if any(r['op'] == 'add' for r in third):
+        failures.append('run 3: added apps again')
+    if refreshed | updated != changed_ids:
+        failures.append(f'run 3: updates {len(refreshed | updated)} apps in total, '
+                        f'expected {len(changed_ids)} changed')
+    print(f'3. refresh:       {counts}  delta {len(third)} ({len(refreshed)} updated)')
+
+    counts = crawl(args, port, workdir, 'full', apps, 1)
+    with open(os.path.join(workdir, 'products_full.jl')) as f:
+        full = {item['id']: item for item in map(json.loads, f)}
+    applied = {}
+    apply_delta(applied, delta)
+    if applied != full:
+        differing = [k for k in set(full) | set(applied) if full.get(k) != applied.get(k)]
+        failures.append(f'delta applied differs from a full crawl on {len(differing)} apps')
+    print(f'4. full crawl:    {counts}  {len(full)} products, delta applied: {len(applied)}')
+
+    print(f'Outputs in {workdir}')
+    if failures:
+        print('FAILED\n  ' + '\n  '.join(failures))
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
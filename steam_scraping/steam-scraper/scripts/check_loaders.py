@@ -0,0 +1,206 @@
+"""
+Parity and speed check of the fast item loaders against the ItemLoader ones:
+    load_review  vs fast_load_review   (steam/spiders/review_spider.py)
+    load_product vs fast_load_product  (steam/spiders/product_spider.py)
+
+Both are run on synthetic review cards and product pages covering the
+optional fields, plus any recorded responses in --pages-dir (see
+fixture_server.py --record), and must produce identical items. Then each
+loader is timed on the same inputs and items per second per core (process
+CPU time) are reported. Exits non-zero on any mismatch.
+
+Run example:
+    $ python check_loaders.py --reviews 20000 --products 2000
+    $ python check_loaders.py --pages-dir ../output/fixtures
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+
+from scrapy.http import HtmlResponse  # noqa: E402
+
+from fixture_server import fake_reviews, render_card  # noqa: E402
+from steam.items import _standardize_date  # noqa: E402
+from steam.spiders.product_spider import fast_load_product, load_product  # noqa: E402
+from steam.spiders.review_spider import fast_load_review, load_review  # noqa: E402
+
+CARD_VARIANTS = [
+    lambda card: card,
+    lambda card: card.replace('>Recommended<', '>Not Recommended<'),
+    lambda card: card.replace('<div class="hours">', '<div class="received_compensation">'
+                              'Product received for free</div><div class="hours">'),
+    lambda card: card.replace(' products in account', ',000 products in account'),
+    lambda card: card.replace('">user</a>', '">A &amp; B &lt;3</a>'),
+    lambda card: card.replace('hrs on record', 'hrs on record<br>1,234.5 hrs last two weeks'),
+    lambda card: card.replace('people found this review funny', ''),
+    lambda card: card.replace('<div class="found_helpful">', '<div class="found_helpful">\n\t'),
+    lambda card: re.sub('Posted: [^<]+', 'Posted: June 4', card),
+    lambda card: re.sub('Posted: [^<]+', 'Posted: 4 June, 2017', card),
+    lambda card: card.split('<div class="apphub_CardContentAuthorName">')[0] + '</div>',
+]
+
+PRODUCT_PAGE = """<html><body>
+<div class="apphub_AppName">{name}</div>
+<div class="details_block">
+<b>Title:</b> {name}<br>
+<b>Genre:</b> <a href="#">Action</a>, <a href="#">{genre}</a><br>
+<b>Developer:</b>
+<a href="#">{developer}</a><br>
+<b>Publisher:</b> <a href="#">Pub &amp; Co</a><br>
+<b>Release Date:</b> {release}<br>
+</div>
+<div class="game_area_details_specs"><a>Single-player</a></div>
+<div class="game_area_details_specs"><a> Steam Achievements </a></div>
+{tags}
+<div class="game_description_snippet">
+  {name} is a game.
+</div>
+{price}
+<div class="user_reviews_summary_row">
+<span class="game_review_summary positive">Very Positive</span>
+<span class="responsive_hidden">
+		({n_reviews})		</span>
+<span class="nonresponsive_hidden" itemprop="description">{sentiment}</span>
+</div>
+{metascore}{early_access}
+</body></html>"""
+
+PRICES = [
+    '<div class="game_purchase_price price">\n\t$9.99\t</div>',
+    '<div class="game_purchase_price price">Free to Play</div>',
+    '<div class="discount_original_price">$19.99</div><div class="discount_final_price">$4,99</div>',
+    '',
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', type=int, default=20000)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--pages-dir', help='Recorded responses (*.body/*.meta) to include.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions, best is kept.')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def review_pages(n, rng):
+    """Synthetic review pages, 10 cards each, cycling through the card variants."""
+    pages = []
+    for start in range(0, n, 10):
+        cards = [CARD_VARIANTS[(start + i) % len(CARD_VARIANTS)](render_card(r))
+                 for i, r in enumerate(fake_reviews(rng.randint(1, 10**6), start, 10, start + 10))]
+        body = '<html><body><div id="AppHubCards">{}</div></body></html>'.format(''.join(cards))
+        pages.append(HtmlResponse(f'http://steamcommunity.com/app/{start}/reviews/?p=1',
+                                  body=body.encode('utf-8'), encoding='utf-8'))
+    return pages
+
+
+def product_pages(n, rng):
+    pages = []
+    for i in range(n):
+        body = PRODUCT_PAGE.format(
+            name=f'Game {i}',
+            genre=rng.choice(['Indie', 'RPG', 'Strategy']),
+            developer=rng.choice(['Dev A', 'Dev, B', 'Dev C']),
+            release=rng.choice(['Jun 4, 2017', 'June 14, 2016', 'Coming soon', 'Mar 3']),
+            tags=''.join(f'<a class="app_tag">\n\t{t}\t</a>' for t in rng.sample(
+                ['Action', 'Indie', 'RPG', 'Co-op', 'Horror'], rng.randint(0, 4))),
+            price=PRICES[i % len(PRICES)],
+            n_reviews=f'{rng.randint(1, 200000):,}',
+            sentiment=f' - {rng.randint(50, 99)}% of the user reviews are positive.',
+            metascore='<div id="game_area_metascore"><div class="score high"> 84 </div></div>'
+            if i % 3 else '',
+            early_access='<div class="early_access_header">Early Access</div>' if i % 7 == 0 else '',
+        )
+        url = f'http://store.steampowered.com/app/{1000 + i}/Game_{i}/?snr=1_7_7_230_150_1'
+        pages.append(HtmlResponse(url, body=body.encode('utf-8'), encoding='utf-8'))
+    return pages
+
+
+def recorded_pages(path):
+    """Recorded responses split into review pages and product pages."""
+    reviews, products = [], []
+    for body_file in sorted(glob.glob(os.path.join(path, '*.body'))):
+        with open(body_file[:-5] + '.meta') as f:
+            meta = json.load(f)
+        if 'html' not in meta.get('content_type', ''):
+            continue
+        with open(body_file, 'rb') as f:
+            body = f.read()
+        host = 'steamcommunity.com' if '/reviews/' in meta['path'] or '/homecontent/' in meta['path'] \
+            else 'store.steampowered.com'
+        response = HtmlResponse(f'http://{host}{meta["path"]}', body=body)
+        if b'apphub_Card' in body:
+            reviews.append(response)
+        elif b'apphub_AppName' in body:
+            products.append(response)
+    return reviews, products
+
+
+def cards_of(pages):
+    return [(card, i) for page in pages for i, card in enumerate(page.css('div .apphub_Card'))]
+
+
+def check_parity(name, pairs):
+    mismatches = 0
+    for inputs, slow, fast in pairs:
+        if dict(slow) != dict(fast):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f'{name} mismatch on {inputs}:\n  loader: {dict(slow)}\n  fast:   {dict(fast)}')
+    print(f'{name}: {len(pairs)} items compared, {mismatches} mismatches.')
+    return mismatches
+
+
+def items_per_second(fn, inputs, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        _standardize_date.cache_clear()
+        started = time.process_time()
+        for args in inputs:
+            fn(*args)
+        best = min(best, time.process_time() - started)
+    return len(inputs) / best if best else float('inf')
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    reviews = review_pages(args.reviews, rng)
+    products = product_pages(args.products, rng)
+    if args.pages_dir:
+        recorded_reviews, recorded_products = recorded_pages(args.pages_dir)
+        reviews += recorded_reviews
+        products += recorded_products
+
+    review_inputs = [(card, '416600', 1, i) for card, i in cards_of(reviews)]
+    product_inputs = [(page,) for page in products]
+
+    mismatches = check_parity('reviews', [
+        (f'card {i}', load_review(*a), fast_load_review(*a)) for i, a in enumerate(review_inputs)])
+    mismatches += check_parity('products', [
+        (a[0].url, load_product(*a), fast_load_product(*a)) for a in product_inputs])
+
+    for name, slow, fast, inputs in [
+        ('reviews', load_review, fast_load_review, review_inputs),
+        ('products', load_product, fast_load_product, product_inputs),
+    ]:
+        before = items_per_second(slow, inputs, args.repeat)
+        after = items_per_second(fast, inputs, args.repeat)
+        print(f'{name:<9} ItemLoader {before:>9.0f} items/s/core   '
+              f'fast {after:>9.0f} items/s/core   ({after / before:.1f}x)')
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
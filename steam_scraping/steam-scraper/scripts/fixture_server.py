@@ -0,0 +1,351 @@
+"""
+Local stand-in for steamcommunity.com review pages, the store appreviews
+JSON endpoint and the store search listing and product pages, so crawls can
+be benchmarked offline.
+
+Responses come from a directory of recorded responses when one exists for
+the request, otherwise they are generated (deterministically per product),
+in the same shape the spiders parse:
+    /app/<id>/reviews/?p=1          HTML review cards + MoreContentForm
+    /app/<id>/homecontent/?p=N      following HTML pages
+    /appreviews/<id>?cursor=...     JSON pages with cursor pagination
+    /search/?page=N                 search listing, newest release first
+    /app/<id>/<name>/               product pages, with ETags (304 on If-None-Match)
+
+--apps and --generation define the store: every generation some apps change
+price or review count, as between two product crawls.
+
+Absolute Steam URLs in recorded bodies are rewritten to this server.
+
+Run example:
+    $ python fixture_server.py --port 8765 --reviews-per-app 1000
+    $ python fixture_server.py --port 8765 --apps 500 --generation 1
+    $ python fixture_server.py --port 8765 --record-dir ../output/fixtures \
+        --record    # proxy to Steam and store every response
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+HTML_PER_PAGE = 10
+SEARCH_PER_PAGE = 25
+FIRST_APP_ID = 1000
+UPSTREAMS = {
+    '/appreviews/': 'https://store.steampowered.com',
+    '/app/': 'https://steamcommunity.com',
+}
+STEAM_HOSTS = [
+    'https://store.steampowered.com', 'http://store.steampowered.com',
+    'https://steamcommunity.com', 'http://steamcommunity.com',
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--reviews-per-app', type=int, default=1000)
+    parser.add_argument('--record-dir', help='Directory of recorded responses.')
+    parser.add_argument('--record', action='store_true',
+                        help='Proxy unknown requests to Steam and save them to --record-dir.')
+    parser.add_argument('--apps', type=int, default=500, help='Products in the store listing.')
+    parser.add_argument('--generation', type=int, default=0,
+                        help='Store version; apps change price or reviews between generations.')
+    parser.add_argument('--change-rate', type=float, default=0.05,
+                        help='Fraction of apps changing per generation.')
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='Artificial per-response delay.')
+    parser.add_argument('--request-log', help='Append every requested path to this file.')
+    return parser.parse_args()
+
+
+def record_key(path):
+    return hashlib.sha1(path.encode('utf-8')).hexdigest()
+
+
+def fake_reviews(product_id, start, count, total):
+    """Deterministic review dicts [start, start + count) of a product."""
+    out = []
+    for i in range(start, min(start + count, total)):
+        rng = random.Random(f'{product_id}:{i}')
+        out.append({
+            'recommendationid': str(rng.getrandbits(32)),
+            'author': {
+                'steamid': str(76561197960265728 + rng.getrandbits(30)),
+                'num_games_owned': rng.randint(1, 2000),
+                'playtime_forever': rng.randint(1, 50000),
+                'playtime_at_review': rng.randint(1, 20000),
+            },
+            'review': 'Synthetic review text ' * rng.randint(1, 30),
+            'timestamp_created': 1500000000 + rng.randint(0, 200000000),
+            'voted_up': rng.random() < 0.8,
+            'votes_up': rng.randint(0, 50),
+            'votes_funny': rng.randint(0, 10),
+            'received_for_free': rng.random() < 0.05,
+            'written_during_early_access': rng.random() < 0.1,
+        })
+    return out
+
+
+def render_card(review):
+    minutes = review['author']['playtime_forever']
+    created = time.strftime('%B %d, %Y', time.gmtime(review['timestamp_created']))
+    early = '<div class="early_access_review">Early Access Review</div>' \
+        if review['written_during_early_access'] else ''
+    return (
+        '<div class="apphub_Card">'
+        f'<div class="found_helpful">{review["votes_up"]} people found this review helpful<br>'
+        f'{review["votes_funny"]} people found this review funny</div>'
+        f'<div class="title">{"Recommended" if review["voted_up"] else "Not Recommended"}</div>'
+        f'<div class="hours">{minutes / 60:.1f} hrs on record</div>'
+        f'<div class="date_posted">Posted: {created}</div>{early}'
+        f'<div class="apphub_CardTextContent">{review["review"]}</div>'
+        '<div class="apphub_CardContentAuthorName">'
+        f'<a href="https://steamcommunity.com/profiles/{review["author"]["steamid"]}/">user</a></div>'
+        f'<div class="apphub_CardContentMoreLink">{review["author"]["num_games_owned"]} products in account</div>'
+        '</div>'
+    )
+
+
+def fake_app(app_id, generation, change_rate):
+    """Deterministic product fields of an app at a store generation."""
+    rng = random.Random(f'app:{app_id}')
+    app = {
+        'id': app_id,
+        'name': f'Game {app_id}',
+        'release': time.strftime('%b %d, %Y', time.gmtime(1200000000 + app_id * 86400)),
+        'price': rng.choice([4.99, 9.99, 14.99, 19.99, 59.99]),
+        'n_reviews': rng.randint(1, 50000),
+        'tags': rng.sample(['Action', 'Indie', 'RPG', 'Co-op', 'Horror'], rng.randint(1, 4)),
+    }
+    for g in range(1, generation + 1):
+        change = random.Random(f'app:{app_id}:{g}')
+        if change.random() < change_rate:
+            if change.random() < 0.5:
+                app['price'] = round(app['price'] * 0.5, 2)
+            app['n_reviews'] += change.randint(1, 500)
+    return app
+
+
+def render_listing_row(app, base_url):
+    return (
+        f'<a href="{base_url}/app/{app["id"]}/Game_{app["id"]}/?snr=1_7_7_230_150_1" '
+        f'data-ds-appid="{app["id"]}" class="search_result_row ds_collapse_flag">'
+        f'<div class="search_name"><span class="title">{app["name"]}</span></div>'
+        f'<div class="search_released">{app["release"]}</div>'
+        '<div class="search_reviewscore"><span class="search_review_summary positive" '
+        f'data-tooltip-html="Very Positive&lt;br&gt;90% of the {app["n_reviews"]:,} user reviews '
+        'for this game are positive."></span></div>'
+        f'<div class="search_price">${app["price"]:.2f}</div>'
+        '</a>'
+    )
+
+
+def render_product(app):
+    tags = ''.join(f'<a class="app_tag">\n\t{t}\t</a>' for t in app['tags'])
+    return (
+        '<html><body>'
+        f'<div class="apphub_AppName">{app["name"]}</div>'
+        f'<div class="details_block"><b>Title:</b> {app["name"]}<br>'
+        '<b>Genre:</b> <a href="#">Action</a><br>'
+        '<b>Developer:</b> <a href="#">Dev</a><br>'
+        f'<b>Release Date:</b> {app["release"]}<br></div>'
+        f'{tags}'
+        f'<div class="game_purchase_price price">${app["price"]:.2f}</div>'
+        '<div class="user_reviews_summary_row">'
+        '<span class="game_review_summary positive">Very Positive</span>'
+        f'<span class="responsive_hidden">({app["n_reviews"]:,})</span></div>'
+        '</body></html>'
+    )
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'SteamFixture/1.0'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        cfg = self.server.cfg
+        self.server.counter.log(self.path)
+        if cfg.latency_ms:
+            time.sleep(cfg.latency_ms / 1000)
+
+        body, content_type, etag = None, 'text/html; charset=utf-8', None
+        if cfg.record_dir:
+            body, content_type = self.replay() or (None, content_type)
+        if body is None and cfg.record:
+            body, content_type = self.proxy()
+        if body is None:
+            body, content_type = self.generate()
+            if body is not None and self.path.startswith('/app/') and '/reviews/' not in self.path \
+                    and '/homecontent/' not in self.path:
+                etag = '"{}"'.format(hashlib.blake2b(body, digest_size=8).hexdigest())
+
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if etag is not None and self.headers.get('If-None-Match') == etag:
+            self.server.counter.hit(self.path, not_modified=True)
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.server.counter.hit(self.path)
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def base_url(self):
+        return f'http://{self.headers.get("Host")}'
+
+    def replay(self):
+        path = os.path.join(self.server.cfg.record_dir, record_key(self.path))
+        if not os.path.exists(path + '.body'):
+            return None
+        with open(path + '.body', 'rb') as f:
+            body = f.read()
+        with open(path + '.meta') as f:
+            content_type = json.load(f)['content_type']
+        for host in STEAM_HOSTS:
+            body = body.replace(host.encode(), self.base_url().encode())
+        return body, content_type
+
+    def proxy(self):
+        upstream = next((u for prefix, u in UPSTREAMS.items() if self.path.startswith(prefix)), None)
+        if upstream is None:
+            return None, None
+        request = urllib.request.Request(upstream + self.path, headers={'User-Agent': 'Steam Scraper'})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = response.read()
+            content_type = response.headers.get('Content-Type', 'text/html')
+
+        os.makedirs(self.server.cfg.record_dir, exist_ok=True)
+        path = os.path.join(self.server.cfg.record_dir, record_key(self.path))
+        with open(path + '.body', 'wb') as f:
+            f.write(body)
+        with open(path + '.meta', 'w') as f:
+            json.dump({'path': self.path, 'content_type': content_type}, f)
+        for host in STEAM_HOSTS:
+            body = body.replace(host.encode(), self.base_url().encode())
+        return body, content_type
+
+    def generate(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        segments = [s for s in parts.path.split('/') if s]
+        cfg = self.server.cfg
+        total = cfg.reviews_per_app
+
+        if len(segments) == 2 and segments[0] == 'appreviews':
+            product_id = segments[1]
+            per_page = min(int(query.get('num_per_page', ['20'])[0]), 100)
+            cursor = unquote(query.get('cursor', ['*'])[0])
+            start = 0 if cursor == '*' else int(cursor.split(':')[1])
+            reviews = fake_reviews(product_id, start, per_page, total)
+            next_cursor = f'c:{start + len(reviews)}' if reviews else cursor
+            payload = {'success': 1, 'query_summary': {'num_reviews': len(reviews)},
+                       'reviews': reviews, 'cursor': next_cursor}
+            return json.dumps(payload).encode('utf-8'), 'application/json'
+
+        if len(segments) == 3 and segments[0] == 'app' and segments[2] in ('reviews', 'homecontent'):
+            product_id = segments[1]
+            page = int(query.get('p', ['1'])[0])
+            start = (page - 1) * HTML_PER_PAGE
+            cards = ''.join(render_card(r) for r in fake_reviews(product_id, start, HTML_PER_PAGE, total))
+            form = ''
+            if start + HTML_PER_PAGE < total:
+                form = (
+                    f'<form id="MoreContentForm{page}" method="GET" '
+                    f'action="{self.base_url()}/app/{product_id}/homecontent/">'
+                    f'<input type="hidden" name="userreviewsoffset" value="{start + HTML_PER_PAGE}">'
+                    f'<input type="hidden" name="p" value="{page + 1}">'
+                    '<input type="hidden" name="browsefilter" value="mostrecent">'
+                    '</form>'
+                )
+            html = f'<html><body><div id="AppHubCards">{cards}</div>{form}</body></html>'
+            return html.encode('utf-8'), 'text/html; charset=utf-8'
+
+        if segments[:1] == ['search']:
+            page = int(query.get('page', ['1'])[0])
+            newest = FIRST_APP_ID + cfg.apps - 1
+            ids = range(newest - (page - 1) * SEARCH_PER_PAGE,
+                        max(newest - page * SEARCH_PER_PAGE, FIRST_APP_ID - 1), -1)
+            rows = ''.join(render_listing_row(fake_app(i, cfg.generation, cfg.change_rate),
+                                              self.base_url()) for i in ids)
+            n_pages = -(-cfg.apps // SEARCH_PER_PAGE)
+            links = ''.join(f'<a href="{self.base_url()}/search/?sort_by=Released_DESC&page={p}">{p}</a>'
+                            for p in range(page + 1, min(page + 3, n_pages) + 1))
+            html = (f'<html><body><div id="search_result_container"><div id="search_resultsRows">'
+                    f'{rows}</div><div class="search_pagination_right">{links}</div></div></body></html>')
+            return html.encode('utf-8'), 'text/html; charset=utf-8'
+
+        if len(segments) in (2, 3) and segments[0] == 'app' and segments[1].isdigit():
+            app_id = int(segments[1])
+            if not FIRST_APP_ID <= app_id < FIRST_APP_ID + cfg.apps:
+                return None, None
+            body = render_product(fake_app(app_id, cfg.generation, cfg.change_rate))
+            return body.encode('utf-8'), 'text/html; charset=utf-8'
+
+        return None, None
+
+
+class Counter:
+    """Thread-safe request counts per endpoint kind and optional request log."""
+
+    def __init__(self, log_path=None):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.log_file = open(log_path, 'a') if log_path else None
+
+    def log(self, path):
+        if self.log_file:
+            with self.lock:
+                self.log_file.write(path + '\n')
+                self.log_file.flush()
+
+    def hit(self, path, not_modified=False):
+        if path.startswith('/appreviews/'):
+            kind = 'api'
+        elif path.startswith('/search/'):
+            kind = 'search'
+        elif '/reviews/' in path or '/homecontent/' in path:
+            kind = 'html'
+        else:
+            kind = 'not_modified' if not_modified else 'product'
+        with self.lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+
+
+def serve(cfg):
+    server = ThreadingHTTPServer((cfg.host, cfg.port), FixtureHandler)
+    server.cfg = cfg
+    server.counter = Counter(cfg.request_log)
+    print(f'Serving Steam fixtures on http://{cfg.host}:{cfg.port}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.counter.counts))
+
+
+if __name__ == '__main__':
+    serve(parse_args())
@@ -0,0 +1,254 @@
+"""
+Run a sharded review crawl on one machine: one `scrapy crawl reviews`
+process per url file (e.g. from split_review_urls.py), at most --processes
+at a time, each with its own frontier, HTTP cache and log under
+<workdir>/shard_NN. Progress (pages from the frontiers, items from the
+outputs) is printed every --interval seconds, and the outputs are merged
+into one .jl without repeated (product_id, user_id) reviews, as
+SteamPipeline drops them within a crawl.
+
+Interrupted runs resume: rerunning the same command continues every shard
+from its frontier.
+
+With --fixture the crawl runs against fixture_server.py on synthetic
+products, split into as many shards as processes, once per --scale process
+count, and aggregate pages per second are reported for each. Politeness
+limits (CONCURRENT_REQUESTS_PER_DOMAIN, AutoThrottle) apply per process, so
+N processes put N times the load on a host.
+
+Run example:
+    $ python run_local_crawl.py --url-files ../output/review_urls_*.txt \
+        --workdir ../output/local_crawl --processes 4 --output ../output/reviews_all.jl
+    $ python run_local_crawl.py --fixture --products 64 --reviews-per-app 300 \
+        --latency-ms 50 --scale 1 2 4 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_reviews import PROJECT_DIR, SCRIPTS_DIR, free_port
+
+sys.path.insert(0, PROJECT_DIR)
+from steam.frontier import Frontier  # noqa: E402
+from steam.pipelines import Hash64Set, key_hash  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url-files', nargs='*', default=[], help='Review url shards.')
+    parser.add_argument('--workdir', help='Per-shard frontiers, caches, logs and outputs.')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                        help='Crawler processes running at once.')
+    parser.add_argument('--output', help='Merged, deduplicated reviews .jl.')
+    parser.add_argument('--mode', default='html', choices=['html', 'api'])
+    parser.add_argument('--interval', type=float, default=10, help='Seconds between progress lines.')
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='Extra Scrapy setting for every crawler.')
+    parser.add_argument('--fixture', action='store_true',
+                        help='Crawl synthetic products from a local fixture server.')
+    parser.add_argument('--products', type=int, default=64)
+    parser.add_argument('--reviews-per-app', type=int, default=300)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--scale', type=int, nargs='*',
+                        help='Process counts to compare (--fixture only), default --processes.')
+    parser.add_argument('--report', help='JSON report file.')
+    return parser.parse_args()
+
+
+class Shard:
+    def __init__(self, n, url_file, workdir):
+        self.name = f'shard_{n:02d}'
+        self.url_file = os.path.abspath(url_file)
+        self.dir = os.path.join(os.path.abspath(workdir), self.name)
+        os.makedirs(self.dir, exist_ok=True)
+        self.frontier = os.path.join(self.dir, 'frontier.sqlite')
+        self.output = os.path.join(self.dir, 'reviews.jl')
+        self.log = os.path.join(self.dir, 'crawl.log')
+        self.proc = None
+        self.items = 0
+        self.offset = 0
+
+    def start(self, args, extra_args=()):
+        cmd = [
+            sys.executable, '-m', 'scrapy', 'crawl', 'reviews',
+            '-a', f'url_file={self.url_file}', '-a', f'mode={args.mode}',
+            '-a', f'frontier={self.frontier}', *extra_args,
+            '-o', self.output, '--logfile', self.log,
+            '-s', f'HTTPCACHE_DIR={os.path.join(self.dir, "httpcache")}',
+            '-s', 'LOG_LEVEL=INFO',
+        ]
+        for setting in args.set:
+            cmd += ['-s', setting]
+        self.proc = subprocess.Popen(cmd, cwd=PROJECT_DIR, stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.DEVNULL)
+
+    def pages(self):
+        if not os.path.exists(self.frontier):
+            return 0
+        frontier = Frontier(self.frontier)
+        try:
+            return frontier.pages_done()
+        finally:
+            frontier.close()
+
+    def count_items(self):
+        """Items in the output so far, reading only what was appended."""
+        if os.path.exists(self.output):
+            with open(self.output, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+            # Count complete lines only; a partial last line is read again.
+            complete = data.rfind(b'\n') + 1
+            self.items += data.count(b'\n', 0, complete)
+            self.offset += complete
+        return self.items
+
+
+def run_shards(args, url_files, workdir, processes, extra_args=()):
+    """Crawl every url file in its own process; returns (shards, wall seconds)."""
+    shards = [Shard(n, f, workdir) for n, f in enumerate(url_files, start=1)]
+    pending = list(shards)
+    running = []
+    started = time.perf_counter()
+    last_report, last_pages = started, sum(s.pages() for s in shards)
+    while pending or running:
+        while pending and len(running) < processes:
+            shard = pending.pop(0)
+            shard.start(args, extra_args)
+            running.append(shard)
+        time.sleep(min(args.interval, 1))
+        running = [s for s in running if s.proc.poll() is None]
+
+        now = time.perf_counter()
+        if now - last_report >= args.interval or not (pending or running):
+            pages = sum(s.pages() for s in shards)
+            items = sum(s.count_items() for s in shards)
+            print(f'{now - started:>7.1f}s  {len(running)} running, {len(pending)} pending  '
+                  f'{pages} pages  {items} items  '
+                  f'{(pages - last_pages) / (now - last_report):.1f} pages/s', flush=True)
+            last_report, last_pages = now, pages
+
+    failed = [s.name for s in shards if s.proc.returncode != 0]
+    if failed:
+        print(f'Crawls failed: {", ".join(failed)}, see their crawl.log.')
+    return shards, time.perf_counter() - started
+
+
+def merge(shards, output):
+    """Concatenate shard outputs, dropping repeated (product_id, user_id) reviews."""
+    seen = Hash64Set()
+    written = dropped = 0
+    with open(output, 'w', encoding='utf-8') as out:
+        for shard in shards:
+            if not os.path.exists(shard.output):
+                continue
+            with open(shard.output, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    review = json.loads(line)
+                    if review.get('user_id') and \
+                            not seen.add(key_hash(review.get('product_id'), review['user_id'])):
+                        dropped += 1
+                        continue
+                    out.write(line if line.endswith('\n') else line + '\n')
+                    written += 1
+    return written, dropped
+
+
+def summarize(processes, shards, wall):
+    pages = sum(s.pages() for s in shards)
+    return {
+        'processes': processes,
+        'shards': len(shards),
+        'pages': pages,
+        'items': sum(s.count_items() for s in shards),
+        'wall_seconds': round(wall, 2),
+        'pages_per_second': round(pages / wall, 1) if wall else None,
+    }
+
+
+def start_fixture(args, port):
+    cmd = [sys.executable, os.path.join(SCRIPTS_DIR, 'fixture_server.py'), '--port', str(port),
+           '--reviews-per-app', str(args.reviews_per_app), '--latency-ms', str(args.latency_ms)]
+    server = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()
+    return server
+
+
+def write_fixture_shards(base, n_products, pieces, workdir):
+    """Synthetic review urls, dealt round robin into `pieces` url files."""
+    os.makedirs(workdir, exist_ok=True)
+    files = [os.path.join(workdir, f'review_urls_{n:02d}.txt') for n in range(1, pieces + 1)]
+    urls = [f'{base}/app/{100000 + i}/reviews/?browsefilter=mostrecent&p=1' for i in range(n_products)]
+    for n, file_name in enumerate(files):
+        with open(file_name, 'w') as f:
+            f.write('\n'.join(urls[n::pieces]) + '\n')
+    return files
+
+
+def run_fixture(args, workdir):
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    server = start_fixture(args, port)
+    extra_args = ['-a', f'api_base={base}']
+    fixture_settings = ['HTTPCACHE_ENABLED=False', 'AUTOTHROTTLE_ENABLED=False', 'ROBOTSTXT_OBEY=False']
+    args.set = fixture_settings + args.set
+    results = []
+    try:
+        for processes in args.scale or [args.processes]:
+            run_dir = os.path.join(workdir, f'processes_{processes:02d}')
+            url_files = write_fixture_shards(base, args.products, processes, run_dir)
+            print(f'== {processes} processes')
+            shards, wall = run_shards(args, url_files, run_dir, processes, extra_args)
+            result = summarize(processes, shards, wall)
+            result['merged_items'], result['duplicates_dropped'] = merge(
+                shards, os.path.join(run_dir, 'reviews.jl'))
+            results.append(result)
+    finally:
+        server.terminate()
+        server.wait()
+
+    expected = args.products * args.reviews_per_app
+    base_rate = results[0]['pages_per_second']
+    print(f'\n{os.cpu_count()} CPUs, {args.products} products x {args.reviews_per_app} reviews, '
+          f'{args.latency_ms:.0f} ms latency')
+    print('processes      pages   seconds   pages/s   speedup   items')
+    for r in results:
+        r['speedup'] = round(r['pages_per_second'] / base_rate, 2) if base_rate else None
+        print(f"{r['processes']:>9} {r['pages']:>10} {r['wall_seconds']:>9.1f} "
+              f"{r['pages_per_second']:>9.1f} {r['speedup']:>8.2f}x "
+              f"{r['merged_items']:>7}{'' if r['merged_items'] == expected else ' (expected %d)' % expected}")
+    return results
+
+
+def main():
+    args = parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix='local_crawl_')
+    os.makedirs(workdir, exist_ok=True)
+
+    if args.fixture:
+        report = run_fixture(args, workdir)
+    else:
+        if not args.url_files:
+            sys.exit('Pass --url-files, or --fixture.')
+        shards, wall = run_shards(args, args.url_files, workdir, args.processes)
+        report = summarize(args.processes, shards, wall)
+        output = args.output or os.path.join(workdir, 'reviews.jl')
+        report['merged_items'], report['duplicates_dropped'] = merge(shards, output)
+        print(f"{report['pages']} pages in {report['wall_seconds']}s "
+              f"({report['pages_per_second']} pages/s), {report['merged_items']} reviews "
+              f"({report['duplicates_dropped']} duplicates dropped) in {output}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Saved {args.report}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,24 @@
 """
-Load scraped product items into DataFrame, write review urls into N text files.
+Partition the review urls of scraped products into N text files of about
+equal crawl work, for parallel review crawls.
+
+Work is estimated in pages, ceil(n_reviews / page size), since review pages
+of a product are fetched one after another. Products are assigned, largest
+first, to the file with the least work so far (greedy longest processing
+time), and each file lists its products largest first. The products file
+is streamed; only (url, pages) pairs are kept. A manifest with the expected
+load of every file is written next to them.
 
 Run example:
     $ python split_review_urls.py \
         --scraped-products $(pwd)/../output/products_.jl \
-        --output-dir $(pwd)/../output
+        --output-dir $(pwd)/../output --pieces 10
 """
 import argparse
+import heapq
 import json
 import math
 import os
-from random import shuffle
-
-import numpy as np
-import pandas as pd
 
 
 def parse_args():
@@ -30,42 +35,128 @@ def parse_args():
     parser.add_argument(
         '--pieces',
         help='Number of URL files to produce.',
+        type=int,
         default=10
     )
+    parser.add_argument(
+        '--page-size',
+        help='Reviews per page: 10 for HTML review pages, num_per_page in API mode.',
+        type=int,
+        default=10
+    )
+    parser.add_argument(
+        '--max-pages',
+        help='Cap on pages per product, as the crawl\'s REVIEW_MAX_PAGES (0 = no cap).',
+        type=int,
+        default=0
+    )
     return parser.parse_args()
 
 
-def main():
-    args = parse_args()
-
-    with open(args.scraped_products) as f:
-        rows = [json.loads(l) for l in f]
+def iter_products(path):
+    """Products of a .jl file one line at a time, skipping malformed lines."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                product = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(product, dict):
+                yield product
+
+
+def read_work(path, page_size, max_pages=0):
+    """
+    Stream products into {reviews_url: (pages, n_reviews)}, skipping products
+    that lack basic data or have no reviews. Repeated urls are kept once.
+    """
+    work = {}
+    for product in iter_products(path):
+        if not all(product.get(c) for c in ('id', 'reviews_url', 'title')):
+            continue
+        try:
+            n_reviews = int(float(str(product.get('n_reviews') or 0).replace(',', '')))
+        except (TypeError, ValueError):
+            continue
+        if n_reviews <= 0:
+            continue
+        pages = math.ceil(n_reviews / page_size)
+        if max_pages:
+            pages = min(pages, max_pages)
+        work[product['reviews_url']] = (pages, n_reviews)
+    return work
+
+
+def partition(work, pieces):
+    """
+    Longest processing time first: every url, largest first, goes to the
+    shard with the fewest pages so far. Returns a list of shards, each a
+    dict of its urls (largest first), pages and reviews.
+    """
+    shards = [{'urls': [], 'pages': 0, 'reviews': 0} for _ in range(pieces)]
+    heap = [(0, i) for i in range(pieces)]
+    for url, (pages, n_reviews) in sorted(work.items(), key=lambda kv: (-kv[1][0], kv[0])):
+        load, i = heapq.heappop(heap)
+        shards[i]['urls'].append(url)
+        shards[i]['pages'] += pages
+        shards[i]['reviews'] += n_reviews
+        heapq.heappush(heap, (load + pages, i))
+    return shards
 
-    df = pd.DataFrame(rows)
 
-    # Filter out URLs for products that lack basic data or have no reviews.
-    blx_nontrivial = np.all(df[['id', 'reviews_url', 'title']].notnull(), axis=1)
-    blx_has_reviews = df['n_reviews'] > 0
-    blx = blx_nontrivial & blx_has_reviews
-
-    urls = df.loc[blx, 'reviews_url'].unique()
-    urls = shuffle(urls)
+def main():
+    args = parse_args()
 
-    n = len(urls)
-    step = int(math.ceil(float(n)/args.pieces))
+    work = read_work(args.scraped_products, args.page_size, args.max_pages)
+    shards = partition(work, args.pieces)
 
-    for n_part, bound in enumerate(range(0, n, step), start=1):
+    manifest_shards = []
+    for n_part, shard in enumerate(shards, start=1):
         file_name = os.path.join(
             args.output_dir,
             'review_urls_{:02d}.txt'.format(n_part)
         )
 
         with open(file_name, 'w') as f:
-            piece = urls[bound:bound + step]
-            f.write('\n'.join(piece))
+            f.write('\n'.join(shard['urls']))
+
+        manifest_shards.append({
+            'file': os.path.basename(file_name),
+            'products': len(shard['urls']),
+            'pages': shard['pages'],
+            'reviews': shard['reviews'],
+        })
+
+    # No split can finish before its largest product or the average share.
+    total_pages = sum(pages for pages, _ in work.values())
+    makespan = max((s['pages'] for s in shards), default=0)
+    lower_bound = max(math.ceil(total_pages / args.pieces),
+                      max((pages for pages, _ in work.values()), default=0))
+    manifest = {
+        'source': os.path.abspath(args.scraped_products),
+        'pieces': args.pieces,
+        'page_size': args.page_size,
+        'max_pages': args.max_pages,
+        'products': len(work),
+        'reviews': sum(n for _, n in work.values()),
+        'pages': total_pages,
+        'max_shard_pages': makespan,
+        'lower_bound_pages': lower_bound,
+        'imbalance': round(makespan / lower_bound, 4) if lower_bound else 1.0,
+        'shards': manifest_shards,
+    }
+    manifest_name = os.path.join(args.output_dir, 'review_urls_manifest.json')
+    with open(manifest_name, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print("There are <={0} reviews ({1} pages) to be scraped.".format(
+        manifest['reviews'], total_pages))
+    print("Largest shard: {0} pages, {1:.1%} above the best possible split; see {2}.".format(
+        makespan, manifest['imbalance'] - 1, manifest_name))
 
-    n_items = int(df.loc[blx, 'n_reviews'].sum())
-    print("There are <={0} reviews to be scraped.".format(n_items))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,262 @@
+import gzip
+import logging
+import os
+import pickle
+import shutil
+import sqlite3
+import zlib
+from time import time
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from scrapy.utils.request import request_fingerprint
+from w3lib.http import headers_raw_to_dict
+
+from .middlewares import strip_snr
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    pack INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    codec TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    url TEXT,
+    status INTEGER
+)
+"""
+COMMIT_EVERY = 100
+
+
+def compressor(codec, level=3):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImportError('HTTPCACHE_PACK_CODEC = zstd requires the zstandard package.')
+        return zstandard.ZstdCompressor(level=level).compress
+    if codec == 'gzip':
+        return lambda data: zlib.compress(data, level)
+    return lambda data: data
+
+
+def decompress(codec, data):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'gzip':
+        return zlib.decompress(data)
+    return data
+
+
+def default_codec():
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+class PackCache:
+    """
+    Responses appended, compressed, to a few large pack-NNNNN.dat files,
+    with a sqlite index of key -> (pack, offset, length). Keeps a spider's
+    cache to a handful of files instead of a directory per request.
+    """
+
+    def __init__(self, path, codec=None, level=3, max_pack_size=2**30):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.codec = codec or default_codec()
+        self.compress = compressor(self.codec, level)
+        self.max_pack_size = max_pack_size
+
+        self.index = sqlite3.connect(os.path.join(path, 'index.sqlite'))
+        self.index.execute('PRAGMA journal_mode=WAL')
+        self.index.execute('PRAGMA synchronous=NORMAL')
+        self.index.execute(INDEX_SCHEMA)
+        self.index.commit()
+        self.pending = 0
+
+        self.readers = {}
+        self.writer = None
+        self.pack = max(self.pack_numbers(), default=0)
+
+    def pack_numbers(self):
+        return [int(name[5:10]) for name in os.listdir(self.path)
+                if name.startswith('pack-') and name.endswith('.dat')]
+
+    def pack_path(self, pack):
+        return os.path.join(self.path, f'pack-{pack:05d}.dat')
+
+    def get(self, key, expiration_secs=0):
+        """Stored record dict for key, or None if missing or expired."""
+        row = self.index.execute(
+            'SELECT pack, offset, length, codec, timestamp FROM responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        pack, offset, length, codec, timestamp = row
+        if 0 < expiration_secs < time() - timestamp:
+            return None
+
+        fd = self.readers.get(pack)
+        if fd is None:
+            fd = self.readers[pack] = os.open(self.pack_path(pack), os.O_RDONLY)
+        return pickle.loads(decompress(codec, os.pread(fd, length, offset)))
+
+    def put(self, key, record, timestamp=None):
+        blob = self.compress(pickle.dumps(record, protocol=4))
+        if self.writer is None or self.writer.tell() + len(blob) > self.max_pack_size:
+            self.roll(len(blob))
+        offset = self.writer.tell()
+        self.writer.write(blob)
+        # Readers use their own descriptors, so data must leave the buffer first.
+        self.writer.flush()
+
+        self.index.execute(
+            'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, self.pack, offset, len(blob), self.codec,
+             timestamp or time(), record.get('url'), record.get('status'))
+        )
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.commit()
+
+    def roll(self, size):
+        """Open the pack to append to: a fresh one once the current is full."""
+        path = self.pack_path(self.pack)
+        if self.writer is not None:
+            self.writer.close()
+            self.pack += 1
+        elif os.path.exists(path) and os.path.getsize(path) + size > self.max_pack_size:
+            self.pack += 1
+        self.writer = open(self.pack_path(self.pack), 'ab')
+
+    def commit(self):
+        self.index.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        for fd in self.readers.values():
+            os.close(fd)
+        self.readers = {}
+        self.index.close()
+
+    def stats(self):
+        count, stored = self.index.execute(
+            'SELECT COUNT(*), COALESCE(SUM(length), 0) FROM responses').fetchone()
+        on_disk = sum(os.path.getsize(self.pack_path(p)) for p in self.pack_numbers())
+        return {'responses': count, 'live_bytes': stored, 'pack_bytes': on_disk,
+                'packs': len(self.pack_numbers())}
+
+
+def compact(path, expiration_secs=0, codec=None, level=3, max_pack_size=2**30):
+    """
+    Rewrite a pack cache keeping only live, unexpired responses (optionally
+    recompressed with another codec); overwritten and orphaned records are
+    dropped. Returns (before, after) stats.
+    """
+    old = PackCache(path, max_pack_size=max_pack_size)
+    before = old.stats()
+    tmp_path = path.rstrip(os.sep) + '.compact'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    new = PackCache(tmp_path, codec=codec or old.codec, level=level, max_pack_size=max_pack_size)
+
+    rows = old.index.execute('SELECT key, timestamp FROM responses ORDER BY pack, offset').fetchall()
+    for key, timestamp in rows:
+        record = old.get(key, expiration_secs)
+        if record is not None:
+            new.put(key, record, timestamp)
+    after = new.stats()
+    old.close()
+    new.close()
+
+    # Swap directories so an interrupted compaction leaves the old cache intact.
+    old_path = path.rstrip(os.sep) + '.old'
+    os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path)
+    return before, after
+
+
+def import_filesystem(cache, spider_dir, use_gzip=False):
+    """Copy a FilesystemCacheStorage spider directory into a PackCache."""
+    opener = gzip.open if use_gzip else open
+    n = 0
+    for shard in os.listdir(spider_dir):
+        shard_dir = os.path.join(spider_dir, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        for key in os.listdir(shard_dir):
+            rpath = os.path.join(shard_dir, key)
+            try:
+                with opener(os.path.join(rpath, 'pickled_meta'), 'rb') as f:
+                    meta = pickle.load(f)
+                with opener(os.path.join(rpath, 'response_headers'), 'rb') as f:
+                    headers = headers_raw_to_dict(f.read())
+                with opener(os.path.join(rpath, 'response_body'), 'rb') as f:
+                    body = f.read()
+            except (OSError, EOFError, pickle.UnpicklingError):
+                logger.warning(f'Skipping unreadable cache entry {rpath}.')
+                continue
+            record = {'url': meta.get('response_url'), 'status': meta['status'],
+                      'headers': headers, 'body': body}
+            cache.put(key, record, meta.get('timestamp'))
+            n += 1
+    cache.commit()
+    return n
+
+
+class SteamPackCacheStorage:
+    """
+    HTTP cache storage backed by a PackCache per spider, in
+    HTTPCACHE_DIR/<spider>.pack. Uses the same snr-stripped fingerprints as
+    SteamCacheStorage and honours HTTPCACHE_EXPIRATION_SECS.
+
+    Settings: HTTPCACHE_PACK_CODEC (zstd, gzip or none; zstd if installed),
+    HTTPCACHE_PACK_LEVEL and HTTPCACHE_PACK_SIZE (bytes per pack file).
+    """
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.codec = settings.get('HTTPCACHE_PACK_CODEC') or None
+        self.level = settings.getint('HTTPCACHE_PACK_LEVEL', 3)
+        self.max_pack_size = settings.getint('HTTPCACHE_PACK_SIZE', 2**30)
+        self.cache = None
+
+    def open_spider(self, spider):
+        path = os.path.join(self.cachedir, f'{spider.name}.pack')
+        self.cache = PackCache(path, self.codec, self.level, self.max_pack_size)
+        logger.debug(f'Using pack cache storage in {path}', extra={'spider': spider})
+
+    def close_spider(self, spider):
+        self.cache.close()
+
+    def retrieve_response(self, spider, request):
+        data = self.cache.get(self._request_key(request), self.expiration_secs)
+        if data is None:
+            return  # not cached or expired
+        url = data['url']
+        headers = Headers(data['headers'])
+        respcls = responsetypes.from_args(headers=headers, url=url)
+        return respcls(url=url, headers=headers, status=data['status'], body=data['body'])
+
+    def store_response(self, spider, request, response):
+        data = {
+            'status': response.status,
+            'url': response.url,
+            'headers': dict(response.headers),
+            'body': response.body,
+        }
+        self.cache.put(self._request_key(request), data)
+
+    def _request_key(self, request):
+        return request_fingerprint(strip_snr(request))
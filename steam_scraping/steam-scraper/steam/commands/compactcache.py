@@ -0,0 +1,57 @@
+import os
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.project import data_path
+
+from ..cache import PackCache, compact, import_filesystem
+
+
+class Command(ScrapyCommand):
+
+    requires_project = True
+    default_settings = {'LOG_ENABLED': False}
+
+    def syntax(self):
+        return '[options] <spider>'
+
+    def short_desc(self):
+        return 'Compact the pack HTTP cache of a spider'
+
+    def long_desc(self):
+        return (
+            'Rewrite HTTPCACHE_DIR/<spider>.pack (see steam/cache.py) keeping only live '
+            'responses younger than HTTPCACHE_EXPIRATION_SECS. With --import-filesystem, '
+            'first copy the spider\'s FilesystemCacheStorage directory into the pack cache.'
+        )
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_option('--codec', help='recompress with zstd, gzip or none')
+        parser.add_option('--import-filesystem', action='store_true',
+                          help='import HTTPCACHE_DIR/<spider> written by the filesystem backend')
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError()
+        settings = self.settings
+        cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        path = os.path.join(cachedir, f'{args[0]}.pack')
+        max_pack_size = settings.getint('HTTPCACHE_PACK_SIZE', 2**30)
+
+        if opts.import_filesystem:
+            cache = PackCache(path, settings.get('HTTPCACHE_PACK_CODEC') or None,
+                              settings.getint('HTTPCACHE_PACK_LEVEL', 3), max_pack_size)
+            n = import_filesystem(cache, os.path.join(cachedir, args[0]),
+                                  settings.getbool('HTTPCACHE_GZIP'))
+            cache.close()
+            print(f'Imported {n} responses into {path}')
+        elif not os.path.isdir(path):
+            raise UsageError(f'No pack cache at {path}')
+
+        before, after = compact(path, settings.getint('HTTPCACHE_EXPIRATION_SECS'),
+                                opts.codec, settings.getint('HTTPCACHE_PACK_LEVEL', 3),
+                                max_pack_size)
+        print(f"{before['responses']} responses, {before['pack_bytes'] / 2**20:.1f} MB -> "
+              f"{after['responses']} responses, {after['pack_bytes'] / 2**20:.1f} MB "
+              f"in {after['packs']} pack(s)")
@@ -0,0 +1,303 @@
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import reactor, task
+from twisted.web import resource, server
+
+logger = logging.getLogger(__name__)
+
+# Sent by CallbackTimingMiddleware after a callback's output is consumed.
+callback_parsed = object()
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+
+def telemetry_enabled(settings):
+    return bool(settings.get('TELEMETRY_FILE')) or settings.get('TELEMETRY_PROMETHEUS_PORT') is not None
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus style: le upper bounds plus +Inf)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None past the last bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+    def prometheus(self, name, labels):
+        lines, cumulative = [], 0
+        for bound, n in zip(list(self.buckets) + ['+Inf'], self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+def callback_name(response, spider):
+    request = response.request
+    if request is None:
+        return 'parse'
+    callback = request.callback
+    # CrawlSpider routes rule links through _callback; name the rule's callback.
+    rule = request.meta.get('rule')
+    if rule is not None and getattr(spider, '_rules', None):
+        callback = spider._rules[rule].callback
+        if callback is None:
+            return 'follow'
+    return getattr(callback, '__name__', None) or 'parse'
+
+
+class CallbackTimingMiddleware:
+    """
+    Spider middleware closest to the spider, timing each callback in wall
+    and CPU seconds. The spiders' callbacks are generators, so their work is
+    done while their output is consumed; only that is timed, not the
+    middlewares and the engine in between. Results are sent as the
+    callback_parsed signal, for Telemetry.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not telemetry_enabled(crawler.settings):
+            raise NotConfigured
+        return cls(crawler)
+
+    def process_spider_output(self, response, result, spider):
+        wall, cpu = 0.0, 0.0
+        iterator = iter(result)
+        while True:
+            t, c = time.perf_counter(), time.process_time()
+            try:
+                out = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                wall += time.perf_counter() - t
+                cpu += time.process_time() - c
+            yield out
+        self.crawler.signals.send_catch_log(
+            callback_parsed, callback=callback_name(response, spider),
+            seconds=wall, cpu_seconds=cpu, spider=spider)
+
+
+class MetricsResource(resource.Resource):
+    """Serves Telemetry.prometheus() on any path."""
+    isLeaf = True
+
+    def __init__(self, telemetry):
+        super().__init__()
+        self.telemetry = telemetry
+
+    def render_GET(self, request):
+        request.setHeader(b'Content-Type', b'text/plain; version=0.0.4')
+        return self.telemetry.prometheus().encode('utf-8')
+
+
+class Telemetry:
+    """
+    Extension collecting where crawl time goes: download latency histograms
+    per response status, parse time per callback (from
+    CallbackTimingMiddleware), items and pages per second, age check round
+    trips, HTTP cache hits/misses, queue depth and the downloader slots'
+    concurrency and AutoThrottle delay.
+
+    Every TELEMETRY_INTERVAL seconds (and at close) a snapshot is written to
+    TELEMETRY_FILE as JSON; with TELEMETRY_PROMETHEUS_PORT the same metrics
+    are served as Prometheus text on http://127.0.0.1:<port>/metrics.
+    """
+
+    def __init__(self, crawler, path=None, interval=30, port=None):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.path = path
+        self.interval = interval
+        self.port = port
+        self.latency = {}
+        self.parse = {}
+        self.parse_cpu = {}
+        self.items = 0
+        self.responses = 0
+        self.previous = (0, 0, None)  # items, responses, time of the last snapshot
+        self.started = None
+        self.task = None
+        self.listener = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not telemetry_enabled(settings):
+            raise NotConfigured
+        ext = cls(crawler, settings.get('TELEMETRY_FILE'),
+                  settings.getfloat('TELEMETRY_INTERVAL', 30),
+                  settings.get('TELEMETRY_PROMETHEUS_PORT'))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.callback_parsed, signal=callback_parsed)
+        return ext
+
+    def spider_opened(self, spider):
+        self.started = time.time()
+        self.previous = (0, 0, self.started)
+        if self.path:
+            self.task = task.LoopingCall(self.write)
+            self.task.start(self.interval, now=False)
+        if self.port is not None:
+            self.listener = reactor.listenTCP(int(self.port), server.Site(MetricsResource(self)),
+                                              interface='127.0.0.1')
+            logger.info(f'Telemetry metrics on http://127.0.0.1:{self.listener.getHost().port}/metrics')
+
+    def response_received(self, response, request, spider):
+        self.responses += 1
+        latency = request.meta.get('download_latency')
+        if latency is None or 'cached' in response.flags:
+            return
+        status = str(response.status)
+        if status not in self.latency:
+            self.latency[status] = Histogram(LATENCY_BUCKETS)
+        self.latency[status].observe(latency)
+
+    def item_scraped(self, item, response, spider):
+        self.items += 1
+
+    def callback_parsed(self, callback, seconds, cpu_seconds, spider):
+        if callback not in self.parse:
+            self.parse[callback] = Histogram(PARSE_BUCKETS)
+            self.parse_cpu[callback] = 0.0
+        self.parse[callback].observe(seconds)
+        self.parse_cpu[callback] += cpu_seconds
+
+    def counters(self, prefix):
+        return {k[len(prefix):]: v for k, v in self.stats.get_stats().items()
+                if k.startswith(prefix)}
+
+    def downloader(self):
+        engine = self.crawler.engine
+        slots = {key: {'concurrency': slot.concurrency, 'delay': round(slot.delay, 3),
+                       'active': len(slot.active), 'queued': len(slot.queue)}
+                 for key, slot in engine.downloader.slots.items()}
+        return {
+            'in_flight': len(engine.downloader.active),
+            'queue_depth': len(engine.slot.scheduler) if engine.slot else 0,
+            'slots': slots,
+        }
+
+    def snapshot(self):
+        now = time.time()
+        items, responses, then = self.previous
+        window = now - then if then else 0
+        elapsed = now - self.started if self.started else 0
+        self.previous = (self.items, self.responses, now)
+        return {
+            'time': round(now, 3),
+            'elapsed_seconds': round(elapsed, 1),
+            'items': self.items,
+            'responses': self.responses,
+            'items_per_second': round((self.items - items) / window, 2) if window else None,
+            'pages_per_second': round((self.responses - responses) / window, 2) if window else None,
+            'items_per_second_overall': round(self.items / elapsed, 2) if elapsed else None,
+            'download_latency_seconds': {s: h.summary() for s, h in sorted(self.latency.items())},
+            'parse_seconds': {
+                c: dict(h.summary(), cpu_seconds=round(self.parse_cpu[c], 3))
+                for c, h in sorted(self.parse.items())
+            },
+            'agecheck': self.counters('agecheck/'),
+            'httpcache': self.counters('httpcache/'),
+            'settings': {
+                'CONCURRENT_REQUESTS': self.crawler.settings.getint('CONCURRENT_REQUESTS'),
+                'CONCURRENT_REQUESTS_PER_DOMAIN':
+                    self.crawler.settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN'),
+                'AUTOTHROTTLE_ENABLED': self.crawler.settings.getbool('AUTOTHROTTLE_ENABLED'),
+                'AUTOTHROTTLE_TARGET_CONCURRENCY':
+                    self.crawler.settings.getfloat('AUTOTHROTTLE_TARGET_CONCURRENCY'),
+            },
+            'downloader': self.downloader(),
+        }
+
+    def write(self):
+        snapshot = self.snapshot()
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def prometheus(self):
+        lines = [
+            '# TYPE steam_items_scraped_total counter',
+            f'steam_items_scraped_total {self.items}',
+            '# TYPE steam_responses_total counter',
+            f'steam_responses_total {self.responses}',
+            '# TYPE steam_download_latency_seconds histogram',
+        ]
+        for status, histogram in sorted(self.latency.items()):
+            lines += histogram.prometheus('steam_download_latency_seconds', f'status="{status}"')
+        lines.append('# TYPE steam_parse_seconds histogram')
+        for callback, histogram in sorted(self.parse.items()):
+            lines += histogram.prometheus('steam_parse_seconds', f'callback="{callback}"')
+        lines.append('# TYPE steam_parse_cpu_seconds_total counter')
+        for callback, seconds in sorted(self.parse_cpu.items()):
+            lines.append(f'steam_parse_cpu_seconds_total{{callback="{callback}"}} {seconds:.6f}')
+        lines.append('# TYPE steam_agecheck_total counter')
+        for kind, n in sorted(self.counters('agecheck/').items()):
+            lines.append(f'steam_agecheck_total{{kind="{kind}"}} {n}')
+        lines.append('# TYPE steam_httpcache_total counter')
+        for result, n in sorted(self.counters('httpcache/').items()):
+            lines.append(f'steam_httpcache_total{{result="{result}"}} {n}')
+        if self.crawler.engine is not None and self.crawler.engine.downloader is not None:
+            downloader = self.downloader()
+            lines += [
+                '# TYPE steam_requests_in_flight gauge',
+                f'steam_requests_in_flight {downloader["in_flight"]}',
+                '# TYPE steam_queue_depth gauge',
+                f'steam_queue_depth {downloader["queue_depth"]}',
+                '# TYPE steam_slot_delay_seconds gauge',
+            ]
+            for key, slot in sorted(downloader['slots'].items()):
+                lines.append(f'steam_slot_delay_seconds{{slot="{key}"}} {slot["delay"]}')
+        return '\n'.join(lines) + '\n'
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+        if self.path:
+            self.write()
+        if self.listener is not None:
+            self.listener.stopListening()
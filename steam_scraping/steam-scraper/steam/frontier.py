@@ -0,0 +1,75 @@
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_id TEXT PRIMARY KEY,
+    page INTEGER NOT NULL,
+    url TEXT,
+    cursor TEXT,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+)
+"""
+
+
+class Frontier:
+    """
+    Persistent review crawl frontier: for every product the next page to
+    fetch (its url in HTML mode, its cursor in API mode) or that the product
+    is finished.
+
+    A product is advanced from the callback that parsed its current page, so
+    after a restart only pages that were in flight are fetched again. Every
+    update is its own transaction; WAL keeps that cheap and a killed crawl
+    never leaves the file half written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def get(self, product_id):
+        """(page, url, cursor, done) of a product, or None if never seen."""
+        return self.conn.execute(
+            'SELECT page, url, cursor, done FROM products WHERE product_id = ?',
+            (str(product_id),)
+        ).fetchone()
+
+    def advance(self, product_id, page, url=None, cursor=None):
+        """Record that `page` (at url or cursor) is the next page of product_id."""
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, 0, ?)',
+                (str(product_id), page, url, cursor, time.time())
+            )
+
+    def finish(self, product_id, page):
+        """Mark product_id as complete after its last page, `page`."""
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO products VALUES (?, ?, NULL, NULL, 1, ?)',
+                (str(product_id), page, time.time())
+            )
+
+    def counts(self):
+        """(finished, in progress) product counts."""
+        done, total = self.conn.execute(
+            'SELECT COALESCE(SUM(done), 0), COUNT(*) FROM products').fetchone()
+        return done, total - done
+
+    def pages_done(self):
+        """Pages processed so far over all products."""
+        return self.conn.execute(
+            'SELECT COALESCE(SUM(CASE WHEN done THEN page ELSE page - 1 END), 0) FROM products'
+        ).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
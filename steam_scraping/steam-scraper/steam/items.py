@@ -1,12 +1,18 @@
 from datetime import datetime, date
+from functools import lru_cache
 import logging
 
 import scrapy
+from lxml import etree
+from parsel.csstranslator import HTMLTranslator
 from scrapy.loader import ItemLoader
 from scrapy.loader.processors import Compose, Join, MapCompose, TakeFirst
+from w3lib.html import replace_entities
 
 logger = logging.getLogger(__name__)
 
+_css_translator = HTMLTranslator()
+
 
 class StripText:
     def __init__(self, chars=' \r\t\n'):
@@ -28,6 +34,14 @@ def standardize_date(x):
     Convert x from recognized input formats to desired output format,
     or leave unchanged if input format is not recognized.
     """
+    # The current year is part of the key: year-less dates take it, and a
+    # crawl may run across New Year.
+    return _standardize_date(x, date.today().year)
+
+
+@lru_cache(maxsize=2**16)
+def _standardize_date(x, year):
+    """Memoised: a crawl sees few distinct date strings."""
     fmt_fail = False
 
     for fmt in ['%b %d, %Y', '%B %d, %Y']:
@@ -40,7 +54,7 @@ def standardize_date(x):
     for fmt in ['%b %d', '%B %d']:
         try:
             d = datetime.strptime(x, fmt)
-            d = d.replace(year=date.today().year)
+            d = d.replace(year=year)
             return d.strftime('%Y-%m-%d')
         except ValueError:
             fmt_fail = True
@@ -66,6 +80,35 @@ def str_to_int(x):
         return x
 
 
+def css_xpath(css):
+    """
+    Precompiled lxml XPath for a CSS selector, including parsel's ::text
+    and ::attr() pseudo-elements. Evaluate it on Selector.root.
+    """
+    return etree.XPath(_css_translator.css_to_xpath(css))
+
+
+def take_first(values):
+    """TakeFirst() on XPath results, as plain strings."""
+    for value in values:
+        if value is not None and value != '':
+            return str(value)
+    return None
+
+
+def first_match(regex, values):
+    """First group match of a precompiled regex, as ItemLoader's re= + TakeFirst()."""
+    for value in values:
+        for match in regex.findall(value):
+            if match != '':
+                return replace_entities(match, keep=['lt', 'amp']) if '&' in match else match
+    return None
+
+
+def strip_text(value, chars=' \r\t\n'):
+    return value.strip(chars) if isinstance(value, str) else value
+
+
 class ProductItem(scrapy.Item):
     url = scrapy.Field()
     id = scrapy.Field()
@@ -39,8 +39,9 @@ class CircumventAgeCheckMiddleware(RedirectMiddleware):
             return super()._redirect(redirected, request, spider, reason)
 
         logger.debug(f'Button-type age check triggered for {request.url}.')
+        spider.crawler.stats.inc_value('agecheck/button', spider=spider)
 
         return Request(url=request.url,
                        cookies={'mature_content': '1'},
-                       meta={'dont_cache': True},
+                       meta={'dont_cache': True, 'listing': request.meta.get('listing')},
                        callback=spider.parse_product)
@@ -4,8 +4,341 @@
 #
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: http://doc.scrapy.org/en/latest/topics/item-pipeline.html
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from array import array
+
+from scrapy.exceptions import DropItem
+
+from .items import ProductItem, ReviewItem
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Column kinds as in steam_scraping/ingest.py, so shard directories are
+# dataio columnar tables (parquet) or JSON-lines shard directories (ndjson).
+PRODUCT_COLUMNS = {
+    'id': 'int64',
+    'app_name': 'str',
+    'title': 'str',
+    'url': 'str',
+    'reviews_url': 'str',
+    'genres': 'list',
+    'tags': 'list',
+    'specs': 'list',
+    'developer': 'dict',
+    'publisher': 'dict',
+    'release_date': 'dict',
+    'price': 'dict',
+    'discount_price': 'dict',
+    'sentiment': 'dict',
+    'n_reviews': 'int64',
+    'metascore': 'int64',
+    'early_access': 'bool',
+    'description': 'list',  # Text snippets of the store page
+}
+
+REVIEW_COLUMNS = {
+    'product_id': 'int64',
+    'user_id': 'int64',
+    'recommended': 'bool',
+    'date': 'dict',
+    'hours': 'float32',
+    'found_helpful': 'int64',
+    'found_unhelpful': 'int64',
+    'found_funny': 'int64',
+    'products': 'int64',
+    'early_access': 'bool',
+    'compensation': 'dict',
+    'username': 'dict',
+    'page': 'int32',
+    'page_order': 'int32',
+    'text': 'str',
+}
+
+INT_MISSING = -1
+
+
+def to_int(value):
+    if value is None or value == '':
+        return INT_MISSING
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(str(value).replace(',', '')))
+        except ValueError:
+            return INT_MISSING
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def to_str(value):
+    return '' if value is None else str(value)
+
+
+def to_list(value):
+    if value is None:
+        return []
+    return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+
+
+# kind -> (column buffer factory, value coercion)
+BUFFERS = {
+    'int32': (lambda: array('q'), to_int),
+    'int64': (lambda: array('q'), to_int),
+    'float32': (lambda: array('d'), to_float),
+    'bool': (lambda: array('b'), lambda v: bool(v) and v not in ('False', 'false', '0')),
+    'str': (list, to_str),
+    'dict': (list, to_str),
+    'list': (list, to_list),
+}
+
+
+def key_hash(*values):
+    """Non-zero 64-bit hash of a key tuple."""
+    digest = hashlib.blake2b(':'.join(map(str, values)).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+class Hash64Set:
+    """
+    Open-addressing set of non-zero 64-bit hashes, 8 bytes per slot (vs.
+    ~70 bytes per entry of a set of ints), kept at most half full.
+    """
+
+    def __init__(self, capacity=2**16):
+        self.slots = array('Q', bytes(8 * capacity))
+        self.mask = capacity - 1
+        self.size = 0
+
+    def add(self, h):
+        """Insert h; False if it was already present."""
+        slots, mask = self.slots, self.mask
+        i = h & mask
+        while True:
+            v = slots[i]
+            if v == 0:
+                slots[i] = h
+                self.size += 1
+                if 2 * self.size > len(slots):
+                    self._grow()
+                return True
+            if v == h:
+                return False
+            i = (i + 1) & mask
+
+    def _grow(self):
+        old = self.slots
+        self.slots = array('Q', bytes(16 * len(old)))
+        self.mask = len(self.slots) - 1
+        self.size = 0
+        for h in old:
+            if h:
+                self.add(h)
+
+    def __len__(self):
+        return self.size
+
+
+class ShardWriter:
+    """
+    Typed column buffers for one item type, written as a part file every
+    `shard_items` rows:
+        parquet  <dir>/bucket=000/part-*.parquet plus _schema.json (dataio columnar table)
+        ndjson   <dir>/part-*.jl.gz
+    One line of statistics per shard is appended to <dir>/_shards.jl.
+    """
+
+    def __init__(self, path, columns, file_format, shard_items, stats=None):
+        self.path = path
+        self.columns = columns
+        self.format = file_format
+        self.shard_items = shard_items
+        self.stats = stats
+        self.prefix = f'part-{int(time.time())}-{os.getpid()}'
+        self.parts = 0
+        self.rows = 0
+        self.reset()
+        os.makedirs(path, exist_ok=True)
+
+    def reset(self):
+        self.buffers = {c: BUFFERS[kind][0]() for c, kind in self.columns.items()}
+        self.buffered = 0
+        self.dropped = 0
+
+    def write(self, item):
+        for c, kind in self.columns.items():
+            self.buffers[c].append(BUFFERS[kind][1](item.get(c)))
+        self.buffered += 1
+        if self.buffered >= self.shard_items:
+            self.flush()
+
+    def flush(self):
+        if not self.buffered:
+            return
+        started = time.time()
+        name = f'{self.prefix}-{self.parts:05d}'
+        if self.format == 'parquet':
+            file_name = self.write_parquet(name)
+        else:
+            file_name = self.write_ndjson(name)
+
+        shard = {
+            'file': os.path.relpath(file_name, self.path),
+            'rows': self.buffered,
+            'bytes': os.path.getsize(file_name),
+            'seconds': round(time.time() - started, 3),
+            'duplicates_dropped': self.dropped,
+            'missing': {c: self.count_missing(c) for c in self.columns
+                        if self.columns[c] not in ('bool', 'list')},
+        }
+        with open(os.path.join(self.path, '_shards.jl'), 'a') as f:
+            f.write(json.dumps(shard) + '\n')
+        logger.info(f"Wrote {shard['rows']} rows ({shard['bytes'] / 2**20:.1f} MB) to {file_name}")
+
+        self.parts += 1
+        self.rows += self.buffered
+        if self.stats:
+            self.stats.inc_value('shards/files')
+            self.stats.inc_value('shards/rows', self.buffered)
+            self.stats.inc_value('shards/bytes', shard['bytes'])
+        self.reset()
+
+    def count_missing(self, column):
+        kind = self.columns[column]
+        values = self.buffers[column]
+        if kind.startswith('int'):
+            return sum(1 for v in values if v == INT_MISSING)
+        if kind.startswith('float'):
+            return sum(1 for v in values if v != v)
+        return sum(1 for v in values if not v)
+
+    def write_parquet(self, name):
+        arrays = []
+        for c, kind in self.columns.items():
+            values = self.buffers[c]
+            if kind == 'list':
+                arrays.append(pa.array(values, pa.list_(pa.string())))
+            elif kind == 'dict':
+                arrays.append(pa.array(values, pa.string()).dictionary_encode())
+            elif kind == 'str':
+                arrays.append(pa.array(values, pa.string()))
+            elif kind == 'bool':
+                arrays.append(pa.array([bool(v) for v in values], pa.bool_()))
+            else:
+                arrays.append(pa.array(values, getattr(pa, kind)()))
+        bucket_dir = os.path.join(self.path, 'bucket=000')
+        os.makedirs(bucket_dir, exist_ok=True)
+        file_name = os.path.join(bucket_dir, name + '.parquet')
+        pq.write_table(pa.Table.from_arrays(arrays, names=list(self.columns)), file_name,
+                       compression='zstd')
+        return file_name
+
+    def write_ndjson(self, name):
+        file_name = os.path.join(self.path, name + '.jl.gz')
+        columns = list(self.columns)
+        with gzip.open(file_name, 'wt', encoding='utf-8', compresslevel=6) as f:
+            for row in zip(*(self.buffers[c] for c in columns)):
+                record = dict(zip(columns, row))
+                for c, kind in self.columns.items():
+                    if kind == 'bool':
+                        record[c] = bool(record[c])
+                    elif kind.startswith('float') and record[c] != record[c]:
+                        record[c] = None
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return file_name
+
+    def close(self):
+        self.flush()
+        if self.format != 'parquet':
+            return
+        # Several crawls may add parts to the same table.
+        meta_path = os.path.join(self.path, '_schema.json')
+        rows = self.rows
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                rows += json.load(f).get('rows', 0)
+        meta = {'format': 'parquet', 'columns': self.columns, 'partition_by': None,
+                'n_buckets': 1, 'rows': rows}
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f, indent=2)
 
 
 class SteamPipeline(object):
+    """
+    Drops repeated reviews of a product by the same user (kept as 64-bit
+    hashes in a Hash64Set) and, when SHARD_OUTPUT_DIR is set, buffers items
+    into typed columns written every SHARD_ITEMS items to
+    <SHARD_OUTPUT_DIR>/<products|reviews> as SHARD_FORMAT (parquet when
+    pyarrow is installed, else ndjson) shards.
+    """
+
+    def __init__(self, output_dir=None, file_format=None, shard_items=50000, dedupe=True,
+                 stats=None):
+        self.output_dir = output_dir
+        self.format = file_format or ('parquet' if pa is not None else 'ndjson')
+        if self.format == 'parquet' and pa is None:
+            raise RuntimeError('SHARD_FORMAT = parquet requires pyarrow.')
+        self.shard_items = shard_items
+        self.stats = stats
+        self.seen = Hash64Set() if dedupe else None
+        self.writers = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            output_dir=settings.get('SHARD_OUTPUT_DIR'),
+            file_format=settings.get('SHARD_FORMAT'),
+            shard_items=settings.getint('SHARD_ITEMS', 50000),
+            dedupe=settings.getbool('REVIEW_DEDUPE', True),
+            stats=crawler.stats,
+        )
+
+    def writer(self, item):
+        if isinstance(item, ReviewItem):
+            name, columns = 'reviews', REVIEW_COLUMNS
+        elif isinstance(item, ProductItem):
+            name, columns = 'products', PRODUCT_COLUMNS
+        else:
+            return None
+        if name not in self.writers:
+            self.writers[name] = ShardWriter(os.path.join(self.output_dir, name), columns,
+                                             self.format, self.shard_items, self.stats)
+        return self.writers[name]
+
     def process_item(self, item, spider):
+        if self.seen is not None and isinstance(item, ReviewItem) and item.get('user_id'):
+            if not self.seen.add(key_hash(item.get('product_id'), item['user_id'])):
+                self.stats.inc_value('dedupe/dropped_reviews', spider=spider)
+                if 'reviews' in self.writers:
+                    self.writers['reviews'].dropped += 1
+                raise DropItem(f"Duplicate review of {item.get('product_id')} by {item['user_id']}")
+
+        if self.output_dir:
+            writer = self.writer(item)
+            if writer is not None:
+                writer.write(item)
         return item
+
+    def close_spider(self, spider):
+        for writer in self.writers.values():
+            writer.close()
+        if self.seen is not None:
+            self.stats.set_value('dedupe/unique_reviews', len(self.seen), spider=spider)
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    app_id TEXT PRIMARY KEY,
+    content_hash TEXT,
+    price TEXT,
+    n_reviews INTEGER,
+    listing_hash TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    item TEXT,
+    fetched REAL
+)
+"""
+
+
+def content_hash(item):
+    """Hash of an item's fields, independent of their order."""
+    data = json.dumps(dict(item), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def listing_hash(*values):
+    """Hash of what the search listing shows about an app (price, reviews, ...)."""
+    data = '\x1f'.join('' if v is None else str(v) for v in values)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ProductIndex:
+    """
+    Local index of the product crawl: for every app id the hash of its last
+    scraped item, its price and review count, the hash of its search listing
+    row and the ETag/Last-Modified of its product page.
+
+    ProductSpider uses it to skip apps whose listing row is unchanged, to
+    stop paginating at known releases and to send conditional requests. Each
+    scraped item is compared with the stored one and only changes go to the
+    delta file (see ProductSpider.record).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def get(self, app_id):
+        """Row dict of an app, or None if it was never scraped."""
+        cursor = self.conn.execute('SELECT * FROM products WHERE app_id = ?', (str(app_id),))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([c[0] for c in cursor.description], row))
+
+    def known(self, app_ids):
+        """The subset of app_ids present in the index."""
+        app_ids = [str(a) for a in app_ids]
+        if not app_ids:
+            return set()
+        found = self.conn.execute(
+            f'SELECT app_id FROM products WHERE app_id IN ({",".join("?" * len(app_ids))})',
+            app_ids
+        ).fetchall()
+        return {row[0] for row in found}
+
+    def set_listing(self, app_id, listing):
+        """Remember the listing row hash of an app whose product page was scraped."""
+        with self.conn:
+            self.conn.execute('UPDATE products SET listing_hash = ? WHERE app_id = ?',
+                              (listing, str(app_id)))
+
+    def update(self, item, etag=None, last_modified=None):
+        """
+        Store a scraped item. Returns (op, changed fields): op is 'add' for
+        a new app, 'update' if its content hash changed, else None.
+        """
+        app_id = str(item['id'])
+        new_hash = content_hash(item)
+        old = self.get(app_id)
+        if old is not None and old['content_hash'] == new_hash:
+            self.touch(app_id, etag, last_modified)
+            return None, []
+
+        if old is None:
+            op, changed = 'add', sorted(item)
+        else:
+            previous = json.loads(old['item'] or '{}')
+            changed = sorted(k for k in set(previous) | set(item) if previous.get(k) != item.get(k))
+            op = 'update'
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (app_id, new_hash, None if item.get('price') is None else str(item['price']),
+                 item.get('n_reviews') if isinstance(item.get('n_reviews'), int) else None,
+                 old and old['listing_hash'], etag, last_modified,
+                 json.dumps(dict(item), ensure_ascii=False), time.time())
+            )
+        return op, changed
+
+    def touch(self, app_id, etag=None, last_modified=None):
+        """Record that an app was found unchanged (e.g. 304 Not Modified) now."""
+        with self.conn:
+            self.conn.execute(
+                'UPDATE products SET fetched = ?, etag = COALESCE(?, etag), '
+                'last_modified = COALESCE(?, last_modified) WHERE app_id = ?',
+                (time.time(), etag, last_modified, str(app_id))
+            )
+
+    def stale(self, max_age):
+        """App ids last fetched more than max_age seconds ago."""
+        rows = self.conn.execute('SELECT app_id FROM products WHERE fetched < ? ORDER BY fetched',
+                                 (time.time() - max_age,)).fetchall()
+        return [row[0] for row in rows]
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
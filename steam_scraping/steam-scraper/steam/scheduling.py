@@ -0,0 +1,153 @@
+import json
+import logging
+import re
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+logger = logging.getLogger(__name__)
+
+# Start requests wait behind pages of products already being crawled, so the
+# number of open review chains only grows while there is spare concurrency.
+START_PRIORITY = 0
+FOLLOW_PRIORITY = 1
+
+
+def read_n_reviews(path):
+    """Map product id -> n_reviews from a scraped products .jl file."""
+    n_reviews = {}
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            product = json.loads(line)
+            if product.get('id') is not None:
+                n_reviews[str(product['id'])] = product.get('n_reviews') or 0
+    return n_reviews
+
+
+def request_product_id(request):
+    product_id = request.meta.get('product_id')
+    if product_id:
+        return str(product_id)
+    found_id = re.findall(r'app/(\d+)', request.url)
+    return found_id[0] if found_id else None
+
+
+def request_page(request):
+    """Page number a review request will fetch (HTML or API mode)."""
+    if 'from_page' in request.meta and request.meta['from_page']:
+        return request.meta['from_page'] + 1
+    return request.meta.get('page', 1)
+
+
+class ReviewSchedulingMiddleware:
+    """
+    Spider middleware ordering the review crawl.
+
+    Review pages of one product form a serial chain, so throughput depends on
+    keeping enough chains open at once. Start requests are sorted by the
+    product's n_reviews (largest first, so the longest chains do not end up
+    as the crawl's tail), follow-up pages go before new products and, with
+    the FIFO scheduler queues set by ReviewSpider, open chains are served
+    round-robin. Pages past REVIEW_MAX_PAGES are dropped.
+    """
+
+    def __init__(self, n_reviews=None, max_pages=0, stats=None):
+        self.n_reviews = n_reviews or {}
+        self.max_pages = max_pages
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        path = crawler.settings.get('REVIEW_PRODUCTS_FILE')
+        n_reviews = read_n_reviews(path) if path else {}
+        if path:
+            logger.info(f'Loaded n_reviews of {len(n_reviews)} products from {path}.')
+        return cls(n_reviews, crawler.settings.getint('REVIEW_MAX_PAGES'), crawler.stats)
+
+    def process_start_requests(self, start_requests, spider):
+        requests = start_requests
+        if self.n_reviews:
+            requests = sorted(
+                start_requests,
+                key=lambda r: self.n_reviews.get(request_product_id(r), 0),
+                reverse=True
+            )
+        for request in requests:
+            # Resumed products may already be past the cap.
+            if self.max_pages and request_page(request) > self.max_pages:
+                continue
+            yield request.replace(priority=START_PRIORITY)
+
+    def process_spider_output(self, response, result, spider):
+        for r in result:
+            if not hasattr(r, 'url'):
+                yield r
+                continue
+            if self.max_pages and request_page(r) > self.max_pages:
+                self.stats.inc_value('scheduling/capped_pages', spider=spider)
+                continue
+            yield r.replace(priority=FOLLOW_PRIORITY)
+
+
+class QueueStats:
+    """
+    Extension logging crawl throughput every QUEUE_STATS_INTERVAL seconds:
+    pages/s since the last report, scheduler queue depth and requests in
+    flight. Peaks and the overall rate end up in the crawl stats.
+    """
+
+    def __init__(self, crawler, interval):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.interval = interval
+        self.pages = 0
+        self.pages_prev = 0
+        self.task = None
+        self.started = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        interval = crawler.settings.getfloat('QUEUE_STATS_INTERVAL')
+        if not interval:
+            raise NotConfigured
+        ext = cls(crawler, interval)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        return ext
+
+    def spider_opened(self, spider):
+        self.started = time.time()
+        self.task = task.LoopingCall(self.log, spider)
+        self.task.start(self.interval, now=False)
+
+    def response_received(self, response, request, spider):
+        self.pages += 1
+
+    def queue_depth(self):
+        slot = self.crawler.engine.slot
+        return len(slot.scheduler) if slot else 0
+
+    def log(self, spider):
+        rate = (self.pages - self.pages_prev) / self.interval
+        self.pages_prev = self.pages
+        depth = self.queue_depth()
+        in_flight = len(self.crawler.engine.downloader.active)
+
+        self.stats.max_value('scheduling/max_queue_depth', depth, spider=spider)
+        self.stats.max_value('scheduling/max_in_flight', in_flight, spider=spider)
+        self.stats.max_value('scheduling/max_pages_per_second', round(rate, 2), spider=spider)
+        logger.info(f'{rate:.1f} pages/s, {depth} queued, {in_flight} in flight.')
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+        seconds = time.time() - self.started
+        if seconds > 0:
+            self.stats.set_value('scheduling/pages_per_second',
+                                 round(self.pages / seconds, 2), spider=spider)
@@ -23,6 +23,26 @@ HTTPCACHE_EXPIRATION_SECS = 0  # Never expire.
 HTTPCACHE_DIR = 'httpcache'
 HTTPCACHE_IGNORE_HTTP_CODES = [301, 302, 303, 306, 307, 308]
 HTTPCACHE_STORAGE = 'steam.middlewares.SteamCacheStorage'
+# A few compressed pack files instead of a directory per response, see
+# steam/cache.py; `scrapy compactcache <spider>` drops stale records.
+# HTTPCACHE_STORAGE = 'steam.cache.SteamPackCacheStorage'
+HTTPCACHE_PACK_CODEC = None  # zstd if installed, else gzip
+HTTPCACHE_PACK_SIZE = 2**30
+
+COMMANDS_MODULE = 'steam.commands'
+
+# Build items with precompiled XPaths/regexes instead of ItemLoaders
+# (fast_load_review/fast_load_product, parity: scripts/check_loaders.py).
+FAST_ITEM_LOADERS = True
+
+ITEM_PIPELINES = {
+    'steam.pipelines.SteamPipeline': 300,
+}
+# Columnar shards next to (or instead of) the -o feed, see steam/pipelines.py.
+SHARD_OUTPUT_DIR = getenv('SHARD_OUTPUT_DIR', type=str, default=None)
+SHARD_FORMAT = getenv('SHARD_FORMAT', type=str, default=None)  # parquet (needs pyarrow) or ndjson
+SHARD_ITEMS = 50000
+REVIEW_DEDUPE = True  # Drop repeated (product_id, user_id) reviews.
 
 AWS_ACCESS_KEY_ID = getenv('AWS_ACCESS_KEY_ID', type=str, default=None)
 AWS_SECRET_ACCESS_KEY = getenv('AWS_SECRET_ACCESS_KEY', type=str, default=None)
@@ -30,3 +50,26 @@ AWS_SECRET_ACCESS_KEY = getenv('AWS_SECRET_ACCESS_KEY', type=str, default=None)
 FEED_EXPORT_ENCODING = 'utf-8'
 
 CONCURRENT_REQUESTS = 50
+
+# Politeness limit per host (steamcommunity.com for HTML reviews,
+# store.steampowered.com for products and the review API). Scrapy's
+# defaults; raise them per run through the environment.
+CONCURRENT_REQUESTS_PER_DOMAIN = getenv('CONCURRENT_REQUESTS_PER_DOMAIN', type=int, default=8)
+AUTOTHROTTLE_TARGET_CONCURRENCY = getenv('AUTOTHROTTLE_TARGET_CONCURRENCY', type=float, default=1.0)
+
+# Review crawl scheduling, see steam/scheduling.py.
+REVIEW_PRODUCTS_FILE = getenv('REVIEW_PRODUCTS_FILE', type=str, default=None)  # products .jl with n_reviews
+REVIEW_MAX_PAGES = getenv('REVIEW_MAX_PAGES', type=int, default=0)  # 0 = no cap
+QUEUE_STATS_INTERVAL = 30  # Seconds between throughput/queue depth logs.
+
+# Crawl telemetry (latency and parse time histograms, age checks, cache hits),
+# see steam/extensions.py. Enabled by setting a file and/or a port.
+SPIDER_MIDDLEWARES = {
+    'steam.extensions.CallbackTimingMiddleware': 950,
+}
+EXTENSIONS = {
+    'steam.extensions.Telemetry': 500,
+}
+TELEMETRY_FILE = getenv('TELEMETRY_FILE', type=str, default=None)  # JSON snapshot, rewritten every interval
+TELEMETRY_INTERVAL = 30
+TELEMETRY_PROMETHEUS_PORT = getenv('TELEMETRY_PROMETHEUS_PORT', type=int, default=None)  # 127.0.0.1:<port>/metrics
@@ -1,12 +1,18 @@
+import json
 import logging
 import re
-from w3lib.url import canonicalize_url, url_query_cleaner
+import time
+from urllib.parse import urlsplit
+from w3lib.url import add_or_replace_parameter, canonicalize_url, url_query_cleaner
 
-from scrapy.http import FormRequest
+from lxml import etree
+from scrapy.http import FormRequest, Request
 from scrapy.linkextractors import LinkExtractor
 from scrapy.spiders import CrawlSpider, Rule
 
-from ..items import ProductItem, ProductItemLoader
+from ..items import (ProductItem, ProductItemLoader, css_xpath, standardize_date, str_to_float,
+                     str_to_int, strip_text, take_first)
+from ..product_index import ProductIndex, listing_hash
 
 logger = logging.getLogger(__name__)
 
@@ -77,9 +83,146 @@ def load_product(response):
     return loader.load_item()
 
 
+# Precompiled selectors and patterns of load_product for fast_load_product.
+RE_APP_ID = re.compile('/app/(.*?)/')
+RE_TAG = re.compile('<[^<]+?>')
+RE_NEWLINES = re.compile('[\r\t\n]')
+RE_N_REVIEWS = re.compile(r'\(([\d,]+)\)')
+DETAILS = [
+    ('Title:', 'title'),
+    ('Genre:', 'genres'),
+    ('Developer:', 'developer'),
+    ('Publisher:', 'publisher'),
+    ('Release Date:', 'release_date')
+]
+XP_DETAILS = css_xpath('.details_block')
+XP_APP_NAME = css_xpath('.apphub_AppName ::text')
+XP_SPECS = css_xpath('.game_area_details_specs a ::text')
+XP_TAGS = css_xpath('a.app_tag::text')
+XP_DESCRIPTION = css_xpath('.game_description_snippet ::text')
+XP_PRICE = css_xpath('.game_purchase_price ::text')
+XP_ORIGINAL_PRICE = css_xpath('.discount_original_price ::text')
+XP_DISCOUNT_PRICE = css_xpath('.discount_final_price ::text')
+XP_SUMMARY = css_xpath('.game_review_summary')
+XP_SENTIMENT = etree.XPath('../*[@itemprop="description"]/text()')
+XP_N_REVIEWS = css_xpath('.responsive_hidden')
+XP_METASCORE = etree.XPath(
+    '//div[@id="game_area_metascore"]/div[contains(@class, "score")]/text()')
+XP_EARLY_ACCESS = css_xpath('.early_access_header')
+
+
+def outer_html(element):
+    """Serialized element as returned by Selector.get()."""
+    return etree.tostring(element, method='html', encoding='unicode', with_tail=False)
+
+
+def extract_first(values):
+    return str(values[0]) if values else None
+
+
+def fast_load_product(response):
+    """
+    Same item as load_product, built directly from precompiled XPaths and
+    regexes instead of an ItemLoader (see scripts/check_loaders.py).
+    """
+    root = response.selector.root
+    values = {}  # Raw values per field, as an ItemLoader would collect them
+
+    def add(name, value):
+        if value is not None:
+            values.setdefault(name, []).append(value)
+
+    url = url_query_cleaner(response.url, ['snr'], remove=True)
+    add('url', canonicalize_url(url))
+
+    found_id = RE_APP_ID.findall(response.url)
+    if found_id:
+        id = found_id[0]
+        add('reviews_url', f'http://steamcommunity.com/app/{id}/reviews/?browsefilter=mostrecent&p=1')
+        add('id', id)
+
+    details = XP_DETAILS(root)
+    if details:
+        for line in outer_html(details[0]).split('<br>'):
+            line = RE_NEWLINES.sub('', RE_TAG.sub('', line)).strip()
+            for prop, name in DETAILS:
+                if prop in line:
+                    add(name, line.replace(prop, '').strip())
+
+    fields = {}
+    for name in ('url', 'reviews_url', 'id', 'title', 'developer', 'publisher'):
+        value = take_first(values.get(name, []))
+        if value is not None:
+            fields[name] = strip_text(value)
+    genres = take_first(values.get('genres', []))
+    if genres is not None:
+        fields['genres'] = [strip_text(g) for g in genres.split(',')]
+    release_date = take_first(values.get('release_date', []))
+    if release_date is not None:
+        fields['release_date'] = standardize_date(strip_text(release_date))
+
+    app_name = take_first(XP_APP_NAME(root))
+    if app_name is not None:
+        fields['app_name'] = strip_text(app_name)
+    for name, xpath in (('specs', XP_SPECS), ('tags', XP_TAGS), ('description', XP_DESCRIPTION)):
+        found = xpath(root)
+        if found:
+            fields[name] = [strip_text(str(v)) for v in found]
+
+    price = extract_first(XP_PRICE(root))
+    if not price:
+        price = extract_first(XP_ORIGINAL_PRICE(root))
+        discount_price = take_first(XP_DISCOUNT_PRICE(root))
+        if discount_price is not None:
+            fields['discount_price'] = str_to_float(strip_text(discount_price, ' $\n\t\r'))
+    price = take_first([price])
+    if price is not None:
+        fields['price'] = str_to_float(strip_text(price, ' $\n\t\r'))
+
+    sentiment = take_first(v for summary in XP_SUMMARY(root) for v in XP_SENTIMENT(summary))
+    if sentiment is not None:
+        fields['sentiment'] = strip_text(sentiment)
+    n_reviews = [str_to_int(strip_text(m).replace(',', ''))
+                 for el in XP_N_REVIEWS(root) for m in RE_N_REVIEWS.findall(outer_html(el))]
+    if n_reviews:
+        fields['n_reviews'] = max(n_reviews)
+    metascore = take_first(XP_METASCORE(root))
+    if metascore is not None:
+        fields['metascore'] = str_to_int(strip_text(metascore))
+
+    fields['early_access'] = bool(XP_EARLY_ACCESS(root))
+    return ProductItem(fields)
+
+
+# Search listing rows, for the incremental crawl.
+XP_ROWS = css_xpath('#search_result_container a.search_result_row')
+XP_ROW_HREF = etree.XPath('@href')
+XP_ROW_APP_ID = etree.XPath('@data-ds-appid')
+XP_ROW_RELEASED = css_xpath('.search_released ::text')
+XP_ROW_PRICE = css_xpath('[class*=search_price] ::text')
+XP_ROW_REVIEWS = css_xpath('.search_review_summary::attr(data-tooltip-html)')
+RE_SPACES = re.compile(r'\s+')
+
+
+def listing_rows(response):
+    """(app id, product url, listing hash) of every app on a search results page."""
+    rows = []
+    for row in XP_ROWS(response.selector.root):
+        href = take_first(XP_ROW_HREF(row))
+        found_id = RE_APP_ID.findall(href or '')
+        if not found_id:
+            continue  # Bundles and packages
+        app_id = take_first(XP_ROW_APP_ID(row)) or found_id[0]
+        texts = [RE_SPACES.sub(' ', ' '.join(xpath(row))).strip()
+                 for xpath in (XP_ROW_RELEASED, XP_ROW_PRICE, XP_ROW_REVIEWS)]
+        rows.append((app_id, response.urljoin(href), listing_hash(*texts)))
+    return rows
+
+
 class ProductSpider(CrawlSpider):
     name = 'products'
     start_urls = ['http://store.steampowered.com/search/?sort_by=Released_DESC']
+    search_path = '/search/?sort_by=Released_DESC'
 
     allowed_domains = ['steampowered.com']
 
@@ -93,21 +236,93 @@ class ProductSpider(CrawlSpider):
              restrict_css='.search_pagination_right'))
     ]
 
-    def __init__(self, steam_id=None, *args, **kwargs):
+    def __init__(self, steam_id=None, index=None, delta=None, store_base='http://store.steampowered.com',
+                 known_pages=1, refresh_days=0, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.steam_id = steam_id
+        self.store_base = store_base.rstrip('/')
+        self.start_urls = [self.store_base + self.search_path]
+        host = urlsplit(self.store_base).hostname
+        if not host.endswith('steampowered.com'):
+            self.allowed_domains = [host]
+
+        # Incremental mode, see ProductIndex.
+        self.index = ProductIndex(index) if index else None
+        self.delta = open(delta, 'a', encoding='utf-8') if delta else None
+        self.known_pages = int(known_pages)
+        self.refresh_days = float(refresh_days)
+        self.known_streak = 0
 
     def start_requests(self):
         if self.steam_id:
-            yield Request(f'http://store.steampowered.com/app/{self.steam_id}/',
+            yield Request(f'{self.store_base}/app/{self.steam_id}/',
                           callback=self.parse_product)
+        elif self.index is not None:
+            logger.info(f'Incremental crawl, {len(self.index)} products in the index.')
+            yield Request(self.store_base + self.search_path, callback=self.parse_search,
+                          meta={'dont_cache': True})
+            if self.refresh_days:
+                for app_id in self.index.stale(self.refresh_days * 86400):
+                    url = json.loads(self.index.get(app_id)['item']).get('url')
+                    yield self.product_request(url or f'{self.store_base}/app/{app_id}/', app_id)
         else:
             yield from super().start_requests()
 
+    def product_request(self, url, app_id, listing=None):
+        """Product page request, conditional on the indexed ETag/Last-Modified."""
+        headers = {}
+        state = self.index.get(app_id)
+        if state is not None:
+            if state['etag']:
+                headers['If-None-Match'] = state['etag']
+            if state['last_modified']:
+                headers['If-Modified-Since'] = state['last_modified']
+        self.crawler.stats.inc_value('incremental/product_requests')
+        return Request(url, headers=headers, callback=self.parse_product,
+                       meta={'listing': listing, 'handle_httpstatus_list': [304],
+                             'dont_cache': True})
+
+    def parse_search(self, response):
+        """
+        Request the product pages of new apps and of known apps whose listing
+        row (release date, price, review summary) changed. Results are sorted
+        by release date, so pagination stops after `known_pages` pages
+        holding only known apps.
+        """
+        stats = self.crawler.stats
+        stats.inc_value('incremental/search_pages')
+        rows = listing_rows(response)
+        known = self.index.known(app_id for app_id, _, _ in rows)
+        for app_id, url, listing in rows:
+            state = self.index.get(app_id) if app_id in known else None
+            if state is not None and state['listing_hash'] == listing:
+                stats.inc_value('incremental/listing_unchanged')
+                continue
+            yield self.product_request(url, app_id, listing)
+
+        self.known_streak = self.known_streak + 1 if len(known) == len(rows) else 0
+        if not rows:
+            return
+        if self.known_streak >= self.known_pages:
+            logger.info(f'Reached known releases at {response.url}, stopping pagination.')
+            return
+        page = int(re.findall(r'[?&]page=(\d+)', response.url)[0]) if 'page=' in response.url else 1
+        yield Request(add_or_replace_parameter(response.url, 'page', str(page + 1)),
+                      callback=self.parse_search, meta={'dont_cache': True})
+
     def parse_product(self, response):
+        if response.status == 304:
+            app_id = RE_APP_ID.findall(response.url)[0]
+            self.index.touch(app_id)
+            if response.meta.get('listing'):
+                self.index.set_listing(app_id, response.meta['listing'])
+            self.crawler.stats.inc_value('incremental/not_modified')
+            return
+
         # Circumvent age selection form.
         if '/agecheck/app' in response.url:
             logger.debug(f'Form-type age check triggered for {response.url}.')
+            self.crawler.stats.inc_value('agecheck/form')
 
             form = response.css('#agegate_box form')
 
@@ -126,8 +341,47 @@ class ProductSpider(CrawlSpider):
                 url=action,
                 method='POST',
                 formdata=formdata,
-                callback=self.parse_product
+                callback=self.parse_product,
+                meta={'listing': response.meta.get('listing')}
             )
+            return
 
+        if self.settings.getbool('FAST_ITEM_LOADERS'):
+            item = fast_load_product(response)
         else:
-            yield load_product(response)
+            item = load_product(response)
+        if self.index is None or self.record(item, response):
+            yield item
+
+    def record(self, item, response):
+        """
+        Update the index with a scraped item and append a delta record if it
+        is new or changed. Returns whether it was.
+        """
+        if not item.get('id'):
+            return True
+        op, changed = self.index.update(
+            item,
+            etag=response.headers.get('ETag', b'').decode('latin-1') or None,
+            last_modified=response.headers.get('Last-Modified', b'').decode('latin-1') or None,
+        )
+        if response.meta.get('listing'):
+            self.index.set_listing(item['id'], response.meta['listing'])
+        if op is None:
+            self.crawler.stats.inc_value('incremental/unchanged')
+            return False
+
+        self.crawler.stats.inc_value(f'incremental/{op}')
+        if self.delta is not None:
+            record = {'op': op, 'id': item['id'], 'changed': changed, 'item': dict(item),
+                      'time': round(time.time(), 3)}
+            self.delta.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.delta.flush()
+        return True
+
+    def closed(self, reason):
+        if self.index is not None:
+            logger.info(f'Index: {len(self.index)} products.')
+            self.index.close()
+        if self.delta is not None:
+            self.delta.close()
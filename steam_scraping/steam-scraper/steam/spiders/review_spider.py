@@ -1,10 +1,24 @@
+import json
+import logging
 import re
+from datetime import datetime
+from urllib.parse import quote
 
 import scrapy
 from scrapy.http import FormRequest, Request
 from w3lib.url import url_query_parameter
 
-from ..items import ReviewItem, ReviewItemLoader, str_to_int
+from ..frontier import Frontier
+from ..items import (ReviewItem, ReviewItemLoader, css_xpath, first_match, simplify_recommended,
+                     standardize_date, str_to_float, str_to_int, take_first)
+
+logger = logging.getLogger(__name__)
+
+API_BASE = 'https://store.steampowered.com'
+API_PATH = (
+    '/appreviews/{product_id}?json=1&filter=recent&language=all'
+    '&purchase_type=all&num_per_page={num_per_page}&cursor={cursor}'
+)
 
 
 def load_review(review, product_id, page, order):
@@ -45,6 +59,100 @@ def load_review(review, product_id, page, order):
     return loader.load_item()
 
 
+# Precompiled selectors and patterns of load_review for fast_load_review.
+XP_TITLE = css_xpath('.title::text')
+XP_DATE = css_xpath('.date_posted::text')
+XP_HOURS = css_xpath('.hours::text')
+XP_COMPENSATION = css_xpath('.received_compensation::text')
+XP_AUTHOR_HREF = css_xpath('.apphub_CardContentAuthorName a::attr(href)')
+XP_AUTHOR_NAME = css_xpath('.apphub_CardContentAuthorName a::text')
+XP_PRODUCTS = css_xpath('.apphub_CardContentMoreLink ::text')
+XP_FEEDBACK = css_xpath('.found_helpful ::text')
+XP_EARLY_ACCESS = css_xpath('.early_access_review')
+RE_POSTED = re.compile('Posted: (.+)')
+RE_HOURS = re.compile('(.+) hrs')
+RE_PROFILE = re.compile('.*/profiles/(.+)/')
+RE_PRODUCTS = re.compile(r'([\d,]+) product')
+RE_HELPFUL = re.compile(r'([\d,]+).*helpful')
+RE_FUNNY = re.compile(r'([\d,]+).*funny')
+
+
+def fast_load_review(review, product_id, page, order):
+    """
+    Same item as load_review, built directly from precompiled XPaths and
+    regexes instead of an ItemLoader (see scripts/check_loaders.py).
+    """
+    root = review.root
+    fields = {}
+    for name, value in (('product_id', product_id), ('page', page), ('page_order', order)):
+        if value is not None and value != '':
+            fields[name] = value
+
+    title = take_first(XP_TITLE(root))
+    if title is not None:
+        fields['recommended'] = simplify_recommended(title)
+    posted = first_match(RE_POSTED, XP_DATE(root))
+    if posted is not None:
+        fields['date'] = standardize_date(posted)
+    hours = first_match(RE_HOURS, XP_HOURS(root))
+    if hours is not None:
+        fields['hours'] = str_to_float(hours)
+    compensation = take_first(XP_COMPENSATION(root))
+    if compensation is not None:
+        fields['compensation'] = compensation
+
+    user_id = first_match(RE_PROFILE, XP_AUTHOR_HREF(root))
+    if user_id is not None:
+        fields['user_id'] = user_id
+    username = take_first(XP_AUTHOR_NAME(root))
+    if username is not None:
+        fields['username'] = username
+    products = first_match(RE_PRODUCTS, XP_PRODUCTS(root))
+    if products is not None:
+        fields['products'] = str_to_int(products)
+
+    feedback = XP_FEEDBACK(root)
+    found_helpful = first_match(RE_HELPFUL, feedback)
+    if found_helpful is not None:
+        fields['found_helpful'] = str_to_int(found_helpful)
+    found_funny = first_match(RE_FUNNY, feedback)
+    if found_funny is not None:
+        fields['found_funny'] = str_to_int(found_funny)
+
+    fields['early_access'] = bool(XP_EARLY_ACCESS(root))
+    return ReviewItem(fields)
+
+
+def load_api_review(review, product_id, page, order):
+    """
+    Build a ReviewItem from one entry of the appreviews JSON endpoint.
+    Values are already typed, so the HTML loader processors are skipped.
+    """
+    author = review.get('author') or {}
+    minutes = author.get('playtime_at_review') or author.get('playtime_forever')
+    created = review.get('timestamp_created')
+
+    item = ReviewItem(
+        product_id=product_id,
+        page=page,
+        page_order=order,
+        recommended=bool(review.get('voted_up')),
+        text=review.get('review'),
+        found_helpful=review.get('votes_up'),
+        found_funny=review.get('votes_funny'),
+        early_access=bool(review.get('written_during_early_access')),
+        user_id=author.get('steamid'),
+        products=author.get('num_games_owned'),
+    )
+    if created:
+        item['date'] = datetime.utcfromtimestamp(created).strftime('%Y-%m-%d')
+    if minutes is not None:
+        item['hours'] = round(minutes / 60, 1)
+    if review.get('received_for_free'):
+        item['compensation'] = 'Product received for free'
+    return item
+
+
 def get_page(response):
     from_page = response.meta.get('from_page', None)
 
@@ -72,15 +180,36 @@ def get_product_id(response):
 
 class ReviewSpider(scrapy.Spider):
     name = 'reviews'
+    # Round-robin over open products, see steam/scheduling.py.
+    custom_settings = {
+        # Replace the project's dicts, so the telemetry entries are repeated.
+        'SPIDER_MIDDLEWARES': {'steam.scheduling.ReviewSchedulingMiddleware': 550,
+                               'steam.extensions.CallbackTimingMiddleware': 950},
+        'EXTENSIONS': {'steam.scheduling.QueueStats': 500, 'steam.extensions.Telemetry': 510},
+        'SCHEDULER_MEMORY_QUEUE': 'scrapy.squeues.FifoMemoryQueue',
+        'SCHEDULER_DISK_QUEUE': 'scrapy.squeues.PickleFifoDiskQueue',
+    }
     test_urls = [
         # Full Metal Furies
         'http://steamcommunity.com/app/416600/reviews/?browsefilter=mostrecent&p=1',
     ]
 
-    def __init__(self, url_file=None, steam_id=None, *args, **kwargs):
+    def __init__(self, url_file=None, steam_id=None, mode='html', api_base=API_BASE,
+                 num_per_page=100, frontier=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.url_file = url_file
         self.steam_id = steam_id
+        # sqlite file with per-product progress, resumed on restart
+        self.frontier = Frontier(frontier) if frontier else None
+        self.n_finished = 0
+        # 'html' scrapes community review pages, 'api' the appreviews JSON endpoint
+        self.mode = mode
+        self.api_base = api_base.rstrip('/')
+        self.num_per_page = int(num_per_page)
+
+    @property
+    def fast_loaders(self):
+        return self.settings.getbool('FAST_ITEM_LOADERS')
 
     def read_urls(self):
         with open(self.url_file, 'r') as f:
@@ -89,8 +218,68 @@ class ReviewSpider(scrapy.Spider):
                 if url:
                     yield scrapy.Request(url, callback=self.parse)
 
+    def api_request(self, product_id, cursor='*', page=1):
+        url = self.api_base + API_PATH.format(
+            product_id=product_id,
+            num_per_page=self.num_per_page,
+            cursor=quote(cursor, safe=''),
+        )
+        meta = dict(product_id=product_id, page=page, cursor=cursor)
+        return Request(url, callback=self.parse_api, meta=meta)
+
     def start_requests(self):
-        if self.steam_id:
+        if self.frontier is None:
+            yield from self.start_fresh_requests()
+            return
+
+        for request in self.start_fresh_requests():
+            request = self.resume(request)
+            if request is not None:
+                yield request
+        _, in_progress = self.frontier.counts()
+        logger.info(f'Frontier: skipped {self.n_finished} finished products, '
+                    f'{in_progress} in progress.')
+
+    def resume(self, request):
+        """
+        Continue a product from the frontier: None if it is finished, the
+        request for its next page if in progress, else request unchanged.
+        """
+        product_id = get_product_id(request)
+        state = self.frontier.get(product_id)
+        if state is None:
+            return request
+
+        page, url, cursor, done = state
+        if done:
+            self.n_finished += 1
+            return None
+        if self.mode == 'api' and cursor:
+            return self.api_request(product_id, cursor, page)
+        if self.mode != 'api' and url:
+            return Request(url, callback=self.parse,
+                           meta=dict(from_page=page - 1, product_id=product_id))
+        # Recorded by a crawl in the other mode, start over.
+        return request
+
+    def checkpoint(self, product_id, page, url=None, cursor=None):
+        if self.frontier is not None:
+            self.frontier.advance(product_id, page, url=url, cursor=cursor)
+
+    def finish(self, product_id, page):
+        if self.frontier is not None:
+            self.frontier.finish(product_id, page)
+
+    def closed(self, reason):
+        if self.frontier is not None:
+            done, in_progress = self.frontier.counts()
+            logger.info(f'Frontier: {done} products finished, {in_progress} in progress.')
+            self.frontier.close()
+
+    def start_fresh_requests(self):
+        if self.mode == 'api':
+            yield from self.start_api_requests()
+        elif self.steam_id:
             url = (
                 f'http://steamcommunity.com/app/{self.steam_id}/reviews/'
                 '?browsefilter=mostrecent&p=1'
@@ -102,19 +291,64 @@ class ReviewSpider(scrapy.Spider):
             for url in self.test_urls:
                 yield Request(url, callback=self.parse)
 
+    def start_api_requests(self):
+        if self.steam_id:
+            urls = [f'app/{self.steam_id}/']
+        elif self.url_file:
+            with open(self.url_file, 'r') as f:
+                urls = [url.strip() for url in f if url.strip()]
+        else:
+            urls = self.test_urls
+
+        for url in urls:
+            found_id = re.findall(r'app/(\d+)', url)
+            if found_id:
+                yield self.api_request(found_id[0])
+
+    def parse_api(self, response):
+        product_id = response.meta['product_id']
+        page = response.meta['page']
+
+        try:
+            data = json.loads(response.text)
+        except ValueError:
+            logger.warning(f'Invalid JSON for product {product_id} page {page}.')
+            return
+
+        if not data.get('success'):
+            logger.warning(f'Review API refused product {product_id} page {page}.')
+            return
+
+        reviews = data.get('reviews') or []
+        for i, review in enumerate(reviews):
+            yield load_api_review(review, product_id, page, i)
+
+        # The cursor repeats (or disappears) once the last page is reached.
+        cursor = data.get('cursor')
+        if reviews and cursor and cursor != response.meta['cursor']:
+            self.checkpoint(product_id, page + 1, cursor=cursor)
+            yield self.api_request(product_id, cursor, page + 1)
+        else:
+            self.finish(product_id, page)
+
     def parse(self, response):
         page = get_page(response)
         product_id = get_product_id(response)
 
         # Load all reviews on current page.
+        load = fast_load_review if self.fast_loaders else load_review
         reviews = response.css('div .apphub_Card')
         for i, review in enumerate(reviews):
-            yield load_review(review, product_id, page, i)
+            yield load(review, product_id, page, i)
 
         # Navigate to next page.
         form = response.xpath('//form[contains(@id, "MoreContentForm")]')
         if form:
-            yield self.process_pagination_form(form, page, product_id)
+            request = self.process_pagination_form(form, page, product_id)
+            self.checkpoint(product_id, page + 1, url=request.url)
+            yield request
+        else:
+            self.finish(product_id, page)
 
     def process_pagination_form(self, form, page=None, product_id=None):
         action = form.xpath('@action').extract_first()
@@ -122,7 +356,7 @@ class ReviewSpider(scrapy.Spider):
         values = form.xpath('input/@value').extract()
 
         formdata = dict(zip(names, values))
-        meta = dict(prev_page=page, product_id=product_id)
+        meta = dict(from_page=page, product_id=product_id)
 
         return FormRequest(
             url=action,
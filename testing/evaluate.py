@@ -0,0 +1,392 @@
+"""
+Scripted ROC/AUC evaluation for the collaborative, content-based and hybrid
+recommenders (replaces the per-threshold loops in the testing notebooks).
+
+Every test user is scored once per engine, in a process pool, and the
+scores are cached. Sensitivity and 1-specificity for all thresholds are
+then computed in one vectorised pass, with the same definitions as the
+ROC() cells of the notebooks. precision@k, recall@k and NDCG@k over all
+unplayed games are reported alongside.
+
+Outputs (in --output-dir):
+    ROC_<engine>_data.csv   x (1-specificity), y (sensitivity) per threshold
+    ROC_<Engine>.png        ROC curve (when matplotlib is installed)
+    evaluation.json         AUC and ranking metrics per engine
+
+Run example:
+    $ python evaluate.py --reviews ../dataset/reviews.jl \
+        --games ../dataset/games.jl --workers 4 --k 10
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+from scipy import sparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'filtering'))
+from dataio import INT_MISSING, iter_chunks, iter_records
+from buildUserGameMatrix import build
+import cfScorer
+
+ENGINES = ['collaborative', 'content_based', 'hybrid']
+PLOT_NAMES = {'collaborative': 'Collaborative', 'content_based': 'Content_Based', 'hybrid': 'Hybrid'}
+
+# Hybrid weights of hybrid_weight() in hybridTesting.ipynb
+HYBRID_COLLAB_WEIGHT = 0.2
+HYBRID_CONTENT_WEIGHT = 0.8
+
+# Column aliases of the supported review dumps
+COLUMN_ALIASES = {'app_id': 'product_id', 'is_recommended': 'recommended'}
+
+# Set once per worker by _init_worker
+_train = None
+_tags = None
+_tag_norms = None
+_params = None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', required=True,
+                        help='reviews.jl, its columnar table, or a CSV with user_id, product_id/app_id, '
+                             'recommended/is_recommended.')
+    parser.add_argument('--games', required=True, help='games.jl or steam_games.csv (tags).')
+    parser.add_argument('--engines', nargs='*', default=ENGINES, choices=ENGINES)
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--random-state', type=int, default=50)
+    parser.add_argument('--max-users', type=int, help='Evaluate a random subset of test users.')
+    parser.add_argument('--thresholds', type=int, default=11,
+                        help='Evenly spaced thresholds in [0, 1] (the notebooks use 11).')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--n-overlap', type=int, default=cfScorer.N_OVERLAP_PEERS)
+    parser.add_argument('--min-corr', type=float, default=cfScorer.MIN_CORRELATION)
+    parser.add_argument('--n-peers', type=int, default=cfScorer.N_TOP_PEERS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--cache-dir', default=os.path.join(BASE_DIR, '.eval_cache'))
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--output-dir', default=BASE_DIR)
+    return parser.parse_args()
+
+
+# ---------------------------------------------------------
+# 1. DATA
+# ---------------------------------------------------------
+def read_reviews(path):
+    """Returns (user_ids, game_ids, liked) int64/int64/float32 arrays."""
+    users, games, liked = [], [], []
+    if path.endswith('.csv'):
+        import pandas as pd
+        header = [COLUMN_ALIASES.get(c.strip(), c.strip()) for c in pd.read_csv(path, nrows=0).columns]
+        wanted = ['user_id', 'product_id', 'recommended']
+        for chunk in pd.read_csv(path, header=0, names=header, usecols=wanted, chunksize=1_000_000):
+            chunk = chunk.dropna()
+            users.append(chunk['user_id'].astype(np.int64).values)
+            games.append(chunk['product_id'].astype(np.int64).values)
+            liked.append(chunk['recommended'].astype(float).astype(np.float32).values)
+    else:
+        dtypes = {'user_id': 'int64', 'product_id': 'int64', 'recommended': 'bool'}
+        for chunk in iter_chunks(path, list(dtypes), dtypes=dtypes):
+            keep = (chunk['user_id'] != INT_MISSING) & (chunk['product_id'] != INT_MISSING)
+            users.append(chunk['user_id'][keep])
+            games.append(chunk['product_id'][keep])
+            liked.append(chunk['recommended'][keep].astype(np.float32))
+    return np.concatenate(users), np.concatenate(games), np.concatenate(liked)
+
+
+def read_game_tags(path):
+    """Returns {game id: [tags]} from games.jl or steam_games.csv."""
+    out = {}
+    if path.endswith('.csv'):
+        csv.field_size_limit(sys.maxsize)
+        with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            reader = csv.DictReader(f)
+            cols = {c.lower().strip().replace(' ', '_'): c for c in reader.fieldnames}
+            id_col = cols.get('appid') or cols.get('app_id') or cols.get('id')
+            tag_col = cols.get('tags') or cols.get('genres')
+            for row in reader:
+                try:
+                    game_id = int(float(row[id_col]))
+                except (TypeError, ValueError):
+                    continue
+                out[game_id] = [t.strip() for t in (row.get(tag_col) or '').split(',') if t.strip()]
+    else:
+        for game in iter_records(path, ['id', 'tags']):
+            try:
+                game_id = int(float(game['id']))
+            except (TypeError, ValueError):
+                continue
+            if isinstance(game['tags'], list):
+                out[game_id] = game['tags']
+    return out
+
+
+def split(n_rows, test_size, random_state):
+    """Notebook split: shuffle with random_state, first (1 - test_size) rows train."""
+    order = np.random.RandomState(random_state).permutation(n_rows)
+    n_train = int(n_rows * (1 - test_size))
+    is_train = np.zeros(n_rows, dtype=bool)
+    is_train[order[:n_train]] = True
+    return is_train
+
+
+def tag_matrix(game_ids, game_tags, top_tags=None):
+    """
+    Binary CSR (games x tags) aligned with game_ids. With top_tags only the
+    most frequent tags are kept, like newUserReco.TOP_TAGS.
+    """
+    keep = None
+    if top_tags:
+        from collections import Counter
+        counts = Counter(t for g in game_ids for t in game_tags.get(int(g), []))
+        keep = {t for t, _ in counts.most_common(top_tags)}
+
+    vocab, rows, cols = {}, [], []
+    for i, game_id in enumerate(game_ids):
+        for t in game_tags.get(int(game_id), []):
+            if keep is not None and t not in keep:
+                continue
+            rows.append(i)
+            cols.append(vocab.setdefault(t, len(vocab)))
+    data = np.ones(len(rows), dtype=np.float32)
+    m = sparse.csr_matrix((data, (rows, cols)), shape=(len(game_ids), max(len(vocab), 1)))
+    m.data[:] = 1  # Duplicate tags count once
+    return m
+
+
+# ---------------------------------------------------------
+# 2. SCORING (process pool)
+# ---------------------------------------------------------
+def _init_worker(train, tags, params):
+    global _train, _tags, _tag_norms, _params
+    _train, _tags, _params = train, tags, params
+    _tag_norms = np.sqrt(np.asarray(tags.multiply(tags).sum(axis=1)).ravel())
+
+
+def _content_scores(row):
+    """Cosine similarity between the user's tag profile and every game."""
+    ratings = _train[row].toarray().ravel()
+    n_liked = (ratings > 0).sum()
+    if n_liked == 0:
+        return None
+    profile = (_tags.T @ ratings) / n_liked
+    denom = _tag_norms * np.linalg.norm(profile)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sim = np.where(denom > 0, (_tags @ profile) / denom, 0.0)
+    return sim
+
+
+def _score_chunk(task):
+    """Scores one chunk of users: returns {engine: (pair scores, top-k)}."""
+    rows, pair_rows, pair_cols = task
+    k, engines = _params['k'], _params['engines']
+    out = {e: (np.full(len(pair_rows), np.nan, dtype=np.float32),
+               np.full((len(rows), k), -1, dtype=np.int64)) for e in engines}
+
+    for i, row in enumerate(rows):
+        collab = None
+        if 'collaborative' in engines or 'hybrid' in engines:
+            collab = cfScorer.score_user(_train, row, _params['n_overlap'],
+                                         _params['min_corr'], _params['n_peers'])
+        content = _content_scores(row) if 'content_based' in engines or 'hybrid' in engines else None
+        if collab is not None:
+            collab = np.where(collab > 0, collab, np.nan)  # Only positive weighted ratings are returned
+
+        scores = {'collaborative': collab, 'content_based': content}
+        if 'hybrid' in engines:
+            if collab is not None and content is not None:
+                scores['hybrid'] = HYBRID_COLLAB_WEIGHT * collab + HYBRID_CONTENT_WEIGHT * content
+            else:
+                scores['hybrid'] = collab if collab is not None else content
+
+        played = _train[row].indices
+        sel = pair_rows == row
+        for engine in engines:
+            s = scores[engine]
+            if s is None:
+                continue
+            out[engine][0][sel] = s[pair_cols[sel]]
+            ranked = np.where(np.isnan(s), -np.inf, s)
+            ranked[played] = -np.inf
+            top = np.argsort(-ranked, kind='stable')[:k]
+            top = top[np.isfinite(ranked[top])]
+            out[engine][1][i, :len(top)] = top
+    return rows, out
+
+
+# ---------------------------------------------------------
+# 3. METRICS
+# ---------------------------------------------------------
+def roc_points(pair_user, scores, liked, thresholds, eval_users):
+    """
+    Per-user sensitivity / 1-specificity for all thresholds at once, with the
+    notebook definitions (games scored exactly at the threshold are skipped),
+    averaged over eval_users.
+    """
+    n_users = int(max(pair_user.max(initial=-1), eval_users.max(initial=-1)) + 1)
+    present = ~np.isnan(scores)
+    s = np.nan_to_num(scores, nan=0.0)[:, None]
+    above = (s > thresholds[None, :]) & present[:, None]
+    below = (s < thresholds[None, :]) & present[:, None]
+    is_liked = (liked > 0)[:, None]
+
+    owner = sparse.csr_matrix((np.ones(len(pair_user)), (pair_user, np.arange(len(pair_user)))),
+                              shape=(n_users, len(pair_user)))
+    # Counts per (user, threshold); naming follows the notebook ROC() cells
+    tp = owner @ (above & is_liked).astype(np.float64)
+    fn = owner @ (below & ~is_liked).astype(np.float64)
+    fp = owner @ (above & ~is_liked).astype(np.float64)
+    tn = owner @ (below & is_liked).astype(np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sensitivity = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        om_specificity = np.where(fp + tn > 0, fp / (fp + tn), 0.0)
+    return om_specificity[eval_users].mean(axis=0), sensitivity[eval_users].mean(axis=0)
+
+
+def ranking_metrics(users, topk, pair_user, pair_game, liked, k):
+    """Mean precision@k, recall@k and NDCG@k over users with a liked test game."""
+    relevant = {}
+    for u, g in zip(pair_user[liked > 0], pair_game[liked > 0]):
+        relevant.setdefault(int(u), set()).add(int(g))
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    precision, recall, ndcg = [], [], []
+    for u, top in zip(users, topk):
+        rel = relevant.get(int(u))
+        if not rel:
+            continue
+        hits = np.array([g in rel for g in top if g >= 0] + [False] * int((top < 0).sum()))
+        precision.append(hits.sum() / k)
+        recall.append(hits.sum() / len(rel))
+        ideal = discounts[:min(len(rel), k)].sum()
+        ndcg.append((hits * discounts).sum() / ideal)
+
+    mean = lambda xs: round(float(np.mean(xs)), 4) if xs else 0.0
+    return {f'precision@{k}': mean(precision), f'recall@{k}': mean(recall),
+            f'ndcg@{k}': mean(ndcg), 'users_with_relevant': len(precision)}
+
+
+def save_plot(x, y, path):
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return False
+    fig, ax = plt.subplots()
+    ax.plot(x, y, color='green')
+    ax.set_xlabel('1-specificity')
+    ax.set_ylabel('sensitivity')
+    fig.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close(fig)
+    return True
+
+
+def cache_key(args):
+    parts = []
+    for path in (args.reviews, args.games):
+        st = os.stat(path)
+        parts.append(f'{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}')
+    parts += [str(v) for v in (args.test_size, args.random_state, args.max_users, args.k,
+                               args.n_overlap, args.min_corr, args.n_peers, sorted(args.engines))]
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    cache_path = os.path.join(args.cache_dir, f'scores_{cache_key(args)}.npz')
+
+    if os.path.exists(cache_path) and not args.no_cache:
+        cached = np.load(cache_path)
+        eval_users, pair_user, pair_game, liked = (cached['eval_users'], cached['pair_user'],
+                                                   cached['pair_game'], cached['liked'])
+        pair_scores = {e: cached[f'scores_{e}'] for e in args.engines}
+        topk = {e: cached[f'topk_{e}'] for e in args.engines}
+        print(f"Loaded cached scores from {cache_path}")
+    else:
+        users, games, ratings = read_reviews(args.reviews)
+        is_train = split(len(users), args.test_size, args.random_state)
+        train, user_ids, game_ids, _ = build(users[is_train], games[is_train], ratings[is_train])
+        tags = tag_matrix(game_ids, read_game_tags(args.games))
+        print(f"Train matrix {train.shape}, {train.nnz} ratings, {tags.shape[1]} tags.")
+
+        # Test pairs of users and games known to the train matrix
+        test = ~is_train
+        u_pos = np.clip(np.searchsorted(user_ids, users[test]), 0, len(user_ids) - 1)
+        g_pos = np.clip(np.searchsorted(game_ids, games[test]), 0, len(game_ids) - 1)
+        known = (user_ids[u_pos] == users[test]) & (game_ids[g_pos] == games[test])
+        pair_rows, pair_cols, liked = u_pos[known], g_pos[known], ratings[test][known]
+
+        eval_rows = np.unique(pair_rows)
+        if args.max_users and len(eval_rows) > args.max_users:
+            eval_rows = np.sort(np.random.RandomState(args.random_state).choice(
+                eval_rows, args.max_users, replace=False))
+            keep = np.isin(pair_rows, eval_rows)
+            pair_rows, pair_cols, liked = pair_rows[keep], pair_cols[keep], liked[keep]
+
+        # Pairs are sorted by user so each task gets a contiguous slice
+        order = np.argsort(pair_rows, kind='stable')
+        pair_rows, pair_cols, liked = pair_rows[order], pair_cols[order], liked[order]
+        n_tasks = max(args.workers * 4, 1)
+        row_chunks = [c for c in np.array_split(eval_rows, n_tasks) if len(c)]
+        bounds = [np.searchsorted(pair_rows, [c[0], c[-1] + 1]) for c in row_chunks]
+        tasks = [(c, pair_rows[a:b], pair_cols[a:b]) for c, (a, b) in zip(row_chunks, bounds)]
+
+        params = {'k': args.k, 'engines': args.engines, 'n_overlap': args.n_overlap,
+                  'min_corr': args.min_corr, 'n_peers': args.n_peers}
+        with Pool(args.workers, initializer=_init_worker, initargs=(train, tags, params)) as pool:
+            results = pool.map(_score_chunk, tasks)
+
+        pair_scores = {e: np.concatenate([r[1][e][0] for r in results]) for e in args.engines}
+        topk = {e: np.concatenate([r[1][e][1] for r in results]) for e in args.engines}
+        eval_users = np.concatenate([r[0] for r in results])
+        # Cache the raw ids so results stay readable without the matrix
+        pair_user, pair_game = pair_rows, game_ids[pair_cols]
+        topk = {e: np.where(t >= 0, game_ids[np.maximum(t, 0)], -1) for e, t in topk.items()}
+
+        os.makedirs(args.cache_dir, exist_ok=True)
+        np.savez(cache_path, eval_users=eval_users, pair_user=pair_user, pair_game=pair_game,
+                 liked=liked, **{f'scores_{e}': pair_scores[e] for e in args.engines},
+                 **{f'topk_{e}': topk[e] for e in args.engines})
+        print(f"Scored {len(eval_users)} users in {time.perf_counter() - started:.1f}s.")
+
+    thresholds = np.linspace(0, 1, args.thresholds)
+    report = {'users': int(len(eval_users)), 'test_pairs': int(len(pair_user)), 'engines': {}}
+
+    for engine in args.engines:
+        x, y = roc_points(pair_user, pair_scores[engine], liked, thresholds, eval_users)
+        order = np.argsort(x, kind='stable')
+        xs, ys = x[order], y[order]
+        roc_auc = float(np.sum(np.diff(xs) * (ys[1:] + ys[:-1]) / 2)) if len(x) > 1 else math.nan
+
+        csv_name = os.path.join(args.output_dir, f'ROC_{engine}_data.csv')
+        with open(csv_name, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['x', 'y'])
+            writer.writerows(zip(x.tolist(), y.tolist()))
+        save_plot(x, y, os.path.join(args.output_dir, f'ROC_{PLOT_NAMES[engine]}.png'))
+
+        report['engines'][engine] = {
+            'auc': round(roc_auc, 4),
+            'coverage': round(float((~np.isnan(pair_scores[engine])).mean()), 4) if len(liked) else 0.0,
+            **ranking_metrics(eval_users, topk[engine], pair_user, pair_game, liked, args.k),
+        }
+        print(f"{engine:<14} AUC {roc_auc:.4f} | {report['engines'][engine]}")
+
+    report['seconds'] = round(time.perf_counter() - started, 2)
+    with open(os.path.join(args.output_dir, 'evaluation.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
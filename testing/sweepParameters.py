@@ -0,0 +1,286 @@
+"""
+Latency vs. quality sweep over the recommenders' cost knobs.
+
+Collaborative grid, applied to each serving engine through its own env vars
+(defaults in brackets):
+    --overlap-peers   peer shortlist by co-rated overlap  CF_OVERLAP_PEERS [200], COLLAB_OVERLAP_PEERS [1000]
+    --min-corr        Pearson cut-off                     CF_MIN_CORRELATION [0.01], COLLAB_MIN_CORRELATION [0.1]
+    --top-peers       peers in the weighted average       CF_TOP_PEERS [50], COLLAB_TOP_PEERS [50]
+Content grid:
+    --top-tags        tag vocabulary kept for similarity  NEWUSER_TOP_TAGS [100]
+
+Every setting is reported once per engine it configures:
+    recommendations  recommendations.get_recommendations   CF_*
+    collaborative    collaborativeFiltering.recommendation  COLLAB_*
+    new_user         newUserReco.recommendation             NEWUSER_TOP_TAGS
+
+Latency (p50/p99 per call) and memory (tracemalloc peak across the calls)
+are those of the engine itself: filtering/benchmarkEngines.py runs it in a
+fresh subprocess with the setting's env vars and FILTERING_DATA_DIR=--data-dir.
+
+Quality is scored on the fixed split and users of evaluate.py. For the two
+collaborative engines it is AUC and NDCG@k of cfScorer.score_user, the
+sparse implementation of their shared algorithm, so both get the same
+quality columns. For new_user it is NDCG@k of newUserReco.recommendation
+itself, run in a subprocess with NEWUSER_TOP_TAGS set and seeded with each
+user's best-rated training game (no AUC: the engine only returns its top
+10). --data-dir must therefore hold a steam_games.csv whose ids match
+--reviews.
+
+The Pareto frontier (quality up, p99 latency and memory down) is printed
+and saved per engine, each row listing the env vars that apply it.
+
+Run example:
+    $ python sweepParameters.py --reviews ../dataset/reviews.jl \
+        --games ../dataset/games.jl --data-dir ../filtering --max-users 500 \
+        --overlap-peers 50 200 1000 --min-corr 0.01 0.1 --top-peers 20 50 \
+        --top-tags 50 100 400
+"""
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+import evaluate
+import benchmarkEngines  # filtering/, put on sys.path by evaluate
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FILTERING_DIR = os.path.join(BASE_DIR, '..', 'filtering')
+
+# Env var set by each swept parameter, per benchmarkEngines engine
+ENGINE_KNOBS = {
+    'recommendations': {
+        'n_overlap': 'CF_OVERLAP_PEERS',
+        'min_corr': 'CF_MIN_CORRELATION',
+        'n_peers': 'CF_TOP_PEERS',
+    },
+    'collaborative': {
+        'n_overlap': 'COLLAB_OVERLAP_PEERS',
+        'min_corr': 'COLLAB_MIN_CORRELATION',
+        'n_peers': 'COLLAB_TOP_PEERS',
+    },
+    'new_user': {
+        'top_tags': 'NEWUSER_TOP_TAGS',
+    },
+}
+QUALITY_OF = {
+    'recommendations': 'cfScorer.score_user',
+    'collaborative': 'cfScorer.score_user',
+    'new_user': 'newUserReco.recommendation',
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', required=True)
+    parser.add_argument('--games', required=True)
+    parser.add_argument('--data-dir', default=FILTERING_DIR,
+                        help='FILTERING_DATA_DIR of the engines, built from the same dump.')
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--random-state', type=int, default=50)
+    parser.add_argument('--max-users', type=int, default=500)
+    parser.add_argument('--thresholds', type=int, default=11)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--overlap-peers', type=int, nargs='*', default=[50, 200, 1000])
+    parser.add_argument('--min-corr', type=float, nargs='*', default=[0.01, 0.1])
+    parser.add_argument('--top-peers', type=int, nargs='*', default=[20, 50])
+    parser.add_argument('--top-tags', type=int, nargs='*', default=[50, 100, 400])
+    parser.add_argument('--quality', default='ndcg', choices=['auc', 'ndcg'],
+                        help='Quality axis of the Pareto frontier (new_user always uses ndcg).')
+    parser.add_argument('--calls', type=int, default=50, help='Timed engine calls per setting.')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, 'sweep_results.json'))
+    parser.add_argument('--run-new-user', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def load(args):
+    """Train matrix, game tags and the fixed evaluation pairs."""
+    users, games, ratings = evaluate.read_reviews(args.reviews)
+    is_train = evaluate.split(len(users), args.test_size, args.random_state)
+    train, user_ids, game_ids, _ = evaluate.build(users[is_train], games[is_train], ratings[is_train])
+
+    test = ~is_train
+    u_pos = np.clip(np.searchsorted(user_ids, users[test]), 0, len(user_ids) - 1)
+    g_pos = np.clip(np.searchsorted(game_ids, games[test]), 0, len(game_ids) - 1)
+    known = (user_ids[u_pos] == users[test]) & (game_ids[g_pos] == games[test])
+    pair_rows, pair_cols, liked = u_pos[known], g_pos[known], ratings[test][known]
+
+    eval_rows = np.unique(pair_rows)
+    if args.max_users and len(eval_rows) > args.max_users:
+        eval_rows = np.sort(np.random.RandomState(args.random_state).choice(
+            eval_rows, args.max_users, replace=False))
+    keep = np.isin(pair_rows, eval_rows)
+    order = np.argsort(pair_rows[keep], kind='stable')
+    pairs = pair_rows[keep][order], pair_cols[keep][order], liked[keep][order]
+    return train, game_ids, evaluate.read_game_tags(args.games), eval_rows, pairs
+
+
+def collaborative_quality(params, train, tags, eval_rows, pairs, args):
+    """AUC and ranking metrics of cfScorer with params on every evaluation user."""
+    pair_rows, pair_cols, liked = pairs
+    evaluate._init_worker(train, tags, dict(params, k=args.k, engines=['collaborative']))
+    _, out = evaluate._score_chunk((eval_rows, pair_rows, pair_cols))
+    scores, topk = out['collaborative']
+
+    x, y = evaluate.roc_points(pair_rows, scores, liked, np.linspace(0, 1, args.thresholds), eval_rows)
+    order = np.argsort(x, kind='stable')
+    xs, ys = x[order], y[order]
+    ranking = evaluate.ranking_metrics(eval_rows, topk, pair_rows, pair_cols, liked, args.k)
+    return {
+        'auc': round(float(np.sum(np.diff(xs) * (ys[1:] + ys[:-1]) / 2)), 4),
+        'ndcg': ranking[f'ndcg@{args.k}'],
+        f'precision@{args.k}': ranking[f'precision@{args.k}'],
+    }
+
+
+def seed_games(train, game_ids, eval_rows):
+    """Best-rated training game of every evaluation user (None without a liked one)."""
+    seeds = []
+    for row in eval_rows:
+        ratings = train[row]
+        if ratings.nnz == 0 or ratings.data.max() <= 0:
+            seeds.append(None)
+        else:
+            seeds.append(str(game_ids[ratings.indices[np.argmax(ratings.data)]]))
+    return seeds
+
+
+def run_new_user(seeds_file):
+    """Child process: newUserReco.recommendation for every seed, prints the returned ids."""
+    sys.path.insert(0, FILTERING_DIR)
+    with open(seeds_file) as f:
+        seeds = json.load(f)
+    ranked = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        import newUserReco
+        for seed in seeds:
+            result = newUserReco.recommendation(seed) if seed else None
+            ranked.append([] if result is None or result.empty else result['product_id'].tolist())
+    print(json.dumps(ranked))
+
+
+def new_user_quality(top_tags, seeds_file, train, game_ids, eval_rows, pairs, args):
+    """Ranking metrics of newUserReco itself with NEWUSER_TOP_TAGS=top_tags."""
+    pair_rows, pair_cols, liked = pairs
+    env = dict(os.environ, FILTERING_DATA_DIR=os.path.abspath(args.data_dir),
+               NEWUSER_TOP_TAGS=str(top_tags))
+    cmd = [sys.executable, os.path.abspath(__file__), '--reviews', args.reviews,
+           '--games', args.games, '--run-new-user', seeds_file]
+    proc = subprocess.run(cmd, env=env, cwd=FILTERING_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'}
+
+    topk = np.full((len(eval_rows), args.k), -1, dtype=np.int64)
+    for i, ids in enumerate(json.loads(proc.stdout.strip().splitlines()[-1])):
+        ids = np.array([int(g) for g in ids], dtype=np.int64)
+        cols = np.clip(np.searchsorted(game_ids, ids), 0, len(game_ids) - 1)
+        cols = cols[(game_ids[cols] == ids) & ~np.isin(cols, train[eval_rows[i]].indices)][:args.k]
+        topk[i, :len(cols)] = cols
+    ranking = evaluate.ranking_metrics(eval_rows, topk, pair_rows, pair_cols, liked, args.k)
+    return {
+        'auc': None,
+        'ndcg': ranking[f'ndcg@{args.k}'],
+        f'precision@{args.k}': ranking[f'precision@{args.k}'],
+    }
+
+
+def engine_row(engine, params, quality, bench_args):
+    """Times the engine with params applied through its env vars; returns one result row."""
+    env = {name: str(params[key]) for key, name in ENGINE_KNOBS[engine].items()}
+    row = {'engine': engine, **params, **quality, 'quality_of': QUALITY_OF[engine]}
+    timing = benchmarkEngines.run_engine(engine, bench_args, env)
+    if 'error' in timing:
+        row['error'] = timing['error']
+    else:
+        row.update({
+            'p50_ms': timing['p50_ms'],
+            'p99_ms': timing['p99_ms'],
+            'peak_mb': timing['call_peak_mb'],
+            'startup_peak_mb': timing['startup_peak_mb'],
+            'hit_rate': timing['hit_rate'],
+        })
+    row['env'] = ' '.join(f'{name}={value}' for name, value in env.items())
+    return row
+
+
+def pareto(rows, quality):
+    """Rows not dominated on (quality up, p99_ms down, peak_mb down)."""
+    rows = [r for r in rows if 'error' not in r]
+    front = []
+    for r in rows:
+        dominated = any(
+            o is not r and o[quality] >= r[quality] and o['p99_ms'] <= r['p99_ms']
+            and o['peak_mb'] <= r['peak_mb']
+            and (o[quality] > r[quality] or o['p99_ms'] < r['p99_ms'] or o['peak_mb'] < r['peak_mb'])
+            for o in rows)
+        if not dominated:
+            front.append(r)
+    return sorted(front, key=lambda r: r['p99_ms'])
+
+
+def main():
+    args = parse_args()
+    if args.run_new_user:
+        run_new_user(args.run_new_user)
+        return
+
+    train, game_ids, game_tags, eval_rows, pairs = load(args)
+    print(f"Sweeping on {len(eval_rows)} users, {len(pairs[0])} test pairs, matrix {train.shape}.")
+    bench_args = argparse.Namespace(data_dir=os.path.abspath(args.data_dir), calls=args.calls,
+                                    warmup=args.warmup, emotion='happy', ranking=None,
+                                    seed=args.random_state)
+
+    results = {engine: [] for engine in ENGINE_KNOBS}
+    full_tags = evaluate.tag_matrix(game_ids, game_tags)
+    for n_overlap, min_corr, n_peers in itertools.product(args.overlap_peers, args.min_corr, args.top_peers):
+        params = {'n_overlap': n_overlap, 'min_corr': min_corr, 'n_peers': n_peers}
+        quality = collaborative_quality(params, train, full_tags, eval_rows, pairs, args)
+        for engine in ('recommendations', 'collaborative'):
+            row = engine_row(engine, params, quality, bench_args)
+            results[engine].append(row)
+            print(row)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(seed_games(train, game_ids, eval_rows), f)
+    try:
+        for top_tags in args.top_tags:
+            params = {'top_tags': top_tags}
+            quality = new_user_quality(top_tags, f.name, train, game_ids, eval_rows, pairs, args)
+            row = engine_row('new_user', params, quality, bench_args)
+            results['new_user'].append(row)
+            print(row)
+    finally:
+        os.remove(f.name)
+
+    report = {'users': int(len(eval_rows)), 'quality_metric': args.quality, 'engines': {}}
+    for engine, rows in results.items():
+        quality = 'ndcg' if engine == 'new_user' else args.quality
+        front = pareto(rows, quality)
+        report['engines'][engine] = {'quality_of': QUALITY_OF[engine], 'results': rows, 'pareto': front}
+        print(f"\nPareto frontier ({engine}, quality of {QUALITY_OF[engine]}):")
+        for r in front:
+            print(f"  {quality} {r[quality]:.4f}  p99 {r['p99_ms']:.2f}ms  "
+                  f"peak {r['peak_mb']:.2f}MB  {r['env']}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.splitext(args.output)[0] + '.csv', 'w', newline='') as f:
+        fields = sorted({key for rows in results.values() for r in rows for key in r})
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for rows in results.values():
+            writer.writerows(rows)
+    print(f"Saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Runs LDA inference once over every game and stores a dense float32
+(games x topics) matrix, so serving code only does array lookups.
+
+Run example:
+    $ python buildGameTopics.py \
+        --games ../dataset/steam_games.csv \
+        --dictionary ../filtering/lda_dict.dict \
+        --model ../filtering/lda_model.pkl \
+        --output ../filtering/game_topics.npz --workers 4
+"""
+import argparse
+import json
+import math
+import os
+import pickle
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from gensim.corpora import Dictionary
+
+from tagPreprocessing import data_preprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FILTERING_DIR = os.path.join(BASE_DIR, '..', 'filtering')
+
+sys.path.insert(0, os.path.join(BASE_DIR, '..'))
+from dataio import read_frame
+
+# Set once per worker by _init_worker
+_dictionary = None
+_lda_model = None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', required=True,
+                        help='steam_games.csv, scraped games.jl or its columnar table.')
+    parser.add_argument('--dictionary', default=os.path.join(FILTERING_DIR, 'lda_dict.dict'))
+    parser.add_argument('--model', default=os.path.join(FILTERING_DIR, 'lda_model.pkl'))
+    parser.add_argument('--output', default=os.path.join(FILTERING_DIR, 'game_topics.npz'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    return parser.parse_args()
+
+
+def clean_id(value):
+    try:
+        val_float = float(value)
+        if math.isinf(val_float) or math.isnan(val_float):
+            return None
+        return int(val_float)
+    except (ValueError, TypeError):
+        return None
+
+
+def load_games(path):
+    """Returns (ids, tags) for every game with a usable id."""
+    if path.endswith('.jl') or path.endswith('.json') or os.path.isdir(path):
+        df = read_frame(path, ['id', 'tags'])
+    else:
+        df = pd.read_csv(path, dtype=str)
+        df.columns = [c.lower().strip() for c in df.columns]
+        df = df.rename(columns={'appid': 'id', 'app_id': 'id', 'genres': 'tags'})
+        df = df.loc[:, ~df.columns.duplicated()][['id', 'tags']]
+
+    df['id'] = df['id'].apply(clean_id)
+    df = df.dropna(subset=['id']).drop_duplicates(subset=['id'])
+    return df['id'].astype(np.int64).values, df['tags'].tolist()
+
+
+def _init_worker(dict_path, model_path):
+    global _dictionary, _lda_model
+    _dictionary = Dictionary.load(dict_path)
+    with open(model_path, 'rb') as f:
+        _lda_model = pickle.load(f)
+
+
+def _infer_chunk(tags_chunk):
+    out = np.zeros((len(tags_chunk), _lda_model.num_topics), dtype=np.float32)
+    for i, tags in enumerate(tags_chunk):
+        bow = _dictionary.doc2bow(data_preprocess(tags))
+        for topic, prob in _lda_model.get_document_topics(bow, minimum_probability=0.0):
+            out[i, topic] = prob
+    return out
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+
+    ids, tags = load_games(args.games)
+    order = np.argsort(ids)  # Sorted ids let serving code use searchsorted
+    ids = ids[order]
+    tags = [tags[i] for i in order]
+    print(f"Loaded {len(ids)} games in {time.perf_counter() - started:.1f}s.")
+
+    chunks = [tags[i:i + args.chunk_size] for i in range(0, len(tags), args.chunk_size)]
+    with Pool(args.workers, initializer=_init_worker,
+              initargs=(args.dictionary, args.model)) as pool:
+        parts = pool.map(_infer_chunk, chunks)
+
+    topics = np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+    np.savez(args.output, ids=ids, topics=topics)
+
+    meta = {
+        'games': int(len(ids)),
+        'num_topics': int(topics.shape[1]),
+        'dictionary': os.path.abspath(args.dictionary),
+        'model': os.path.abspath(args.model),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    print(json.dumps(meta, indent=2))
+    print(f"Saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Tag preprocessing shared by LDA training and the offline topic jobs.
+Same steps as topicModelingLDA.ipynb: gensim tokenising, stopword and
+short-token removal, verb lemmatisation and Snowball stemming.
+"""
+import ast
+from functools import lru_cache
+
+from gensim.parsing.preprocessing import STOPWORDS
+from gensim.utils import simple_preprocess
+from nltk.stem import SnowballStemmer, WordNetLemmatizer
+
+_stemmer = SnowballStemmer(language='english')
+_lemmatizer = WordNetLemmatizer()
+
+
+@lru_cache(maxsize=None)
+def lemmatization_and_stemming(token):
+    # Tags come from a small vocabulary, so memoising makes this ~free
+    return _stemmer.stem(_lemmatizer.lemmatize(token, pos='v'))
+
+
+def parse_tags(tags):
+    """Accepts a list, a "['a', 'b']" string or a comma separated string."""
+    if isinstance(tags, (list, tuple)):
+        return [str(t) for t in tags]
+    if isinstance(tags, str):
+        if tags.startswith('['):
+            try:
+                return [str(t) for t in ast.literal_eval(tags)]
+            except (ValueError, SyntaxError):
+                return []
+        return [t.strip() for t in tags.split(',') if t.strip()]
+    return []
+
+
+def data_preprocess(tags):
+    """Returns the stemmed token list for one game's tags."""
+    result_tag = []
+    for tkn in simple_preprocess(' '.join(parse_tags(tags))):
+        if tkn not in STOPWORDS and len(tkn) > 3:
+            result_tag.append(lemmatization_and_stemming(tkn))
+    return result_tag
@@ -0,0 +1,154 @@
+"""
+Scriptable LDA training pipeline (replaces topicModelingLDA.ipynb).
+
+games.jl is streamed line by line, tags are tokenised and stemmed in a
+process pool, token lists are spooled to disk and the bag-of-words corpus
+is serialized as an MmCorpus, so memory does not grow with the dataset.
+
+Run example:
+    $ python trainLDA.py --games ../dataset/games.jl --output-dir runs \
+        --workers 4 --passes 2 --publish ../filtering
+"""
+import argparse
+import json
+import os
+import pickle
+import resource
+import shutil
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+from gensim.corpora import Dictionary, MmCorpus
+from gensim.models import LdaMulticore
+
+from tagPreprocessing import data_preprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(BASE_DIR, '..'))
+from dataio import iter_records
+
+DICT_FILE = 'lda_dict.dict'
+MODEL_FILE = 'lda_model.pkl'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', required=True, help='Scraped games.jl file.')
+    parser.add_argument('--output-dir', default=os.path.join(BASE_DIR, 'runs'))
+    parser.add_argument('--version', default=datetime.now().strftime('%Y%m%d-%H%M%S'),
+                        help='Name of the versioned artifact directory.')
+    parser.add_argument('--num-topics', type=int, default=7)
+    parser.add_argument('--passes', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=max((os.cpu_count() or 2) - 1, 1),
+                        help='Processes for tokenising and LdaMulticore workers.')
+    parser.add_argument('--chunk-size', type=int, default=2000,
+                        help='Documents per training chunk and per pool task batch.')
+    parser.add_argument('--no-below', type=int, default=15)
+    parser.add_argument('--no-above', type=float, default=0.5)
+    parser.add_argument('--keep-n', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=2018)
+    parser.add_argument('--publish', nargs='*', default=[],
+                        help='Directories to copy the dictionary and model into.')
+    return parser.parse_args()
+
+
+def read_tags(path):
+    """Yields the tags of every game in games.jl without loading the file."""
+    for record in iter_records(path, ['tags']):
+        yield record['tags'] or []
+
+
+def tokenize_to_disk(games_path, tokens_path, workers, chunk_size):
+    """
+    Pass 1: tokenise in a pool, grow the dictionary incrementally and spool
+    the token lists to tokens_path (one JSON list per line).
+    """
+    dictionary = Dictionary()
+    n_docs = 0
+    batch = []
+
+    with Pool(workers) as pool, open(tokens_path, 'w', encoding='utf-8') as out:
+        for tokens in pool.imap(data_preprocess, read_tags(games_path), chunksize=256):
+            if not tokens:
+                continue
+            out.write(json.dumps(tokens) + '\n')
+            batch.append(tokens)
+            n_docs += 1
+            if len(batch) >= chunk_size:
+                dictionary.add_documents(batch, prune_at=None)
+                batch = []
+        if batch:
+            dictionary.add_documents(batch, prune_at=None)
+
+    return dictionary, n_docs
+
+
+def read_tokens(tokens_path):
+    with open(tokens_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def main():
+    args = parse_args()
+    run_dir = os.path.join(args.output_dir, args.version)
+    os.makedirs(run_dir, exist_ok=True)
+
+    tokens_path = os.path.join(run_dir, 'tokens.jl')
+    corpus_path = os.path.join(run_dir, 'corpus.mm')
+    report = {'version': args.version, 'params': vars(args), 'seconds': {}}
+
+    # 1. Tokenise & build the dictionary
+    started = time.perf_counter()
+    dictionary, n_docs = tokenize_to_disk(args.games, tokens_path, args.workers, args.chunk_size)
+    dictionary.filter_extremes(no_below=args.no_below, no_above=args.no_above, keep_n=args.keep_n)
+    dictionary.save(os.path.join(run_dir, DICT_FILE))
+    report['seconds']['tokenize'] = round(time.perf_counter() - started, 2)
+    print(f"Tokenised {n_docs} games, vocabulary {len(dictionary)} terms.")
+
+    # 2. Serialize the bag-of-words corpus
+    started = time.perf_counter()
+    MmCorpus.serialize(corpus_path, (dictionary.doc2bow(t) for t in read_tokens(tokens_path)),
+                       id2word=dictionary)
+    os.remove(tokens_path)
+    report['seconds']['corpus'] = round(time.perf_counter() - started, 2)
+
+    # 3. Train, streaming the corpus from disk on every pass
+    started = time.perf_counter()
+    lda_topic_model = LdaMulticore(MmCorpus(corpus_path), num_topics=args.num_topics,
+                                   id2word=dictionary, passes=args.passes,
+                                   workers=args.workers, chunksize=args.chunk_size,
+                                   random_state=args.seed)
+    report['seconds']['train'] = round(time.perf_counter() - started, 2)
+
+    with open(os.path.join(run_dir, MODEL_FILE), 'wb') as f:
+        pickle.dump(lda_topic_model, f)
+
+    report.update({
+        'documents': n_docs,
+        'vocabulary': len(dictionary),
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'topics': {idx: topic for idx, topic in lda_topic_model.print_topics(-1)},
+    })
+    with open(os.path.join(run_dir, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    #Printing topics and correlated words
+    for idx, topic in report['topics'].items():
+        print('Topic: {} \nWords: {}'.format(idx, topic))
+    print(f"Timings: {report['seconds']} | peak RSS {report['peak_rss_mb']} MB")
+
+    for target in args.publish:
+        for name in (DICT_FILE, MODEL_FILE):
+            shutil.copy2(os.path.join(run_dir, name), os.path.join(target, name))
+        print(f"Published {args.version} to {target}")
+
+    print(f"Saved run to {run_dir}")
+
+
+if __name__ == '__main__':
+    main()